@@ -0,0 +1,80 @@
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import queue
+
+logger = logging.getLogger(__name__)
+
+class BackgroundTasks:
+    """
+    A small worker pool for clipboard work that must not block the main thread.
+
+    Jobs run on worker threads, but their completion callbacks are queued and
+    only executed when drain() is called. The application drains from the
+    clipboard timer, so every callback runs on the main thread and may safely
+    touch the history and the UI.
+    """
+
+    def __init__(self, max_workers=1, name="clipboard-bg"):
+        """
+        Initialize the worker pool.
+
+        Args:
+            max_workers: Number of worker threads (default: 1).
+            name: Prefix used for the worker thread names.
+        """
+        self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix=name)
+        self._completed = queue.SimpleQueue()
+
+    def submit(self, fn, *args, on_done=None):
+        """
+        Run a function on a worker thread.
+
+        Args:
+            fn: Function to call in the background.
+            *args: Positional arguments passed to fn.
+            on_done: Optional callback receiving fn's result, run by drain().
+
+        Returns:
+            Future: The future tracking the background call.
+        """
+        future = self._executor.submit(fn, *args)
+        if on_done is not None:
+            future.add_done_callback(lambda f: self._completed.put((on_done, f)))
+        return future
+
+    def drain(self, limit=None):
+        """
+        Run the callbacks of finished jobs on the calling thread.
+
+        Args:
+            limit: Maximum number of callbacks to run, or None for all pending.
+
+        Returns:
+            int: Number of callbacks that were run.
+        """
+        count = 0
+        while limit is None or count < limit:
+            try:
+                on_done, future = self._completed.get_nowait()
+            except queue.Empty:
+                break
+            count += 1
+            try:
+                error = future.exception()
+                if error is not None:
+                    logger.error(f"Background task failed: {error}")
+                    continue
+                on_done(future.result())
+            except Exception as e:
+                logger.error(f"Error in background task callback: {e}")
+        return count
+
+    def shutdown(self, wait=False):
+        """
+        Stop the worker threads.
+
+        Args:
+            wait: Whether to wait for running jobs to finish (default: False).
+        """
+        self._executor.shutdown(wait=wait)
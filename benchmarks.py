@@ -0,0 +1,578 @@
+"""
+Micro-benchmarks for the clipboard history data structures.
+
+Run all benchmarks with `python3 benchmarks.py`, or a single one by name,
+e.g. `python3 benchmarks.py phash_index`.
+"""
+import random
+import sys
+import time
+
+BENCHMARKS = {}
+
+def benchmark(func):
+    """
+    Register a benchmark function under its name without the bench_ prefix.
+    """
+    BENCHMARKS[func.__name__[len("bench_"):]] = func
+    return func
+
+def _timeit(func, repeat):
+    """
+    Return the mean duration of func() in microseconds.
+    """
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+@benchmark
+def bench_phash_index(sizes=(100, 1000, 10000, 100000), threshold=4, lookups=200):
+    """
+    Measure near-duplicate lookup cost as the perceptual hash index grows,
+    against a linear scan of the same hashes.
+    """
+    from image_hash import PerceptualHashIndex
+
+    rng = random.Random(0)
+    for size in sizes:
+        index = PerceptualHashIndex()
+        hashes = [rng.getrandbits(64) for _ in range(size)]
+        for key, value in enumerate(hashes):
+            index.add(key, value)
+
+        # Query with slightly perturbed copies of stored hashes
+        queries = [hashes[rng.randrange(size)] ^ (1 << rng.randrange(64)) for _ in range(lookups)]
+        it = iter(queries * 2)
+        per_lookup = _timeit(lambda: index.find_within(next(it), threshold), lookups)
+
+        def scan(query):
+            return [key for key, value in enumerate(hashes) if bin(query ^ value).count("1") <= threshold]
+
+        scans = max(lookups // 10, 1)
+        it = iter(queries)
+        per_scan = _timeit(lambda: scan(next(it)), scans)
+        assert sorted(key for key, _ in index.find_within(queries[0], threshold)) == scan(queries[0])
+        print(f"phash_index size={size:>7} lookup={per_lookup:9.1f} us scan={per_scan:9.1f} us")
+
+@benchmark
+def bench_text_delta(length=4000, versions=9, edits=5):
+    """
+    Measure encoding cost, storage savings and decode latency along a delta chain.
+    """
+    from text_delta import DeltaEncoder, apply_delta, delta_size
+
+    rng = random.Random(0)
+    words = ["def", "return", "self", "value", "config", "=", "(", ")", ":", "\n    "]
+    text = " ".join(rng.choice(words) for _ in range(length // 4))
+    encoder = DeltaEncoder()
+
+    chain = [(text, None)]
+    for _ in range(versions - 1):
+        for _ in range(edits):
+            pos = rng.randrange(len(text))
+            text = text[:pos] + rng.choice(words) + text[pos + 3:]
+        start = time.perf_counter()
+        result = encoder.encode(text, [(len(chain) - 1, chain[-1][0])])
+        encode_us = (time.perf_counter() - start) * 1e6
+        chain.append((text, result[1] if result else None))
+        stored = delta_size(result[1]) if result else len(text)
+        print(f"text_delta version={len(chain) - 1} encode={encode_us:9.1f} us "
+              f"stored={stored}/{len(text)} chars")
+
+    def decode_last():
+        value = chain[0][0]
+        for _, delta in chain[1:]:
+            value = apply_delta(value, delta) if delta else value
+        return value
+
+    assert decode_last() == chain[-1][0]
+    print(f"text_delta decode chain={versions - 1} {_timeit(decode_last, 1000):9.1f} us")
+
+@benchmark
+def bench_frecency(sizes=(1000, 10000, 100000), updates=10000):
+    """
+    Measure frecency updates, top-N iteration and eviction lookup as the index grows.
+    """
+    from itertools import islice
+    from frecency import FrecencyIndex
+
+    rng = random.Random(0)
+    for size in sizes:
+        index = FrecencyIndex()
+        now = 1.7e9
+        for key in range(size):
+            index.touch(key, now=now + key)
+        touches = iter([rng.randrange(size) for _ in range(updates)])
+        clock = iter(range(updates))
+        touch = _timeit(lambda: index.touch(next(touches), now=now + size + next(clock)), updates)
+        top = _timeit(lambda: list(islice(index.ranked(), 50)), 1000)
+        lowest = _timeit(lambda: next(index.lowest()), 1000)
+        print(f"frecency size={size:>7} touch={touch:7.2f} us top50={top:7.2f} us lowest={lowest:7.2f} us")
+
+class _DictClipboardItem:
+    """
+    The previous dict-backed ClipboardItem, kept as a baseline for comparison.
+    """
+
+    def __init__(self, content, content_type, raw_data=None, timestamp=None, preview=None):
+        from datetime import datetime
+        self.content = content
+        self.content_type = content_type
+        self.raw_data = raw_data
+        self.timestamp = timestamp or datetime.now()
+        self.preview = preview
+
+@benchmark
+def bench_item_metadata(count=100000):
+    """
+    Compare memory per item and iteration speed of ClipboardItem with the dict-backed class.
+    """
+    import tracemalloc
+    from clipboard_item import ClipboardItem, truncate_preview
+
+    rng = random.Random(0)
+    types = ["NSStringPboardType", "public.file-url", "public.png"]
+    contents = [f"clip {i} " * rng.randrange(1, 40) for i in range(count)]
+
+    for cls in (_DictClipboardItem, ClipboardItem):
+        tracemalloc.start()
+        items = [cls(content, types[i % 3], preview=truncate_preview(content))
+                 for i, content in enumerate(contents)]
+        per_item = tracemalloc.get_traced_memory()[0] / count
+        tracemalloc.stop()
+
+        def scan():
+            return sum(1 for item in items if item.content_type == types[0] and item.timestamp)
+        line = (f"item_metadata {cls.__name__:>18} memory={per_item:7.1f} B/item "
+                f"scan={_timeit(scan, 5) / 1000:7.2f} ms")
+
+        if cls is ClipboardItem:
+            code = items[0].type_code
+            def scan_compact():
+                return sum(1 for item in items if item.type_code == code and item.epoch)
+            line += f" scan(type_code, epoch)={_timeit(scan_compact, 5) / 1000:7.2f} ms"
+        print(line)
+
+class _VirtualClock:
+    """
+    Runs scheduled callbacks in order of a simulated clock instead of sleeping.
+    """
+
+    def __init__(self):
+        self.now = 0.0
+        self._pending = []
+        self._sequence = 0
+
+    def schedule(self, delay, callback):
+        import heapq
+        self._sequence += 1
+        heapq.heappush(self._pending, (self.now + delay, self._sequence, callback))
+
+    def run(self):
+        import heapq
+        while self._pending:
+            self.now, _, callback = heapq.heappop(self._pending)
+            callback()
+
+@benchmark
+def bench_paste_queue(count=1000):
+    """
+    Measure multi-item paste throughput against a mock event poster.
+    """
+    from clipboard_item import ClipboardItem
+    from paste_queue import PasteQueue
+
+    class MockPoster:
+        def __init__(self):
+            self.events = 0
+
+        def post_key(self, keycode, key_down, command=False):
+            self.events += 1
+
+    items = [ClipboardItem(f"field {i}", "NSStringPboardType") for i in range(count)]
+    for separator in (None, "tab", ", "):
+        clock = _VirtualClock()
+        poster = MockPoster()
+        queue = PasteQueue(lambda item: True, lambda text: True, poster=poster,
+                           schedule=clock.schedule, separator=separator)
+        start = time.perf_counter()
+        queue.start(items)
+        clock.run()
+        cpu_ms = (time.perf_counter() - start) * 1000
+        print(f"paste_queue separator={separator!r:>6} pasted={queue.pasted} events={poster.events} "
+              f"throughput={queue.pasted / clock.now:5.2f} items/s (timer-bound) "
+              f"overhead={cpu_ms / count * 1000:6.1f} us/item")
+
+@benchmark
+def bench_query_api(items=1000, clients=4, requests=2000):
+    """
+    Load-test the query API socket against an in-process ClipboardHistory (macOS only).
+    """
+    import os
+    import statistics
+    import tempfile
+    import threading
+    from clipboard_history import ClipboardHistory, ClipboardItem
+    from clipctl import QueryClient
+    from query_server import QueryServer
+
+    history = ClipboardHistory(max_items=items)
+    snapshot = history.get_history()
+    for i in range(items):
+        snapshot = snapshot.prepend(ClipboardItem(f"clip {i} https://example.com/{i}", "NSStringPboardType"))
+    history._commit(snapshot)
+
+    socket_path = os.path.join(tempfile.mkdtemp(), "bench.sock")
+    server = QueryServer(history, socket_path, dispatch=lambda func: func())
+    server.start()
+
+    workloads = {
+        "get": lambda i: {"op": "get", "index": i % items},
+        "list": lambda i: {"op": "list", "limit": 50},
+        "search": lambda i: {"op": "search", "query": f"/{i % items}", "limit": 5},
+        "batch10": lambda i: [{"op": "get", "index": (i + j) % items} for j in range(10)],
+    }
+    try:
+        for name, make_request in workloads.items():
+            latencies = []
+            lock = threading.Lock()
+
+            def run_client():
+                client = QueryClient(socket_path)
+                local = []
+                for i in range(requests):
+                    start = time.perf_counter()
+                    client.request(make_request(i))
+                    local.append(time.perf_counter() - start)
+                client.close()
+                with lock:
+                    latencies.extend(local)
+
+            start = time.perf_counter()
+            threads = [threading.Thread(target=run_client) for _ in range(clients)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - start
+
+            latencies.sort()
+            print(f"query_api {name:>8} clients={clients} "
+                  f"p50={statistics.median(latencies) * 1e3:6.3f} ms "
+                  f"p99={latencies[int(len(latencies) * 0.99)] * 1e3:6.3f} ms "
+                  f"rate={len(latencies) / elapsed:8.0f} req/s")
+    finally:
+        server.stop()
+
+@benchmark
+def bench_facets(count=10000):
+    """
+    Compare filtering by a precomputed facet index with re-classifying every item.
+    """
+    from clipboard_item import ClipboardItem
+    from content_classifier import FacetIndex, classify
+
+    rng = random.Random(0)
+    samples = ["https://example.com/page/{}", "user{}@example.com", "/Users/me/file{}.txt",
+               "#{:06x}", "{}", "def f{}(x):\n    return x", "meeting notes {} and more words"]
+    items = [ClipboardItem(rng.choice(samples).format(i), "NSStringPboardType") for i in range(count)]
+
+    start = time.perf_counter()
+    index = FacetIndex()
+    for item in items:
+        item.tags = classify(item.content)
+        index.add(item, item.tags)
+    classify_us = (time.perf_counter() - start) / count * 1e6
+
+    rescan = _timeit(lambda: [item for item in items if "url" in classify(item.content)], 3)
+    lookup = _timeit(lambda: index.items("url"), 100)
+    print(f"facets items={count} classify={classify_us:6.1f} us/item "
+          f"rescan={rescan / 1000:8.2f} ms lookup={lookup / 1000:8.3f} ms")
+
+@benchmark
+def bench_text_extraction(paragraphs=(10, 100, 1000), repeat=20):
+    """
+    Compare RTF text extraction with reading the cached text (macOS only).
+    """
+    import os
+    import tempfile
+    from AppKit import NSAttributedString
+    from text_extraction import TextExtractor
+
+    for count in paragraphs:
+        text = "\n".join(f"Paragraph {i}: the quick brown fox jumps over the lazy dog." for i in range(count))
+        attributed = NSAttributedString.alloc().initWithString_(text)
+        data = attributed.RTFFromRange_documentAttributes_((0, attributed.length()), {})
+        blob_path = os.path.join(tempfile.mkdtemp(), "clip.rtf")
+
+        cold = _timeit(lambda: TextExtractor().extract("public.rtf", data), repeat)
+        extractor = TextExtractor()
+        extractor.extract("public.rtf", data, blob_path)
+        warm = _timeit(lambda: extractor.extract("public.rtf", data, blob_path), repeat)
+        print(f"text_extraction paragraphs={count:>5} rtf={int(data.length()):>8} B "
+              f"extract={cold / 1000:8.3f} ms cached={warm / 1000:8.3f} ms "
+              f"hit_rate={extractor.stats()['cache_hit_rate']:.2f}")
+
+@benchmark
+def bench_bulk_delete(sizes=(1000, 10000, 100000), fraction=0.5):
+    """
+    Compare deleting items one by one with a single bulk removal (macOS only).
+    """
+    import tempfile
+    from clipboard_history import ClipboardHistory
+    from clipboard_item import ClipboardItem
+    from workload_trace import FakePasteboard
+
+    for size in sizes:
+        # Deleting one by one is quadratic; it is only timed on the smaller histories
+        timings = {"one_by_one": float("nan")}
+        for mode in ("one_by_one", "bulk") if size <= 10000 else ("bulk",):
+            history = ClipboardHistory(max_items=size, pasteboard=FakePasteboard(),
+                                       cache_dir=tempfile.mkdtemp())
+            snapshot = history.get_history()
+            for i in range(size):
+                snapshot = snapshot.prepend(ClipboardItem(f"clip {i}", "NSStringPboardType"))
+            history._commit(snapshot)
+            doomed = [item for i, item in enumerate(snapshot) if i % int(1 / fraction) == 0]
+
+            start = time.perf_counter()
+            if mode == "bulk":
+                history.remove_items(items=doomed)
+            else:
+                for item in doomed:
+                    history.remove_item(history.get_history().index_of(item), item=item)
+            timings[mode] = time.perf_counter() - start
+        print(f"bulk_delete items={size:>6} removed={len(doomed):>6} "
+              f"one_by_one={timings['one_by_one'] * 1000:9.1f} ms bulk={timings['bulk'] * 1000:7.1f} ms")
+
+@benchmark
+def bench_expiry(sizes=(1000, 10000, 100000), expiring=10, ticks=100):
+    """
+    Compare finding expired items with the scheduler against scanning every item.
+    """
+    from expiry import ExpiryScheduler
+
+    rng = random.Random(0)
+    for size in sizes:
+        items = [object() for _ in range(size)]
+        deadlines = {item: 1000 + rng.random() * 1000 for item in items}
+        # A few items become due on each tick
+        for tick in range(ticks):
+            for item in rng.sample(items, expiring):
+                deadlines[item] = tick + 0.5
+
+        scheduler = ExpiryScheduler()
+        for item, deadline in deadlines.items():
+            scheduler.schedule(item, deadline)
+
+        start = time.perf_counter()
+        expired = sum(len(scheduler.pop_expired(tick + 1)) for tick in range(ticks))
+        heap_us = (time.perf_counter() - start) / ticks * 1e6
+
+        start = time.perf_counter()
+        for tick in range(ticks):
+            [item for item, deadline in deadlines.items() if deadline <= tick + 1]
+        scan_us = (time.perf_counter() - start) / ticks * 1e6
+        print(f"expiry items={size:>6} expired={expired:>5} "
+              f"scheduler={heap_us:8.1f} us/tick scan={scan_us:10.1f} us/tick")
+
+@benchmark
+def bench_sync_poll(sizes=(1000, 10000, 100000), changes=10, live=50):
+    """
+    Time polling a sync folder for a few new entries on top of logs of growing
+    size, and replaying the log once compacted to the live items.
+    """
+    import shutil
+    import tempfile
+    from history_sync import FolderSync
+
+    for size in sizes:
+        folder = tempfile.mkdtemp()
+        writer = FolderSync(folder, "writer")
+        reader = FolderSync(folder, "reader")
+        for i in range(size):
+            writer.publish_add({"uid": f"u{i}", "type": "NSStringPboardType", "epoch": i, "text": f"clip {i}"})
+
+        start = time.perf_counter()
+        reader.poll()
+        full_ms = (time.perf_counter() - start) * 1000
+
+        for i in range(changes):
+            writer.publish_remove(f"u{i}")
+        bytes_before = reader.stats["bytes_read"]
+        start = time.perf_counter()
+        applied = len(reader.poll())
+        incremental_ms = (time.perf_counter() - start) * 1000
+        print(f"sync_poll log={size:>6} entries replay={full_ms:8.1f} ms "
+              f"incremental={incremental_ms:6.3f} ms ({applied} changes, "
+              f"{reader.stats['bytes_read'] - bytes_before} bytes read)")
+
+        writer.compact([f"u{i}" for i in range(size - live, size)])
+        start = time.perf_counter()
+        replayed = len(FolderSync(folder, "restarted").poll())
+        compacted_ms = (time.perf_counter() - start) * 1000
+        print(f"sync_poll log={size:>6} entries compacted replay={compacted_ms:6.3f} ms ({replayed} changes)")
+        shutil.rmtree(folder)
+
+@benchmark
+def bench_memory_pressure(count=50, size=1024 * 1024):
+    """
+    Report the bytes shed at each pressure level and the cost of reloading a payload (macOS only).
+    """
+    import tempfile
+    from clipboard_history import ClipboardHistory
+    from memory_pressure import LEVEL_NAMES, SimulatedPressureSource
+    from workload_trace import FakeData, FakePasteboard
+
+    pasteboard = FakePasteboard()
+    history = ClipboardHistory(max_items=count, pasteboard=pasteboard, cache_dir=tempfile.mkdtemp())
+    source = SimulatedPressureSource()
+    policy = history.enable_memory_pressure(source)
+    for i in range(count):
+        pasteboard.copy({"public.png": FakeData(random.randbytes(size))})
+        history.check_and_update()
+
+    for level in (1, 2, 0):
+        source.set_level(level)
+        before = history.get_memory_report()["total"]["payload"]
+        start = time.perf_counter()
+        freed = policy.check(force=True)
+        elapsed = (time.perf_counter() - start) * 1000
+        after = history.get_memory_report()["total"]["payload"]
+        print(f"memory_pressure level={LEVEL_NAMES[level]:<8} freed={sum(freed.values()):>10} B "
+              f"resident {before:>10} -> {after:>10} B in {elapsed:6.2f} ms")
+
+    item = history.get_history()[count - 1]
+    start = time.perf_counter()
+    item.raw_data
+    print(f"memory_pressure reload={size:>8} B in {(time.perf_counter() - start) * 1000:6.2f} ms")
+
+@benchmark
+def bench_prefetch(count=10, size=8 * 1024 * 1024, think_time=0.2):
+    """
+    Compare pasting a shed payload cold and after the popup prefetched it (macOS only).
+    """
+    import tempfile
+    from clipboard_history import ClipboardHistory
+    from workload_trace import FakeData, FakePasteboard
+
+    pasteboard = FakePasteboard()
+    history = ClipboardHistory(max_items=count, pasteboard=pasteboard, cache_dir=tempfile.mkdtemp())
+    for i in range(count):
+        pasteboard.copy({"public.png": FakeData(random.randbytes(size))})
+        history.check_and_update()
+
+    timings = {}
+    for mode in ("cold", "prefetched"):
+        for item in history.get_history():
+            item.shed_payload()
+        if mode == "prefetched":
+            history.prefetcher.begin(history.get_history())
+            # The user reads the popup before clicking
+            time.sleep(think_time)
+        start = time.perf_counter()
+        history._write_to_pasteboard(history.get_history()[0])
+        timings[mode] = (time.perf_counter() - start) * 1000
+        history.prefetcher.end()
+    report = history.get_prefetch_stats()
+    print(f"prefetch payload={size:>8} B cold={timings['cold']:7.2f} ms "
+          f"prefetched={timings['prefetched']:7.2f} ms hit_rate={report['hit_rate']:.2f}")
+
+@benchmark
+def bench_timestamp_index(sizes=(1000, 10000, 100000), queries=1000, window=3600):
+    """
+    Compare time-range lookups in the timestamp index against scanning every item.
+    """
+    from clipboard_item import ClipboardItem
+    from timestamp_index import TimestampIndex
+
+    rng = random.Random(0)
+    for size in sizes:
+        # One item every 30 seconds on average
+        items = [ClipboardItem(f"clip {i}", "NSStringPboardType", timestamp=i * 30.0)
+                 for i in range(size)]
+        index = TimestampIndex()
+        start = time.perf_counter()
+        for item in items:
+            index.add(item)
+        add_us = (time.perf_counter() - start) / size * 1e6
+
+        starts = [rng.uniform(0, size * 30.0) for _ in range(queries)]
+        start = time.perf_counter()
+        found = sum(len(index.between(begin, begin + window)) for begin in starts)
+        index_us = (time.perf_counter() - start) / queries * 1e6
+
+        start = time.perf_counter()
+        for begin in starts[:max(queries // 10, 1)]:
+            [item for item in items if begin <= item.epoch <= begin + window]
+        scan_us = (time.perf_counter() - start) / max(queries // 10, 1) * 1e6
+
+        victims = rng.sample(items, min(size, 1000))
+        start = time.perf_counter()
+        for item in victims:
+            index.remove(item)
+        remove_us = (time.perf_counter() - start) / len(victims) * 1e6
+        print(f"timestamp_index items={size:>6} add={add_us:5.2f} us remove={remove_us:5.2f} us "
+              f"range={index_us:7.1f} us scan={scan_us:9.1f} us ({found / queries:.0f} items per range)")
+
+@benchmark
+def bench_lazy_paste(sizes=(1024 * 1024, 10 * 1024 * 1024, 30 * 1024 * 1024), repeat=5):
+    """
+    Compare promising an image to the pasteboard with writing its bytes up front.
+    """
+    import os
+    import tempfile
+    from lazy_paste import PayloadProvider, promise_types
+    from workload_trace import FakeData, FakePasteboard
+
+    def load(path):
+        with open(path, "rb") as f:
+            return FakeData(f.read())
+
+    for size in sizes:
+        pasteboard = FakePasteboard()
+        fd, path = tempfile.mkstemp(suffix=".png")
+        with os.fdopen(fd, "wb") as f:
+            f.write(random.randbytes(size))
+        stats = {}
+
+        def eager():
+            data = load(path)
+            pasteboard.clearContents()
+            for content_type in promise_types("public.png"):
+                pasteboard.setData_forType_(data.bytes().tobytes(), content_type)
+
+        def promise():
+            pasteboard.clearContents()
+            pasteboard.write_promises(PayloadProvider(path, promise_types("public.png"), load, stats=stats))
+
+        eager_us = _timeit(eager, repeat)
+        pasteboard.clearContents()
+        promise_us = _timeit(promise, repeat)
+        start = time.perf_counter()
+        pasteboard.dataForType_("public.png")
+        pasteboard.dataForType_("public.tiff")
+        provide_ms = (time.perf_counter() - start) * 1000
+        pasteboard.clearContents()
+        # Only the last promise was read, once for both types
+        assert stats["requested"] == stats["loaded"] == 1 and stats["unrequested"] == repeat - 1
+        print(f"lazy_paste payload={size:>9} B eager={eager_us / 1000:8.2f} ms "
+              f"promise={promise_us / 1000:6.3f} ms first read={provide_ms:7.2f} ms")
+        os.remove(path)
+
+def main(argv):
+    names = argv[1:] or list(BENCHMARKS)
+    for name in names:
+        if name not in BENCHMARKS:
+            print(f"Unknown benchmark: {name} (available: {', '.join(BENCHMARKS)})")
+            return 1
+        try:
+            BENCHMARKS[name]()
+        except ImportError as e:
+            # e.g. the macOS only benchmarks on Linux
+            print(f"{name} skipped: {e}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
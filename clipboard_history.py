@@ -2,11 +2,13 @@ from AppKit import (NSPasteboard, NSStringPboardType, NSEvent,
                   NSCommandKeyMask, NSKeyDown, NSApplication,
                   NSPasteboardTypePNG, NSPasteboardTypeTIFF,
                   NSPasteboardTypeRTF, NSPasteboardTypeFileURL,
-                  NSImage, NSPDFPboardType, NSData, NSFilenamesPboardType, NSURL)
+                  NSImage, NSPDFPboardType, NSData, NSFilenamesPboardType, NSURL,
+                  NSPasteboardItem)
 from Quartz import (CGEventCreateKeyboardEvent, CGEventPost,
                    kCGHIDEventTap, kCGEventFlagMaskCommand,
                    CGEventSetFlags)
 import logging
+import sys
 import time
 import subprocess
 import os
@@ -15,27 +17,65 @@ from typing import Optional, Any, Union
 from datetime import datetime
 import shutil
 import tempfile
-from Foundation import NSArray
+from itertools import chain, islice
+from Foundation import NSArray, NSObject, NSDataReadingMappedIfSafe
+from objc import super
+from background_tasks import BackgroundTasks
+from image_hash import PerceptualHashIndex, compute_image_hash
+from clipboard_item import ClipboardItem, set_payload_loader, type_code, truncate_preview
+from text_delta import DeltaEncoder
+from history_snapshot import HistorySnapshot
+from frecency import FrecencyIndex
+from memory_report import MemoryAccountant
+from paste_queue import PasteQueue, QuartzEventPoster, V_KEYCODE
+from content_classifier import FacetIndex, classify
+from text_extraction import EXTRACTABLE_TYPES, TextExtractor
+from expiry import ExpiryScheduler
+from history_sync import FolderSync
+from file_metadata import FileInfo, FileValidator, stat_files, update_file_info
+from payload_prefetch import PayloadPrefetcher
+from timestamp_index import TimestampIndex
+from memory_pressure import LEVEL_CRITICAL, LEVEL_WARN, MemoryPressurePolicy, SysctlPressureSource
+from lazy_paste import PayloadProvider, promise_types
 
 logger = logging.getLogger(__name__)
 
-class ClipboardItem:
-    def __init__(self, content, content_type, raw_data=None, timestamp=None, preview=None):
+class PromiseDataSource(NSObject):
+    """
+    NSPasteboardItem data provider handing promised types to a PayloadProvider.
+    """
+
+    def initWithProvider_(self, provider):
         """
-        Initialize a clipboard item.
-        
+        Initialize the data source with the provider it forwards to.
+
         Args:
-            content: The content of the clipboard item (text, file path, etc.)
-            content_type: The type of content (NSStringPboardType, etc.)
-            raw_data: Optional NSData object for binary content
-            timestamp: When the item was created
-            preview: Preview text or path for display
+            provider: PayloadProvider of the pasted item.
+
+        Returns:
+            The initialized PromiseDataSource instance.
         """
-        self.content = content
-        self.content_type = content_type
-        self.raw_data = raw_data
-        self.timestamp = timestamp or datetime.now()
-        self.preview = preview
+        self = super(PromiseDataSource, self).init()
+        if self is not None:
+            self.provider = provider
+        return self
+
+    def pasteboard_item_provideDataForType_(self, pasteboard, item, content_type):
+        """
+        Supply the payload when an application reads a promised type.
+        """
+        try:
+            data = self.provider.provide(content_type)
+            if data is not None:
+                item.setData_forType_(data, content_type)
+        except Exception as e:
+            logger.error(f"Error providing pasteboard data: {e}")
+
+    def pasteboardFinishedWithDataProvider_(self, pasteboard):
+        """
+        Release the payload once the pasteboard contents were replaced.
+        """
+        self.provider.finished()
 
 class ClipboardHistory:
     """
@@ -45,20 +85,74 @@ class ClipboardHistory:
     files, and other media types. It handles copying and pasting of these items.
     """
 
-    def __init__(self, max_items=10):
+    def __init__(self, max_items=10, near_duplicate_mode="flag", near_duplicate_threshold=4,
+                 ranking="recency", pasteboard=None, cache_dir=None, ttls=None):
         """
         Initialize the clipboard history manager.
 
         Args:
             max_items: Maximum number of items to keep in history (default: 10).
+            near_duplicate_mode: What to do with images that look like an earlier
+                capture: "flag" only marks the new item, "collapse" drops the
+                older ones, None disables perceptual hashing (default: "flag").
+                Collapsing is opt-in since screenshots of the same window with
+                different text can hash within the threshold.
+            near_duplicate_threshold: Largest Hamming distance between two
+                64-bit perceptual hashes considered a near-duplicate (default: 4).
+            ranking: "recency" orders and evicts items by age, "frecency" by a
+                use count that decays over time (default: "recency").
+            pasteboard: Pasteboard to monitor (default: the general pasteboard).
+            cache_dir: Directory for cached media files (default: a
+                "clipboard_cache" directory in the temporary directory).
+            ttls: Optional dict mapping pasteboard types to the number of
+                seconds items of that type are kept (default: no expiry).
         """
         self.max_items = max_items
-        self.history = []
-        self.pasteboard = NSPasteboard.generalPasteboard()
+        self._snapshot = HistorySnapshot()
+        self.near_duplicate_mode = near_duplicate_mode
+        self.near_duplicate_threshold = near_duplicate_threshold
+        self.near_duplicates_collapsed = 0
+        self.image_index = PerceptualHashIndex()
+        self.ranking = ranking
+        self.frecency = FrecencyIndex()
+        self.memory = MemoryAccountant()
+        self.event_poster = QuartzEventPoster()
+        self.facets = FacetIndex()
+        self.paste_queue = None
+        self.delta_encoder = DeltaEncoder()
+        self.background = BackgroundTasks()
+        # Long PDFs get their own worker so they don't hold up hashing and diffs
+        self.text_extractor = TextExtractor()
+        self.extraction = BackgroundTasks(name="text-extraction")
+        self.ttls = dict(ttls or {})
+        self.expiry = ExpiryScheduler()
+        self.time_index = TimestampIndex()
+        self.expired_count = 0
+        self.sync = None
+        self.sync_tasks = None
+        self.sync_interval = 5.0
+        self._next_sync_poll = 0.0
+        self._applying_sync = False
+        self._sync_replayed = False
+        self._sync_compacting = False
+        self.file_validator = FileValidator()
+        self.pressure = None
+        self.pressure_keep_resident = 3
+        self.permission_check = self.check_accessibility_permissions
+        self.recorder = None
+        self.io_stats = {"files_written": 0, "bytes_written": 0, "files_removed": 0,
+                         "payloads_reloaded": 0}
+        set_payload_loader(self._load_payload)
+        self.prefetcher = PayloadPrefetcher(self._load_payload)
+        self.paste_stats = {"promised": 0, "mapped": 0, "requested": 0, "loaded": 0, "failed": 0, "unrequested": 0,
+                            "provided": 0, "bytes_provided": 0, "load_time": 0.0}
+        self._promise_source = None
+        self._cache_sequence = 0
+        self.pasteboard = pasteboard or NSPasteboard.generalPasteboard()
         self.last_change_count = self.pasteboard.changeCount()
         
         # Create cache directory for media files if it doesn't exist
-        self.cache_dir = os.path.join(tempfile.gettempdir(), "clipboard_cache")
+        self.cache_dir = cache_dir or os.path.join(tempfile.gettempdir(), "clipboard_cache")
         os.makedirs(self.cache_dir, exist_ok=True)
     
     def _save_media_to_cache(self, data_bytes, ext):
@@ -73,17 +167,47 @@ class ClipboardHistory:
             str: Path to saved file
         """
         try:
-            filename = f"clip_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{ext}"
+            # The sequence number keeps captures made within the same second apart
+            self._cache_sequence += 1
+            filename = f"clip_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{self._cache_sequence}.{ext}"
             filepath = os.path.join(self.cache_dir, filename)
             
             with open(filepath, 'wb') as f:
                 f.write(data_bytes)
+            self.io_stats["files_written"] += 1
+            self.io_stats["bytes_written"] += len(data_bytes)
                 
             return filepath
         except Exception as e:
             logger.error(f"Error saving media to cache: {e}")
             return None
 
+    def _remove_cached_file(self, path):
+        """
+        Delete a cached media file, if it exists.
+
+        Args:
+            path: Path of the cached file.
+        """
+        try:
+            for cached in (path, self.text_extractor.forget(path)):
+                if cached and os.path.exists(cached):
+                    os.remove(cached)
+                    self.io_stats["files_removed"] += 1
+        except Exception as e:
+            logger.error(f"Error removing cached file: {e}")
+
+    def _record(self, event, item):
+        """
+        Add an event to the workload trace, when recording.
+
+        Args:
+            event: Event name ("capture", "paste" or "delete").
+            item: The ClipboardItem the event applies to.
+        """
+        if self.recorder is not None:
+            self.recorder.record_item(event, item)
+
     def _get_clipboard_content(self):
         """
         Get content from clipboard with type information.
@@ -98,14 +222,17 @@ class ClipboardHistory:
         if NSFilenamesPboardType in types:
             filenames = pb.propertyListForType_(NSFilenamesPboardType)
             if filenames and len(filenames) > 0:
-                file_path = filenames[0]  # Get first file
-                return ClipboardItem(
-                    content=file_path,  # Store the actual file path
+                paths = [str(path) for path in filenames]
+                item = ClipboardItem(
+                    content=paths[0],  # Store the actual path of the first file
                     content_type=NSPasteboardTypeFileURL,
                     raw_data=None,  # We don't need raw data for files
                     timestamp=datetime.now(),
-                    preview=os.path.basename(file_path)
+                    preview=os.path.basename(paths[0])
                 )
+                # Sizes and types are read in the background
+                item.files = tuple(FileInfo(path) for path in paths)
+                return item
         
         # Then check for text content
         if "public.utf8-plain-text" in types:
@@ -154,83 +281,162 @@ class ClipboardHistory:
         
         return None
 
-    def paste_item(self, item):
-        """
-        Copy an item to the current clipboard and simulate paste command.
+    def _write_to_pasteboard(self, item):
         """
-        try:
-            if not self.check_accessibility_permissions():
-                logger.error("Missing accessibility permissions")
-                return False
+        Replace the pasteboard contents with a clipboard item.
 
-            self.pasteboard.clearContents()
+        Args:
+            item: The ClipboardItem to write.
+
+        Returns:
+            bool: True if the pasteboard was written, False otherwise.
+        """
+        if item.files and not any(f.exists for f in item.files):
+            logger.error(f"File does not exist: {item.content}")
+            return False
 
+        self.pasteboard.clearContents()
+        try:
             if item.content_type == NSStringPboardType:
                 # For text content
                 self.pasteboard.setString_forType_(item.content, "public.utf8-plain-text")
                 logger.info("Set text content to clipboard")
-                
+            
             elif item.content_type == NSPasteboardTypeFileURL:
                 # For files, set both the filename list and URL
                 try:
-                    file_path = item.content  # We stored the actual path
-                    if os.path.exists(file_path):
-                        # Set the filenames list
-                        filenames = NSArray.arrayWithObject_(file_path)
-                        success = self.pasteboard.setPropertyList_forType_(filenames, NSFilenamesPboardType)
-                        if not success:
-                            logger.error("Failed to set filenames")
-                            return False
-                            
-                        # Set the file URL
-                        file_url = NSURL.fileURLWithPath_(file_path).absoluteString()
-                        success = self.pasteboard.setString_forType_(file_url, NSPasteboardTypeFileURL)
-                        if not success:
-                            logger.error("Failed to set file URL")
-                            return False
-                            
-                        logger.info(f"Set file to clipboard: {file_path}")
-                        
+                    # Existence comes from the cached metadata, kept fresh by the file validator
+                    if item.files:
+                        paths = [f.path for f in item.files if f.exists]
                     else:
-                        logger.error(f"File does not exist: {file_path}")
+                        paths = [item.content]
+                
+                    # Set the filenames list
+                    filenames = NSArray.arrayWithArray_(paths)
+                    success = self.pasteboard.setPropertyList_forType_(filenames, NSFilenamesPboardType)
+                    if not success:
+                        logger.error("Failed to set filenames")
                         return False
-                        
+                    
+                    # Set the file URL
+                    file_url = NSURL.fileURLWithPath_(paths[0]).absoluteString()
+                    success = self.pasteboard.setString_forType_(file_url, NSPasteboardTypeFileURL)
+                    if not success:
+                        logger.error("Failed to set file URL")
+                        return False
+                    
+                    logger.info(f"Set {len(paths)} files to clipboard: {paths[0]}")
+                    
                 except Exception as e:
                     logger.error(f"Error setting file to clipboard: {e}")
                     return False
-                
-            elif item.raw_data is not None:
-                # For binary content (images, PDFs, RTF)
-                success = self.pasteboard.setData_forType_(item.raw_data, item.content_type)
-                if not success:
-                    logger.error(f"Failed to set {item.content_type} data")
+            
+            elif item.is_binary:
+                # For binary content (images, PDFs, RTF), only the types are
+                # promised; the data is supplied when the receiving app reads it.
+                # A shed payload is mapped now, which costs no reads, so the
+                # promise still holds after the item or the cache is deleted.
+                self.prefetcher.claim(item, wait=False)
+                if item.payload_resident:
+                    payload = item.raw_data
+                else:
+                    payload = self._map_payload(item.content)
+                    self.paste_stats["mapped"] += payload is not None
+                provider = PayloadProvider(item.content, promise_types(item.content_type), self._map_payload,
+                                           resident=payload, stats=self.paste_stats)
+                if not self._write_promise(provider):
+                    logger.error(f"Failed to promise {item.content_type} data")
                     return False
-                    
-                # For images, also set both PNG and TIFF types
-                if item.content_type in (NSPasteboardTypePNG, NSPasteboardTypeTIFF):
-                    self.pasteboard.setData_forType_(item.raw_data, NSPasteboardTypePNG)
-                    self.pasteboard.setData_forType_(item.raw_data, NSPasteboardTypeTIFF)
-                
-                logger.info(f"Set binary content to clipboard: {item.content_type}")
+            
+                logger.info(f"Promised binary content to clipboard: {item.content_type}")
 
-            # Simulate Cmd+V
-            from Quartz import (CGEventCreateKeyboardEvent,
-                              CGEventPost,
-                              kCGHIDEventTap,
-                              kCGEventFlagMaskCommand)
-            import time
+            return True
+        finally:
+            # Our own writes aren't captures; re-reading them would resolve the promise
+            self.last_change_count = self.pasteboard.changeCount()
+
+    def _write_promise(self, provider):
+        """
+        Put a pasteboard item promising the provider's types on the pasteboard.
+
+        Pasteboards implementing write_promises(provider), like the fake one
+        used for replays, are handed the provider directly.
+
+        Returns:
+            bool: True if the pasteboard accepted the item.
+        """
+        self.paste_stats["promised"] += 1
+        writer = getattr(self.pasteboard, "write_promises", None)
+        if writer is not None:
+            return writer(provider)
+        source = PromiseDataSource.alloc().initWithProvider_(provider)
+        pasteboard_item = NSPasteboardItem.alloc().init()
+        if not pasteboard_item.setDataProvider_forTypes_(source, NSArray.arrayWithArray_(provider.types)):
+            return False
+        # The data source must outlive the write, until the pasteboard is done with it
+        self._promise_source = source
+        return bool(self.pasteboard.writeObjects_([pasteboard_item]))
+
+    def _map_payload(self, path):
+        """
+        Map a payload's cache file for a promised paste.
 
+        The file is mapped rather than read, so its pages are only loaded as
+        the pasteboard copies them, and the mapping stays readable after the
+        file is deleted.
+
+        Returns:
+            NSData: The payload, or None if the file can't be read.
+        """
+        data, error = NSData.dataWithContentsOfFile_options_error_(path, NSDataReadingMappedIfSafe, None)
+        if data is None:
+            logger.error(f"Error mapping payload {path}: {error}")
+        return data
+
+    def get_paste_stats(self):
+        """
+        Report promised pastes and the payloads actually supplied.
+
+        Returns:
+            dict: Counts of promises, shed payloads mapped when promised,
+                  requests by receiving applications, payloads loaded (when
+                  mapping failed), failed and never requested, bytes
+                  provided and time spent loading in seconds.
+        """
+        return dict(self.paste_stats)
+
+    def _write_text_to_pasteboard(self, text):
+        """
+        Replace the pasteboard contents with plain text.
+
+        Returns:
+            bool: True if the pasteboard was written, False otherwise.
+        """
+        self.pasteboard.clearContents()
+        written = bool(self.pasteboard.setString_forType_(text, "public.utf8-plain-text"))
+        self.last_change_count = self.pasteboard.changeCount()
+        return written
+
+    def paste_item(self, item):
+        """
+        Copy an item to the current clipboard and simulate paste command.
+        """
+        try:
+            if not self.permission_check():
+                logger.error("Missing accessibility permissions")
+                return False
+
+            if not self._write_to_pasteboard(item):
+                return False
+
+            # Simulate Cmd+V
             try:
-                v_keycode = 9  # 'v' key
-                v_down = CGEventCreateKeyboardEvent(None, v_keycode, True)
-                CGEventSetFlags(v_down, kCGEventFlagMaskCommand)
-                v_up = CGEventCreateKeyboardEvent(None, v_keycode, False)
-                
-                CGEventPost(kCGHIDEventTap, v_down)
+                self.event_poster.post_key(V_KEYCODE, True, command=True)
                 time.sleep(0.1)
-                CGEventPost(kCGHIDEventTap, v_up)
+                self.event_poster.post_key(V_KEYCODE, False)
                 
                 logger.info("Paste command simulated")
+                self._item_pasted(item)
                 return True
                 
             except Exception as e:
@@ -241,52 +447,901 @@ class ClipboardHistory:
             logger.error(f"Error during paste operation: {e}")
             return False
 
+    def _item_pasted(self, item):
+        """
+        Count a paste towards the item's frecency and add it to the workload trace.
+
+        Args:
+            item: The ClipboardItem that was pasted.
+        """
+        self.frecency.touch(item)
+        self._record("paste", item)
+        self._move_to_front(item)
+
+    def _move_to_front(self, item):
+        """
+        Make a pasted item the newest in the history.
+
+        Our own pasteboard writes aren't captured, so this stands in for the
+        recapture that used to move a pasted item to the top.
+
+        Args:
+            item: The ClipboardItem that was pasted.
+        """
+        index = self.history.index_of(item)
+        if index < 0:
+            return
+        item.timestamp = None
+        self.time_index.add(item)
+        if index > 0:
+            self._commit(self.history.remove_at(index).prepend(item))
+
+    def paste_items(self, items, separator=None, on_finished=None):
+        """
+        Paste several items in sequence without blocking the main thread.
+
+        Args:
+            items: The ClipboardItem objects to paste, in order.
+            separator: None, "tab" to press Tab between items, or a string
+                pasted between items.
+            on_finished: Optional callback receiving the PasteQueue when done.
+
+        Returns:
+            PasteQueue: The running queue, or None if pasting can't start.
+        """
+        try:
+            if not self.permission_check():
+                logger.error("Missing accessibility permissions")
+                return None
+
+            if self.paste_queue is not None and self.paste_queue.running:
+                self.paste_queue.cancel()
+
+            self.paste_queue = PasteQueue(
+                self._write_to_pasteboard,
+                self._write_text_to_pasteboard,
+                poster=self.event_poster,
+                separator=separator,
+                on_item_pasted=self._item_pasted,
+                on_finished=on_finished,
+            )
+            self.paste_queue.start(items)
+            return self.paste_queue
+        except Exception as e:
+            logger.error(f"Error starting paste queue: {e}")
+            return None
+
     def check_and_update(self):
         """
         Check if clipboard has changed and update history accordingly.
         """
         try:
+            self.background.drain()
+            self.extraction.drain()
+            self.prefetcher.tasks.drain()
+            self.expire_items()
+            self._poll_sync()
+            if self.file_validator.due():
+                self.validate_files()
+            if self.pressure is not None:
+                self.pressure.check()
             current_count = self.pasteboard.changeCount()
             
             if current_count > self.last_change_count:
                 logger.info("Change detected in clipboard")
+                # Moved on first, so a capture that fails isn't retried (and cached again) every tick
+                self.last_change_count = current_count
                 
                 if item := self._get_clipboard_content():
                     # Remove duplicate if exists
-                    if item.raw_data is not None:
-                        # For binary content, compare raw data
-                        self.history = [h for h in self.history 
-                                      if h.content_type != item.content_type or 
-                                      h.raw_data.bytes().tobytes() != item.raw_data.bytes().tobytes()]
+                    if item.is_binary:
+                        # For binary content, compare raw data; sizes are checked
+                        # first so shed payloads are only reloaded when they may match
+                        size = item.payload_size()
+                        payload = item.raw_data.bytes().tobytes()
+
+                        def is_duplicate(h):
+                            if h.content_type != item.content_type or h.payload_size() != size:
+                                return False
+                            data = h.raw_data
+                            if data is None:
+                                # Shed, and its cache file is gone: drop it rather than fail the capture
+                                broken.append(h)
+                                return False
+                            return data.bytes().tobytes() == payload
+                    elif item.files:
+                        # For files, compare the whole set of paths
+                        paths = item.file_paths()
+                        is_duplicate = lambda h: h.files is not None and h.file_paths() == paths
                     else:
-                        # For text content, compare the actual content
-                        self.history = [h for h in self.history if h.content != item.content]
+                        # For text content, compare the actual content; lengths are
+                        # checked first so delta-encoded items are only decoded when they may match
+                        text = item.content
+                        length = len(text)
+                        is_duplicate = lambda h: h.text_length() == length and h.content == text
+                    broken = []
+                    duplicates = [h for h in self.history if is_duplicate(h)]
+                    snapshot = self.history
+                    if duplicates or broken:
+                        duplicate_ids = {id(h) for h in chain(duplicates, broken)}
+                        snapshot = snapshot.filter(lambda h: id(h) not in duplicate_ids)
+                    snapshot = snapshot.prepend(item)
+                    for h in duplicates:
+                        self.frecency.transfer(h, item)
+                    self.frecency.touch(item)
                     
-                    self.history.insert(0, item)
+                    # Clean up old items
+                    evicted = self._select_evictions(snapshot, item)
+                    if self.ranking == "frecency" and evicted:
+                        evicted_ids = {id(h) for h in evicted}
+                        snapshot = snapshot.filter(lambda h: id(h) not in evicted_ids)
+                    self._commit(snapshot.truncate(self.max_items))
+                    for h in chain(duplicates, broken):
+                        self._forget(h)
+                    for h in broken:
+                        self._remove_cached_file(h.preview)
                     logger.info(f"Added to history: {item.content_type}")
+                    self._schedule_added(item)
                     
-                    # Clean up old items
-                    while len(self.history) > self.max_items:
-                        old_item = self.history.pop()
-                        if old_item.raw_data is not None and old_item.preview:
-                            try:
-                                if os.path.exists(old_item.preview):
-                                    os.remove(old_item.preview)
-                            except Exception as e:
-                                logger.error(f"Error removing cached file: {e}")
-                
-                self.last_change_count = current_count
+                    self._record("capture", item)
+                    self._publish_removes(duplicates)
+                    self._publish_add(item)
+                    
+                    for old_item in evicted:
+                        self._forget(old_item)
+                        if old_item.is_binary:
+                            self._remove_cached_file(old_item.preview)
         except Exception as e:
             logger.error(f"Error updating history: {e}")
 
+    def _schedule_added(self, item):
+        """
+        Index a new item, start its expiry timer and its background analysis.
+
+        Args:
+            item: The ClipboardItem that was just added to the history.
+        """
+        self.time_index.add(item)
+        ttl = self.ttls.get(item.content_type)
+        if ttl is not None:
+            self.expiry.schedule(item, item.epoch + ttl)
+        self._schedule_image_hash(item)
+        self._schedule_text_delta(item)
+        self._schedule_classification(item)
+        self._schedule_text_extraction(item)
+        if item.files:
+            self.background.submit(stat_files, item.file_paths(),
+                                   on_done=lambda results: update_file_info(item, results))
+
+    def validate_files(self):
+        """
+        Re-check the files of every file item in one background pass.
+
+        The results update the items' cached metadata, which is what the
+        popup and paste code read; they never touch the filesystem.
+        """
+        items = [h for h in self.history if h.files]
+        self.file_validator.start()
+        if not items:
+            self.file_validator.running = False
+            return
+        paths = [f.path for h in items for f in h.files]
+
+        def check():
+            # Always returns, so done() runs and the validator isn't left running
+            start = time.perf_counter()
+            try:
+                results = stat_files(paths)
+            except Exception as e:
+                logger.error(f"Error validating files: {e}")
+                results = {}
+            return results, time.perf_counter() - start
+
+        def done(outcome):
+            changed = self.file_validator.finish(items, *outcome)
+            if changed:
+                logger.info(f"File validation: {len(changed)} items changed availability")
+
+        self.background.submit(check, on_done=done)
+
+    def expire_items(self, now=None):
+        """
+        Remove the items whose time-to-live has run out.
+
+        Only the expiring items are visited; they go through the same
+        single-commit cleanup as other removals.
+
+        Args:
+            now: Current time in epoch seconds (default: now).
+
+        Returns:
+            int: Number of items removed.
+        """
+        expired = self.expiry.pop_expired(time.time() if now is None else now)
+        if not expired:
+            return 0
+        try:
+            # Recorded first: dropping deletes the cache files
+            for h in expired:
+                self._record("expire", h)
+            self._drop_items(expired, publish=False)
+            self.expired_count += len(expired)
+            logger.info(f"Expired {len(expired)} items")
+        except Exception as e:
+            logger.error(f"Error expiring items: {e}")
+        return len(expired)
+
+    def set_item_ttl(self, item, ttl):
+        """
+        Set how long an item is kept, overriding the TTL of its type.
+
+        Args:
+            item: The ClipboardItem, which must be in the history.
+            ttl: Seconds from now until the item expires, or None to keep it
+                until it is evicted.
+
+        Returns:
+            bool: True if the item is in the history and was updated.
+        """
+        if item not in self.history:
+            return False
+        if ttl is None:
+            self.expiry.cancel(item)
+        else:
+            self.expiry.schedule(item, time.time() + ttl)
+        return True
+
+    def get_expiry(self, item):
+        """
+        Get when an item expires.
+
+        Returns:
+            float: Expiry time in epoch seconds, or None if it doesn't expire.
+        """
+        return self.expiry.deadline(item)
+
+    def enable_memory_pressure(self, source=None, interval=2.0):
+        """
+        Shed cached data when the system is under memory pressure.
+
+        Resident payloads are dropped from the warn level, except for the
+        newest pressure_keep_resident items, and from every item at the
+        critical level, along with the extracted text of documents. Payloads
+        are reloaded from their cache file when next used, and the text from
+        its cache once the pressure is back to normal. Further stages, like
+        the popup's thumbnails, can be registered on the returned policy.
+
+        Args:
+            source: Pressure source (default: the system level from sysctl).
+            interval: Minimum number of seconds between checks (default: 2).
+
+        Returns:
+            MemoryPressurePolicy: The policy, checked on every clipboard tick.
+        """
+        self.pressure = MemoryPressurePolicy(source or SysctlPressureSource(), interval)
+        self.pressure.register("payloads", LEVEL_WARN, self._shed_payloads, priority=1)
+        self.pressure.register("previews", LEVEL_CRITICAL, self._shed_extracted_text,
+                               restore=self._restore_extracted_text, priority=2)
+        return self.pressure
+
+    def _shed_payloads(self):
+        """
+        Drop resident payloads, keeping the newest ones below the critical level.
+
+        Payloads prefetched for the open popup are kept until it closes; the
+        prefetcher's byte cap bounds them.
+        """
+        keep = 0 if self.pressure.level >= LEVEL_CRITICAL else self.pressure_keep_resident
+        freed = 0
+        for index, item in enumerate(self.history):
+            if index >= keep and not self.prefetcher.holds(item):
+                freed += item.shed_payload()
+        return freed
+
+    def _shed_extracted_text(self):
+        """
+        Drop the extracted text of documents whose text is cached on disk.
+        """
+        freed = 0
+        for item in self.history:
+            if item.extracted_text is not None and item.is_binary:
+                freed += sys.getsizeof(item.extracted_text)
+                item.extracted_text = None
+        return freed
+
+    def _restore_extracted_text(self):
+        """
+        Read the shed document text back from the text cache in the background.
+        """
+        for item in self.history:
+            if (item.content_type in EXTRACTABLE_TYPES and item.is_binary
+                    and item.extracted_text is None):
+                self.extraction.submit(self.text_extractor.cached_text, item.preview,
+                                       on_done=lambda text, item=item: self._apply_restored_text(item, text))
+
+    def _apply_restored_text(self, item, text):
+        if text and item.extracted_text is None and item in self.history:
+            item.extracted_text = text
+
+    def _load_payload(self, path):
+        """
+        Read a shed payload back from its cache file.
+
+        Args:
+            path: The item's cache file.
+
+        Returns:
+            NSData: The payload, or None if the file can't be read.
+        """
+        data = NSData.dataWithContentsOfFile_(path)
+        if data is None:
+            logger.error(f"Error reloading payload from {path}")
+            return None
+        self.io_stats["payloads_reloaded"] += 1
+        return data
+
+    def get_prefetch_stats(self):
+        """
+        Report how often pasted payloads had been prefetched.
+
+        Returns:
+            dict: See PayloadPrefetcher.report().
+        """
+        return self.prefetcher.report()
+
+    def get_pressure_stats(self):
+        """
+        Report the memory pressure level and the bytes freed by each stage.
+
+        Returns:
+            dict: See MemoryPressurePolicy.stats, plus the current "level",
+                  or None if the policy isn't enabled.
+        """
+        if self.pressure is None:
+            return None
+        return dict(self.pressure.stats, level=self.pressure.level)
+
+    def enable_sync(self, folder, device_id=None, interval=5.0):
+        """
+        Mirror the history to a shared folder and merge other devices' changes.
+
+        Captures and removals are appended to this device's log in the
+        folder; other devices' logs are polled every interval seconds. The
+        first poll also replays this device's own log, restoring the history
+        of a previous session; each poll reads the blobs of at most max_items
+        additions. This device's log is compacted to the items still in its
+        history once it has grown enough.
+
+        Only captures and explicit removals are synced. Evictions, expiry and
+        near-duplicate collapsing stay local: each device applies its own
+        max_items, TTLs and near-duplicate mode.
+
+        Args:
+            folder: The shared sync folder.
+            device_id: Identifier of this device (default: from the host name).
+            interval: Seconds between polls of the other devices' logs.
+        """
+        try:
+            self.sync = FolderSync(folder, device_id)
+            self.sync_tasks = BackgroundTasks(name="history-sync")
+            self.sync_interval = interval
+            self._next_sync_poll = 0.0
+            self._sync_replayed = False
+            self._sync_compacting = False
+            logger.info(f"Syncing history through {folder} as {self.sync.device_id}")
+        except Exception as e:
+            logger.error(f"Error enabling history sync: {e}")
+            self.sync = None
+
+    def _publish_add(self, item):
+        """
+        Append a captured item to the sync log in the background.
+
+        Args:
+            item: The ClipboardItem that was just added to the history.
+        """
+        if self.sync is None or self._applying_sync:
+            return
+        record = {"uid": item.ensure_uid(), "type": item.content_type, "epoch": item.epoch}
+        if not item.is_binary:
+            record["text"] = item.content
+            if item.files:
+                record["files"] = list(item.file_paths())
+            self.sync_tasks.submit(self.sync.publish_add, record)
+        else:
+            data = item.raw_data
+            self.sync_tasks.submit(lambda: self.sync.publish_add(record, data.bytes().tobytes()))
+
+    def _publish_removes(self, items):
+        """
+        Append removed items to the sync log in the background.
+
+        Args:
+            items: The ClipboardItem objects removed from the history.
+        """
+        if self.sync is None or self._applying_sync:
+            return
+        for h in items:
+            # Items without a uid were never published
+            if h.uid is not None:
+                self.sync_tasks.submit(self.sync.publish_remove, h.uid)
+
+    def _poll_sync(self):
+        """
+        Start a background poll of the sync folder when one is due.
+        """
+        if self.sync is None:
+            return
+        self.sync_tasks.drain()
+        if time.monotonic() < self._next_sync_poll:
+            return
+        self._next_sync_poll = time.monotonic() + self.sync_interval
+        # Only once our own log has been replayed, or the checkpoint would drop it
+        if (self._sync_replayed and not self._sync_compacting
+                and self.sync.needs_compaction(len(self.history))):
+            self._sync_compacting = True
+            live_uids = [h.uid for h in self.history if h.uid is not None]
+            self.sync_tasks.submit(self.sync.compact, live_uids, on_done=self._sync_compacted)
+        self.sync_tasks.submit(self.sync.poll, self.max_items, on_done=self._apply_sync_changes)
+
+    def _sync_compacted(self, _):
+        self._sync_compacting = False
+
+    def _item_from_sync(self, entry, blob):
+        """
+        Build a ClipboardItem from a sync log entry.
+
+        Returns:
+            ClipboardItem: The item, or None if its blob can't be cached.
+        """
+        content_type = entry["type"]
+        if blob is None:
+            text = entry.get("text", "")
+            preview = os.path.basename(text) if content_type == NSPasteboardTypeFileURL else truncate_preview(text)
+            item = ClipboardItem(text, content_type, timestamp=entry["epoch"], preview=preview, uid=entry["uid"])
+            if entry.get("files"):
+                item.files = tuple(FileInfo(path) for path in entry["files"])
+            return item
+        ext = {NSPDFPboardType: "pdf", NSPasteboardTypeRTF: "rtf"}.get(content_type, "png")
+        filepath = self._save_media_to_cache(blob, ext)
+        if not filepath:
+            return None
+        return ClipboardItem(filepath, content_type, raw_data=NSData.dataWithBytes_length_(blob, len(blob)),
+                             timestamp=entry["epoch"], preview=filepath, uid=entry["uid"])
+
+    def _apply_sync_changes(self, changes):
+        """
+        Apply the changes read from the sync folder in a single commit.
+
+        Runs on the main thread from the sync task queue. Remote items are
+        inserted by capture time. When two items have the same content, the
+        one with the later (timestamp, uid) is kept on every device.
+
+        Args:
+            changes: The changes returned by FolderSync.poll().
+        """
+        self._sync_replayed = True
+        if not changes:
+            return
+        # Only the last change of each item matters
+        latest = {}
+        for op, entry, blob in changes:
+            latest[entry["uid"]] = (op, entry, blob)
+
+        snapshot = self.history
+        by_uid = {h.uid: h for h in snapshot if h.uid is not None}
+        dropped = [by_uid[uid] for uid, (op, _, _) in latest.items() if op == "remove" and uid in by_uid]
+        dropped_ids = {id(h) for h in dropped}
+        text_items = {h.file_paths() or h.content: h for h in snapshot
+                      if not h.is_binary and id(h) not in dropped_ids}
+        added = []
+        for uid, (op, entry, blob) in latest.items():
+            if op != "add" or uid in by_uid:
+                continue
+            item = self._item_from_sync(entry, blob)
+            if item is None:
+                continue
+            if blob is None:
+                existing = text_items.get(item.file_paths() or item.content)
+            else:
+                existing = next((h for h in chain(snapshot, added) if id(h) not in dropped_ids
+                                 and h.is_binary and h.content_type == item.content_type
+                                 and h.payload_size() == len(blob)
+                                 and h.raw_data is not None and h.raw_data.bytes().tobytes() == blob), None)
+            if existing is not None:
+                loser = min(existing, item, key=lambda h: (h.epoch, h.uid or ""))
+                if loser is not existing:
+                    if item.is_binary:
+                        self._remove_cached_file(item.preview)
+                    continue
+                if any(h is existing for h in added):
+                    added = [h for h in added if h is not existing]
+                    if existing.is_binary:
+                        self._remove_cached_file(existing.preview)
+                else:
+                    dropped.append(existing)
+                    dropped_ids.add(id(existing))
+            if blob is None:
+                text_items[item.file_paths() or item.content] = item
+            added.append(item)
+
+        if not dropped and not added:
+            return
+        if dropped:
+            snapshot = snapshot.filter(lambda h: id(h) not in dropped_ids)
+        for item in sorted(added, key=lambda h: h.epoch):
+            # Newest first: skip past the items captured later than this one
+            low, high = 0, len(snapshot)
+            while low < high:
+                middle = (low + high) // 2
+                if snapshot[middle].epoch > item.epoch:
+                    low = middle + 1
+                else:
+                    high = middle
+            snapshot = snapshot.insert(low, item)
+            self.frecency.touch(item, now=item.epoch)
+
+        evicted = self._select_evictions(snapshot, None)
+        if self.ranking == "frecency" and evicted:
+            evicted_ids = {id(h) for h in evicted}
+            snapshot = snapshot.filter(lambda h: id(h) not in evicted_ids)
+        self._commit(snapshot.truncate(self.max_items))
+
+        self._applying_sync = True
+        try:
+            for h in dropped + evicted:
+                self._forget(h)
+                if h.is_binary:
+                    self._remove_cached_file(h.preview)
+            for item in added:
+                if item not in evicted:
+                    self._schedule_added(item)
+        finally:
+            self._applying_sync = False
+        logger.info(f"Merged sync changes: {len(added)} added, {len(dropped)} removed, {len(evicted)} evicted")
+
+    def get_sync_stats(self):
+        """
+        Report the sync log traffic.
+
+        Returns:
+            dict: See FolderSync.stats, or None if sync isn't enabled.
+        """
+        return None if self.sync is None else dict(self.sync.stats, device=self.sync.device_id)
+
+    def get_file_stats(self):
+        """
+        Report the file validation passes.
+
+        Returns:
+            dict: See FileValidator.stats.
+        """
+        return dict(self.file_validator.stats)
+
+    def _select_evictions(self, snapshot, new_item):
+        """
+        Choose the items to drop when a snapshot exceeds max_items.
+
+        Args:
+            snapshot: The HistorySnapshot including the new item.
+            new_item: The item just captured, which is never evicted.
+
+        Returns:
+            list: The ClipboardItem objects to evict.
+        """
+        excess = len(snapshot) - self.max_items
+        if excess <= 0:
+            return []
+        if self.ranking == "frecency":
+            return list(islice((h for h in self.frecency.lowest() if h is not new_item), excess))
+        return snapshot.oldest(excess)
+
+    def _schedule_image_hash(self, item):
+        """
+        Compute the perceptual hash of a new image capture in the background.
+
+        Args:
+            item: The ClipboardItem that was just added to the history.
+        """
+        if self.near_duplicate_mode is None or not item.is_binary:
+            return
+        if item.content_type not in (NSPasteboardTypePNG, NSPasteboardTypeTIFF):
+            return
+        self.background.submit(compute_image_hash, item.raw_data,
+                               on_done=lambda value: self._apply_image_hash(item, value))
+
+    def _apply_image_hash(self, item, value):
+        """
+        Record an image hash and collapse or flag near-duplicates of the item.
+
+        Runs on the main thread from the background task queue.
+
+        Args:
+            item: The ClipboardItem the hash was computed for.
+            value: The perceptual hash, or None if the image couldn't be decoded.
+        """
+        if value is None or item not in self.history:
+            return
+
+        item.phash = value
+        matches = [(match, distance) for match, distance
+                   in self.image_index.find_within(value, self.near_duplicate_threshold)
+                   if match is not item]
+
+        if matches and self.near_duplicate_mode == "collapse":
+            collapsed = [match for match, distance in matches if match in self.history]
+            self._drop_items(collapsed, publish=False)
+            self.near_duplicates_collapsed += len(collapsed)
+            logger.info(f"Collapsed {len(collapsed)} near-duplicate image(s) "
+                        f"(closest distance {matches[0][1]})")
+        elif matches:
+            # Only the distance: a reference would keep the earlier image and its payload alive
+            item.near_duplicate_distance = matches[0][1]
+            logger.info(f"Flagged near-duplicate image (distance {matches[0][1]})")
+
+        self.image_index.add(item, value)
+
+    def _schedule_text_delta(self, item):
+        """
+        Look for a similar recent text clip and delta-encode the item against it.
+
+        The diff runs in the background; until it completes the item keeps its
+        full text, so capture and paste never wait on it.
+
+        Args:
+            item: The ClipboardItem that was just added to the history.
+        """
+        if item.content_type != NSStringPboardType or not self.delta_encoder.accepts(item.content):
+            return
+
+        candidates = []
+        for h in islice(self.history, 1, None):
+            if len(candidates) >= self.delta_encoder.window:
+                break
+            if (h.content_type == NSStringPboardType and
+                    h.delta_depth < self.delta_encoder.max_chain and
+                    self.delta_encoder.accepts(h.content)):
+                candidates.append((h, h.content))
+        if not candidates:
+            return
+
+        self.background.submit(self.delta_encoder.encode, item.content, candidates,
+                               on_done=lambda result: self._apply_text_delta(item, result))
+
+    def _apply_text_delta(self, item, result):
+        """
+        Store an item as a delta once the background diff has found a base.
+
+        Runs on the main thread from the background task queue.
+
+        Args:
+            item: The ClipboardItem that was encoded.
+            result: (base, delta) returned by DeltaEncoder.encode(), or None.
+        """
+        if result is None or item.delta is not None:
+            return
+        if item not in self.history:
+            return
+
+        base, delta = result
+        full_size = len(item.content)
+        item.store_as_delta(base, delta)
+        logger.info(f"Stored text as delta: {item.stored_size()} of {full_size} characters "
+                    f"(chain depth {item.delta_depth})")
+
+    def _schedule_classification(self, item):
+        """
+        Classify a new text capture in the background and index its tags.
+
+        Documents are classified once their text has been extracted.
+
+        Args:
+            item: The ClipboardItem that was just added to the history.
+        """
+        if item.content_type == NSStringPboardType:
+            text = item.content
+        else:
+            text = item.extracted_text
+        if not text:
+            return
+        self.background.submit(classify, text,
+                               on_done=lambda tags: self._apply_classification(item, tags))
+
+    def _apply_classification(self, item, tags):
+        """
+        Record an item's tags and add it to the facet indexes.
+
+        Runs on the main thread from the background task queue.
+
+        Args:
+            item: The ClipboardItem that was classified.
+            tags: The tags returned by classify().
+        """
+        if not tags or item not in self.history:
+            return
+        item.tags = tags
+        self.facets.add(item, tags)
+
+    def _schedule_text_extraction(self, item):
+        """
+        Extract the text of a new RTF or PDF capture in the background.
+
+        Args:
+            item: The ClipboardItem that was just added to the history.
+        """
+        if item.content_type not in EXTRACTABLE_TYPES or not item.is_binary:
+            return
+        self.extraction.submit(self.text_extractor.extract, item.content_type, item.raw_data,
+                               item.preview,
+                               on_done=lambda text: self._apply_text_extraction(item, text))
+
+    def _apply_text_extraction(self, item, text):
+        """
+        Attach extracted text to a document item and classify it.
+
+        Runs on the main thread from the extraction task queue.
+
+        Args:
+            item: The ClipboardItem the text was extracted from.
+            text: The extracted text, or None if extraction failed.
+        """
+        if not text or item not in self.history:
+            return
+        item.extracted_text = text
+        self._schedule_classification(item)
+
+    def get_extraction_stats(self):
+        """
+        Report text extraction counts, time and cache hit rate.
+
+        Returns:
+            dict: See TextExtractor.stats().
+        """
+        return self.text_extractor.stats()
+
+    def get_items_with_tag(self, tag):
+        """
+        Get the history items carrying a content tag, newest first.
+
+        Must be called from the main thread.
+
+        Args:
+            tag: One of content_classifier.TAGS (e.g. "url").
+
+        Returns:
+            list: The matching ClipboardItem objects.
+        """
+        return self.facets.items(tag)
+
+    def get_items_between(self, start=None, end=None):
+        """
+        Get the history items captured within a time range, newest first.
+
+        Must be called from the main thread.
+
+        Args:
+            start: Earliest capture time included (datetime or epoch seconds),
+                or None for no lower bound.
+            end: Latest capture time included (datetime or epoch seconds), or
+                None for no upper bound.
+
+        Returns:
+            list: The matching ClipboardItem objects.
+        """
+        if isinstance(start, datetime):
+            start = start.timestamp()
+        if isinstance(end, datetime):
+            end = end.timestamp()
+        return self.time_index.between(start, end)
+
+    def get_delta_stats(self):
+        """
+        Report how much text storage delta encoding saves across the history.
+
+        Returns:
+            dict: Counts of text and delta-encoded items, the logical text size,
+                  the size actually stored and the difference, in characters.
+        """
+        stats = {"text_items": 0, "delta_items": 0, "logical_size": 0, "stored_size": 0}
+        text_code = type_code(NSStringPboardType)
+        for h in self.history:
+            if h.type_code != text_code:
+                continue
+            stats["text_items"] += 1
+            stats["delta_items"] += h.delta is not None
+            stats["logical_size"] += h.text_length()
+            stats["stored_size"] += h.stored_size()
+        stats["saved_size"] = stats["logical_size"] - stats["stored_size"]
+        return stats
+
+    def get_memory_report(self):
+        """
+        Account for the memory held by the history, per content type.
+
+        Returns:
+            dict: See MemoryAccountant.report().
+        """
+        return self.memory.report(self._snapshot)
+
+    def _forget(self, item):
+        """
+        Drop an item that left the history from the side indexes.
+
+        Args:
+            item: The ClipboardItem that was removed.
+        """
+        self.image_index.remove(item)
+        self.frecency.remove(item)
+        self.memory.release_decoded(item)
+        self.facets.remove(item)
+        self.expiry.cancel(item)
+        self.time_index.remove(item)
+        if self.recorder is not None:
+            self.recorder.forget(item)
+
+    @property
+    def history(self):
+        """
+        The current history snapshot, newest item first.
+        """
+        return self._snapshot
+
+    def _commit(self, snapshot):
+        """
+        Publish a new history snapshot.
+
+        Readers holding the previous snapshot keep a consistent view; only the
+        main thread commits.
+
+        Args:
+            snapshot: The HistorySnapshot replacing the current one.
+        """
+        self._snapshot = snapshot
+
     def get_history(self):
         """
         Get the current clipboard history.
 
+        The result is an immutable HistorySnapshot: it can be indexed and
+        iterated like a list and won't change while it is being read.
+
         Returns:
-            list: List of ClipboardItem objects
+            HistorySnapshot: The ClipboardItem objects, newest first
+        """
+        return self._snapshot
+
+    def get_ranked_history(self):
         """
-        return self.history
+        Get the history in display order for the configured ranking.
+
+        With "frecency" ranking the frecency index is read, so this must be
+        called from the main thread.
+
+        Returns:
+            HistorySnapshot or list: ClipboardItem objects, best ranked first
+        """
+        if self.ranking == "frecency":
+            return list(self.frecency.ranked())
+        return self._snapshot
+
+    def resolve_index(self, index, item):
+        """
+        Find the current index of an item that was displayed at a given index.
+
+        Detects stale indices, e.g. a click on a row whose item has moved or
+        been removed since the view was built.
+
+        Args:
+            index: Index the item had in the snapshot the caller read.
+            item: The ClipboardItem the caller expects at that index.
+
+        Returns:
+            int: The item's current index, or -1 if it is no longer in history.
+        """
+        snapshot = self._snapshot
+        if 0 <= index < len(snapshot) and snapshot[index] is item:
+            return index
+        return snapshot.index_of(item)
     
     def check_accessibility_permissions(self):
         """
@@ -300,12 +1355,14 @@ class ClipboardHistory:
         
         return bool(AXIsProcessTrusted())
 
-    def remove_item(self, index):
+    def remove_item(self, index, item=None):
         """
         Remove an item from the history.
 
         Args:
             index: Integer index of the item to remove.
+            item: Optional ClipboardItem expected at that index; if the history
+                changed since the index was read, the item is located again.
 
         Returns:
             bool: True if item was successfully removed, False otherwise.
@@ -314,38 +1371,120 @@ class ClipboardHistory:
             Exception: If there's an error removing the item.
         """
         try:
+            if item is not None:
+                index = self.resolve_index(index, item)
             if 0 <= index < len(self.history):
-                removed_item = self.history.pop(index)
+                removed_item = self.history[index]
+                self._record("delete", removed_item)
+                self._drop_items([removed_item])
                 logger.info(f"Item removed from history: {removed_item.content_type} content")
                 
-                # Clean up preview file for media types
-                if removed_item.raw_data is not None:
-                    try:
-                        os.remove(removed_item.preview)
-                    except Exception as e:
-                        logger.error(f"Error removing cached file: {e}")
-                
                 return True
             return False
         except Exception as e:
             logger.error(f"Error removing item: {e}")
             return False
 
+    def remove_items(self, predicate=None, content_types=None, min_age=None, max_age=None, items=None):
+        """
+        Remove every item matching all the given criteria in a single pass.
+
+        The history is scanned once, the survivors are published in one
+        commit and the cached files of the removed items are deleted together
+        afterwards, so the cost doesn't grow with one rebuild per item.
+
+        Args:
+            predicate: Optional function taking a ClipboardItem and returning
+                True for items to remove.
+            content_types: Optional collection of pasteboard types to remove.
+            min_age: Optional age in seconds; only older items are removed.
+            max_age: Optional age in seconds; only younger items are removed.
+            items: Optional collection of ClipboardItem objects (e.g. a
+                selection); only these are removed.
+
+        Returns:
+            dict: Number of items "removed" and "scanned", and the "elapsed"
+                  time in seconds.
+
+        Raises:
+            ValueError: If no criteria were given (use clear_history instead).
+        """
+        if predicate is None and content_types is None and min_age is None and max_age is None and items is None:
+            raise ValueError("no removal criteria given")
+
+        start = time.perf_counter()
+        now = time.time()
+        codes = None
+        if content_types is not None:
+            codes = {type_code(content_type) for content_type in content_types}
+        selected = None if items is None else {id(item) for item in items}
+
+        def matches(h):
+            if codes is not None and h.type_code not in codes:
+                return False
+            if selected is not None and id(h) not in selected:
+                return False
+            if min_age is not None and now - h.epoch < min_age:
+                return False
+            if max_age is not None and now - h.epoch >= max_age:
+                return False
+            return predicate is None or predicate(h)
+
+        snapshot = self.history
+        removed = []
+        try:
+            removed = [h for h in snapshot if matches(h)]
+            if removed:
+                for h in removed:
+                    self._record("delete", h)
+                self._drop_items(removed)
+        except Exception as e:
+            logger.error(f"Error removing items: {e}")
+
+        elapsed = time.perf_counter() - start
+        logger.info(f"Removed {len(removed)} of {len(snapshot)} items in {elapsed * 1000:.1f} ms")
+        return {"removed": len(removed), "scanned": len(snapshot), "elapsed": elapsed}
+
+    def _drop_items(self, items, publish=True):
+        """
+        Remove items from the history in one commit and release their resources.
+
+        Args:
+            items: The ClipboardItem objects to remove.
+            publish: Whether other synced devices remove them too; expiry and
+                near-duplicate collapsing are local, like eviction.
+        """
+        dropped_ids = {id(h) for h in items}
+        self._commit(self.history.filter(lambda h: id(h) not in dropped_ids))
+        if publish:
+            self._publish_removes(items)
+        for h in items:
+            self._forget(h)
+        # Clean up preview files for media types once the history no longer refers to them
+        for h in items:
+            if h.is_binary:
+                self._remove_cached_file(h.preview)
+
     def clear_history(self):
         """
         Clear the clipboard history and remove cached files.
         """
         try:
+            self._publish_removes(list(self.history))
+            
             # Remove all cached files
             for item in self.history:
-                if item.preview and os.path.exists(item.preview):
-                    try:
-                        os.remove(item.preview)
-                    except Exception as e:
-                        logger.error(f"Error removing cached file: {e}")
+                if item.is_binary:
+                    self._remove_cached_file(item.preview)
             
             # Clear history list
-            self.history.clear()
+            self._commit(self.history.cleared())
+            self.image_index.clear()
+            self.frecency.clear()
+            self.memory.clear_decoded()
+            self.facets.clear()
+            self.expiry.clear()
+            self.time_index.clear()
             logger.info("Clipboard history cleared")
             
         except Exception as e:
@@ -355,6 +1494,8 @@ class ClipboardHistory:
         """
         Clean up cached files when the object is destroyed.
         """
+        # Quitting must not remove the items from the other synced devices
+        self.sync = None
         self.clear_history()
         try:
             if os.path.exists(self.cache_dir):
@@ -0,0 +1,304 @@
+from datetime import datetime
+import os
+import time
+import uuid
+from text_delta import apply_delta, delta_length, delta_size
+
+PREVIEW_LENGTH = 100
+
+# How an item's preview relates to its content, so common previews don't
+# have to be stored as a second copy of the content
+_PREVIEW_NONE = 0
+_PREVIEW_CONTENT = 1
+_PREVIEW_TRUNCATED = 2
+_PREVIEW_BASENAME = 3
+
+# Shared by all untagged items; each frozenset() call allocates a new object
+_NO_TAGS = frozenset()
+
+# Reads a shed payload back from its cache file; set by the history, which
+# owns the cache and knows how to build NSData
+_payload_loader = None
+
+def set_payload_loader(loader):
+    """
+    Set the function reloading shed payloads.
+
+    Args:
+        loader: Function taking a cache file path and returning the payload
+            (NSData), or None if it can't be read.
+    """
+    global _payload_loader
+    _payload_loader = loader
+
+# Pasteboard type strings are interned into small integer codes shared by all items
+_type_names = []
+_type_codes = {}
+
+def type_code(content_type):
+    """
+    Get the integer code of a pasteboard type, registering it if new.
+
+    Args:
+        content_type: Pasteboard type string (NSStringPboardType, etc.)
+
+    Returns:
+        int: The code identifying the type.
+    """
+    code = _type_codes.get(content_type)
+    if code is None:
+        code = len(_type_names)
+        _type_names.append(content_type)
+        _type_codes[content_type] = code
+    return code
+
+def truncate_preview(text):
+    """
+    Shorten text to the preview length used for text items.
+    """
+    return text[:PREVIEW_LENGTH] + "..." if len(text) > PREVIEW_LENGTH else text
+
+class ClipboardItem:
+    """
+    A single clipboard history entry.
+
+    Items are slotted and keep their metadata compact: the pasteboard type as
+    an integer code, the timestamp as epoch seconds and the preview, when it
+    can be derived from the content, as a small mode flag rather than a copy.
+    The public attributes are properties with the same values as before, but
+    each access converts (timestamp builds a datetime, content decodes a
+    delta), so scans over the history should read type_code, epoch and
+    text_length() instead. A binary item's
+    payload can be shed under memory pressure and is reloaded from its cache
+    file the next time raw_data is read.
+    """
+
+    __slots__ = ("_content", "type_code", "_raw_data", "_shed_size", "epoch", "_preview",
+                 "phash", "near_duplicate_distance", "delta_base", "delta", "delta_depth", "tags",
+                 "extracted_text", "uid", "files")
+
+    def __init__(self, content, content_type, raw_data=None, timestamp=None, preview=None, uid=None):
+        """
+        Initialize a clipboard item.
+
+        Args:
+            content: The content of the clipboard item (text, file path, etc.)
+            content_type: The type of content (NSStringPboardType, etc.)
+            raw_data: Optional NSData object for binary content
+            timestamp: When the item was created (datetime or epoch seconds)
+            preview: Preview text or path for display
+            uid: Identifier shared by the copies of this item on synced
+                devices (default: None; ensure_uid() creates one when the
+                item is first published)
+        """
+        self.content = content
+        self.content_type = content_type
+        self.raw_data = raw_data
+        self.timestamp = timestamp
+        self.preview = preview
+        self.phash = None
+        self.near_duplicate_distance = None
+        self.tags = _NO_TAGS
+        self.extracted_text = None
+        self.uid = uid
+        self.files = None
+
+    @property
+    def content(self):
+        """
+        The item's content, rebuilt from its delta base when delta-encoded.
+        """
+        # _content is read first: store_as_delta clears it only after the delta is set
+        content = self._content
+        if content is not None or self.delta is None:
+            return content
+        return apply_delta(self.delta_base.content, self.delta)
+
+    @content.setter
+    def content(self, value):
+        self._content = value
+        self.delta_base = None
+        self.delta = None
+        self.delta_depth = 0
+
+    @property
+    def raw_data(self):
+        """
+        The item's binary payload (NSData), reloaded if it was shed.
+        """
+        data = self._raw_data
+        if data is None and self._shed_size is not None and _payload_loader is not None:
+            data = _payload_loader(self._content)
+            if data is not None:
+                self._raw_data = data
+                self._shed_size = None
+        return data
+
+    @raw_data.setter
+    def raw_data(self, value):
+        self._raw_data = value
+        self._shed_size = None
+
+    @property
+    def is_binary(self):
+        """
+        Whether the item has a binary payload, resident or shed.
+        """
+        return self._raw_data is not None or self._shed_size is not None
+
+    @property
+    def payload_resident(self):
+        """
+        Whether the item's binary payload is held in memory.
+        """
+        return self._raw_data is not None
+
+    def payload_size(self):
+        """
+        Size of the binary payload in bytes, without reloading it (0 if none).
+        """
+        if self._raw_data is not None:
+            return int(self._raw_data.length())
+        return self._shed_size or 0
+
+    def restore_payload(self, data):
+        """
+        Make a shed payload resident again with data loaded elsewhere.
+
+        Args:
+            data: The payload read from the item's cache file.
+
+        Returns:
+            bool: True if the payload was shed and is now resident.
+        """
+        if self._raw_data is not None or self._shed_size is None:
+            return False
+        self._raw_data = data
+        self._shed_size = None
+        return True
+
+    def shed_payload(self):
+        """
+        Drop the resident payload; it is reloaded from the cache file on use.
+
+        Returns:
+            int: Bytes released (0 if there was nothing to drop).
+        """
+        if self._raw_data is None or not isinstance(self._content, str):
+            return 0
+        size = int(self._raw_data.length())
+        self._raw_data = None
+        self._shed_size = size
+        return size
+
+    @property
+    def content_type(self):
+        """
+        The pasteboard type of the item.
+        """
+        return _type_names[self.type_code]
+
+    @content_type.setter
+    def content_type(self, value):
+        self.type_code = type_code(value)
+
+    @property
+    def timestamp(self):
+        """
+        When the item was created, as a datetime.
+        """
+        return datetime.fromtimestamp(self.epoch)
+
+    @timestamp.setter
+    def timestamp(self, value):
+        if value is None:
+            self.epoch = time.time()
+        elif isinstance(value, datetime):
+            self.epoch = value.timestamp()
+        else:
+            self.epoch = float(value)
+
+    @property
+    def preview(self):
+        """
+        Preview text or path for display.
+        """
+        mode = self._preview
+        if not isinstance(mode, int):
+            return mode
+        if mode == _PREVIEW_NONE:
+            return None
+        content = self.content
+        if mode == _PREVIEW_CONTENT:
+            return content
+        if mode == _PREVIEW_TRUNCATED:
+            return truncate_preview(content)
+        return os.path.basename(content)
+
+    @preview.setter
+    def preview(self, value):
+        content = self._content
+        if value is None:
+            self._preview = _PREVIEW_NONE
+        elif not isinstance(content, str):
+            self._preview = value
+        elif value == content:
+            self._preview = _PREVIEW_CONTENT
+        elif value == truncate_preview(content):
+            self._preview = _PREVIEW_TRUNCATED
+        elif value == os.path.basename(content):
+            self._preview = _PREVIEW_BASENAME
+        else:
+            self._preview = value
+
+    def ensure_uid(self):
+        """
+        Get the item's sync identifier, creating a random one if it has none.
+
+        Only synced items need one, so it isn't allocated for every capture.
+        """
+        if self.uid is None:
+            self.uid = uuid.uuid4().hex
+        return self.uid
+
+    def file_paths(self):
+        """
+        Get the paths of a file item's files (empty for other items).
+        """
+        return tuple(f.path for f in self.files) if self.files else ()
+
+    def store_as_delta(self, base, delta):
+        """
+        Replace the stored text with a delta against another item.
+
+        The base item is referenced directly, so it stays alive for as long as
+        this item needs it, even after leaving the history.
+
+        Args:
+            base: The ClipboardItem the delta is relative to.
+            delta: Instructions produced by text_delta.make_delta().
+        """
+        # Readers on other threads (the query server) see either the old text or the delta
+        self.delta_base = base
+        self.delta_depth = base.delta_depth + 1
+        self.delta = delta
+        self._content = None
+
+    def text_length(self):
+        """
+        Length of the item's text content, without decoding a delta.
+
+        Returns:
+            int: The number of characters, or None if the content isn't text.
+        """
+        if self.delta is not None:
+            return delta_length(self.delta)
+        return len(self._content) if isinstance(self._content, str) else None
+
+    def stored_size(self):
+        """
+        Approximate number of characters held for this item's text.
+        """
+        if self.delta is not None:
+            return delta_size(self.delta)
+        return len(self._content) if isinstance(self._content, str) else 0
@@ -0,0 +1,170 @@
+"""
+Command-line client for the WindowsV query API.
+
+Examples:
+    python3 clipctl.py list --limit 10
+    python3 clipctl.py search "http"
+    python3 clipctl.py search --facet url
+    python3 clipctl.py get 0
+    python3 clipctl.py get 2 --output screenshot.png
+    python3 clipctl.py paste 3
+    python3 clipctl.py delete 1
+    python3 clipctl.py prune --older-than 1d
+    python3 clipctl.py prune --type public.png --type public.tiff
+    python3 clipctl.py expire 0 --in 10m
+"""
+import argparse
+import json
+import socket
+import sys
+from content_classifier import TAGS
+from expiry import parse_duration
+from query_server import DEFAULT_SOCKET_PATH, STREAM_CHUNK_SIZE
+
+class QueryClient:
+    """
+    A client connection to the query API socket.
+    """
+
+    def __init__(self, socket_path=DEFAULT_SOCKET_PATH, timeout=10.0):
+        """
+        Connect to the running application.
+
+        Args:
+            socket_path: Filesystem path of the socket.
+            timeout: Socket timeout in seconds.
+        """
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(timeout)
+        self.sock.connect(socket_path)
+        self.reader = self.sock.makefile("rb")
+
+    def request(self, request):
+        """
+        Send one request, or a list of requests as a batch, and read the response.
+        """
+        self.sock.sendall(json.dumps(request).encode("utf-8") + b"\n")
+        return json.loads(self.reader.readline())
+
+    def stream_payload(self, response, out):
+        """
+        Copy the raw payload announced by a response to a binary file object.
+
+        Returns:
+            int: Number of bytes copied.
+        """
+        remaining = response.get("length", 0)
+        while remaining:
+            chunk = self.reader.read(min(remaining, STREAM_CHUNK_SIZE))
+            if not chunk:
+                raise ConnectionError("connection closed during payload")
+            out.write(chunk)
+            remaining -= len(chunk)
+        return response.get("length", 0)
+
+    def close(self):
+        self.reader.close()
+        self.sock.close()
+
+def _print_items(items):
+    for item in items:
+        preview = (item["preview"] or "").replace("\n", " ")
+        print(f"{item['index']:>4}  {item['type']:<28} {item['size']:>10}  {preview[:60]}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query the WindowsV clipboard history.")
+    parser.add_argument("--socket", default=DEFAULT_SOCKET_PATH, help="path of the API socket")
+    parser.add_argument("--json", action="store_true", help="print raw JSON responses")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    list_parser = commands.add_parser("list", help="list history items")
+    list_parser.add_argument("--limit", type=int, default=50)
+    list_parser.add_argument("--offset", type=int, default=0)
+
+    search_parser = commands.add_parser("search", help="search text items")
+    search_parser.add_argument("query", nargs="?", default="")
+    search_parser.add_argument("--facet", choices=TAGS, help="only items tagged with this kind of content")
+    search_parser.add_argument("--limit", type=int, default=50)
+
+    get_parser = commands.add_parser("get", help="print an item, or save its payload")
+    get_parser.add_argument("index", type=int)
+    get_parser.add_argument("--output", help="file to write the content or payload to ('-' for stdout)")
+
+    for name, help_text in (("paste", "paste an item into the front application"),
+                            ("delete", "delete items from the history")):
+        command_parser = commands.add_parser(name, help=help_text)
+        command_parser.add_argument("index", type=int, nargs="+" if name == "delete" else None)
+
+    prune_parser = commands.add_parser("prune", help="delete every item matching all the filters")
+    prune_parser.add_argument("--type", action="append", dest="types", help="pasteboard type (repeatable)")
+    prune_parser.add_argument("--older-than", type=parse_duration, help="age such as 90, 30m, 12h or 7d")
+    prune_parser.add_argument("--newer-than", type=parse_duration, help="age such as 90, 30m, 12h or 7d")
+    prune_parser.add_argument("--match", help="text the items contain")
+
+    expire_parser = commands.add_parser("expire", help="set when an item is removed")
+    expire_parser.add_argument("index", type=int)
+    when = expire_parser.add_mutually_exclusive_group(required=True)
+    when.add_argument("--in", dest="ttl", type=parse_duration, help="duration such as 90, 30m, 12h or 7d")
+    when.add_argument("--never", action="store_true", help="keep the item until it is evicted")
+
+    args = parser.parse_args(argv)
+    if args.command == "prune" and not (args.types or args.older_than is not None
+                                        or args.newer_than is not None or args.match):
+        parser.error("prune needs at least one filter")
+
+    try:
+        client = QueryClient(args.socket)
+    except OSError as e:
+        print(f"Cannot connect to {args.socket}: {e}", file=sys.stderr)
+        return 1
+
+    try:
+        if args.command == "list":
+            response = client.request({"op": "list", "limit": args.limit, "offset": args.offset})
+        elif args.command == "search":
+            response = client.request({"op": "search", "query": args.query,
+                                       "facet": args.facet, "limit": args.limit})
+        elif args.command == "get":
+            response = client.request({"op": "get", "index": args.index, "payload": bool(args.output)})
+            content = response.get("item", {}).get("content")
+            if args.output == "-" and content is not None:
+                sys.stdout.write(content)
+            elif args.output and content is not None:
+                with open(args.output, "w", encoding="utf-8") as out:
+                    out.write(content)
+            elif response.get("length") is not None:
+                if args.output == "-":
+                    client.stream_payload(response, sys.stdout.buffer)
+                else:
+                    with open(args.output, "wb") as out:
+                        client.stream_payload(response, out)
+        elif args.command == "prune":
+            response = client.request({"op": "prune", "types": args.types, "min_age": args.older_than,
+                                       "max_age": args.newer_than, "query": args.match})
+        elif args.command == "expire":
+            response = client.request({"op": "expire", "index": args.index,
+                                       "ttl": None if args.never else args.ttl})
+        elif args.command == "paste":
+            response = client.request({"op": "paste", "index": args.index})
+        else:
+            # A batch resolves every index against the same snapshot
+            responses = client.request([{"op": "delete", "index": index} for index in set(args.index)])
+            response = {"ok": all(r["ok"] for r in responses), "results": responses}
+    finally:
+        client.close()
+
+    if args.json:
+        print(json.dumps(response, indent=2))
+    elif not response.get("ok"):
+        print(f"Error: {response.get('error', 'request failed')}", file=sys.stderr)
+    elif "items" in response:
+        _print_items(response["items"])
+    elif args.command == "prune":
+        print(f"Removed {response['removed']} items")
+    elif args.command == "get" and args.output != "-":
+        item = response["item"]
+        print(item.get("content", item.get("text", f"{item['type']} ({item['size']} bytes)")))
+    return 0 if response.get("ok") else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
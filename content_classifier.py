@@ -0,0 +1,124 @@
+import json
+import re
+
+URL = "url"
+EMAIL = "email"
+PATH = "path"
+COLOR = "color"
+JSON = "json"
+CODE = "code"
+NUMBER = "number"
+
+TAGS = (URL, EMAIL, PATH, COLOR, JSON, CODE, NUMBER)
+
+# Only the start of very large clips is inspected
+MAX_CLASSIFIED_LENGTH = 64 * 1024
+MAX_JSON_LENGTH = 1024 * 1024
+
+_URL_RE = re.compile(r"\b(?:https?|ftp|file)://[^\s<>\"']+|\bwww\.[^\s<>\"']+\.[a-z]{2,}", re.IGNORECASE)
+_EMAIL_RE = re.compile(r"\b[\w.+-]+@[\w-]+(?:\.[\w-]+)*\.[a-z]{2,}\b", re.IGNORECASE)
+_PATH_RE = re.compile(r"^(?:~|\.{1,2})?/(?:[^/\0\n]+/?)+$")
+_COLOR_RE = re.compile(r"^(?:#(?:[0-9a-f]{3}|[0-9a-f]{4}|[0-9a-f]{6}|[0-9a-f]{8})"
+                       r"|(?:rgba?|hsla?)\(\s*[\d.%]+\s*(?:,\s*[\d.%]+\s*){2,3}\))$", re.IGNORECASE)
+_NUMBER_RE = re.compile(r"^[-+]?(?:\d{1,3}(?:[,\s]\d{3})+|\d+)(?:[.,]\d+)?(?:e[-+]?\d+)?%?$", re.IGNORECASE)
+_CODE_RE = re.compile(
+    r"^\s*(?:def |class |import |from \S+ import |function |const |let |var |#include|"
+    r"public |private |return\b|if\s*\(|for\s*\(|while\s*\()"
+    r"|[;{}]\s*$|=>|::|\)\s*\{",
+    re.MULTILINE,
+)
+
+def classify(text):
+    """
+    Tag a text clip with the kinds of content it contains.
+
+    Args:
+        text: The clip's text.
+
+    Returns:
+        frozenset: Tags from TAGS that apply to the text.
+    """
+    if not isinstance(text, str):
+        return frozenset()
+    sample = text[:MAX_CLASSIFIED_LENGTH]
+    stripped = sample.strip()
+    if not stripped:
+        return frozenset()
+
+    tags = set()
+    single_line = "\n" not in stripped
+    if _URL_RE.search(sample):
+        tags.add(URL)
+    if _EMAIL_RE.search(sample):
+        tags.add(EMAIL)
+    if single_line:
+        if _PATH_RE.match(stripped) and URL not in tags:
+            tags.add(PATH)
+        if _COLOR_RE.match(stripped):
+            tags.add(COLOR)
+        if _NUMBER_RE.match(stripped):
+            tags.add(NUMBER)
+    if stripped[0] in "{[" and len(text) <= MAX_JSON_LENGTH:
+        try:
+            json.loads(text)
+            tags.add(JSON)
+        except ValueError:
+            pass
+    if JSON not in tags and len(_CODE_RE.findall(sample)) >= (1 if single_line else 2):
+        tags.add(CODE)
+    return frozenset(tags)
+
+class FacetIndex:
+    """
+    Keeps, for each tag, the items carrying it.
+
+    Items are added once their classification is known, so filtering by a
+    tag is a lookup rather than a regex pass over the whole history.
+    """
+
+    def __init__(self):
+        """
+        Initialize an empty index.
+        """
+        self._items = {tag: {} for tag in TAGS}
+        self._tags = {}
+
+    def add(self, item, tags):
+        """
+        Index an item under its tags.
+
+        Args:
+            item: The ClipboardItem to index.
+            tags: The tags returned by classify().
+        """
+        self.remove(item)
+        self._tags[item] = tags
+        for tag in tags:
+            self._items.setdefault(tag, {})[item] = None
+
+    def remove(self, item):
+        """
+        Remove an item from the index.
+        """
+        for tag in self._tags.pop(item, ()):
+            self._items[tag].pop(item, None)
+
+    def items(self, tag):
+        """
+        Get the items carrying a tag, most recently indexed first.
+        """
+        return list(reversed(self._items.get(tag, {})))
+
+    def count(self, tag):
+        """
+        Get the number of items carrying a tag.
+        """
+        return len(self._items.get(tag, {}))
+
+    def clear(self):
+        """
+        Remove every item.
+        """
+        for items in self._items.values():
+            items.clear()
+        self._tags.clear()
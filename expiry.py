@@ -0,0 +1,144 @@
+import heapq
+import itertools
+from pasteboard_types import (NSStringPboardType, NSPasteboardTypeFileURL, NSPDFPboardType,
+                              NSPasteboardTypeRTF, IMAGE_TYPES)
+
+DURATION_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+# Short names accepted in TTL specifications, and the pasteboard types they cover
+TTL_KINDS = {
+    "text": (NSStringPboardType,),
+    "image": IMAGE_TYPES,
+    "file": (NSPasteboardTypeFileURL,),
+    "pdf": (NSPDFPboardType,),
+    "rtf": (NSPasteboardTypeRTF,),
+}
+
+def parse_duration(value):
+    """
+    Parse a duration such as "90", "30m", "12h" or "7d" into seconds.
+
+    Raises:
+        ValueError: If the value isn't a number with an optional unit.
+    """
+    unit = DURATION_UNITS.get(value[-1:].lower())
+    if unit is None:
+        return float(value)
+    return float(value[:-1]) * unit
+
+def parse_ttls(spec):
+    """
+    Parse a TTL specification such as "text=1h,image=10m".
+
+    Args:
+        spec: Comma-separated kind=duration pairs; kinds are the keys of
+            TTL_KINDS or pasteboard type identifiers.
+
+    Returns:
+        dict: Pasteboard type to TTL in seconds, as accepted by ClipboardHistory.
+
+    Raises:
+        ValueError: If an entry can't be parsed.
+    """
+    ttls = {}
+    for entry in filter(None, (part.strip() for part in spec.split(","))):
+        kind, separator, duration = entry.partition("=")
+        if not separator:
+            raise ValueError(f"expected kind=duration, got {entry!r}")
+        seconds = parse_duration(duration.strip())
+        for content_type in TTL_KINDS.get(kind.strip(), (kind.strip(),)):
+            ttls[content_type] = seconds
+    return ttls
+
+class ExpiryScheduler:
+    """
+    Tracks when items expire, in deadline order.
+
+    Deadlines are kept in a heap, so finding the items due costs a pop per
+    expiring item rather than a scan of every tracked item. Cancelled and
+    rescheduled entries are left in the heap and skipped when they surface.
+    """
+
+    def __init__(self):
+        """
+        Initialize an empty scheduler.
+        """
+        self._heap = []
+        self._deadlines = {}
+        self._sequence = itertools.count()
+
+    def schedule(self, item, deadline):
+        """
+        Set the time at which an item expires, replacing any earlier deadline.
+
+        Args:
+            item: The item to expire.
+            deadline: Expiry time in epoch seconds.
+        """
+        self._deadlines[item] = deadline
+        heapq.heappush(self._heap, (deadline, next(self._sequence), item))
+
+    def cancel(self, item):
+        """
+        Stop tracking an item, if it was scheduled.
+        """
+        self._deadlines.pop(item, None)
+
+    def deadline(self, item):
+        """
+        Get the expiry time of an item, or None if it doesn't expire.
+        """
+        return self._deadlines.get(item)
+
+    def next_deadline(self):
+        """
+        Get the earliest pending expiry time, or None if nothing is scheduled.
+        """
+        self._discard_stale()
+        return self._heap[0][0] if self._heap else None
+
+    def pop_expired(self, now):
+        """
+        Remove and return the items whose deadline has passed.
+
+        Args:
+            now: Current time in epoch seconds.
+
+        Returns:
+            list: The expired items, earliest deadline first.
+        """
+        expired = []
+        while self._heap and self._heap[0][0] <= now:
+            deadline, _, item = heapq.heappop(self._heap)
+            if self._deadlines.get(item) == deadline:
+                del self._deadlines[item]
+                expired.append(item)
+        # Keep the heap from filling up with entries of cancelled items
+        if len(self._heap) > 2 * len(self._deadlines) + 64:
+            self._rebuild()
+        return expired
+
+    def _discard_stale(self):
+        while self._heap:
+            deadline, _, item = self._heap[0]
+            if self._deadlines.get(item) == deadline:
+                return
+            heapq.heappop(self._heap)
+
+    def _rebuild(self):
+        self._heap = [(deadline, next(self._sequence), item)
+                      for item, deadline in self._deadlines.items()]
+        heapq.heapify(self._heap)
+
+    def clear(self):
+        """
+        Stop tracking every item.
+        """
+        self._heap.clear()
+        self._deadlines.clear()
+
+    def __len__(self):
+        return len(self._deadlines)
+
+    def __contains__(self, item):
+        return item in self._deadlines
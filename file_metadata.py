@@ -0,0 +1,163 @@
+import logging
+import os
+import stat
+import time
+
+logger = logging.getLogger(__name__)
+
+class FileInfo:
+    """
+    Cached metadata of a copied file.
+
+    The values are read in the background and refreshed by the validator, so
+    the popup and paste code never have to touch the filesystem.
+    """
+
+    __slots__ = ("path", "size", "mtime", "is_dir", "exists", "checked")
+
+    def __init__(self, path, size=None, mtime=None, is_dir=False, exists=True, checked=None):
+        """
+        Initialize file metadata.
+
+        Args:
+            path: Absolute path of the file.
+            size: Size in bytes, or None if unknown (or a directory).
+            mtime: Modification time in epoch seconds, or None if unknown.
+            is_dir: Whether the path is a directory.
+            exists: Whether the file existed when last checked.
+            checked: When the metadata was read, or None if it hasn't been yet.
+        """
+        self.path = path
+        self.size = size
+        self.mtime = mtime
+        self.is_dir = is_dir
+        self.exists = exists
+        self.checked = checked
+
+    @property
+    def name(self):
+        return os.path.basename(self.path.rstrip("/")) or self.path
+
+    @property
+    def kind(self):
+        """
+        Short description of the file type ("Folder", "PDF", "File", ...).
+        """
+        if self.is_dir:
+            return "Folder"
+        extension = os.path.splitext(self.path)[1][1:]
+        return extension.upper() if extension else "File"
+
+def stat_file(path, now=None):
+    """
+    Read the metadata of a file.
+
+    Args:
+        path: Path of the file.
+        now: Time recorded as the check time (default: now).
+
+    Returns:
+        FileInfo: The metadata; exists is False if the file is missing.
+    """
+    now = time.time() if now is None else now
+    try:
+        st = os.stat(path)
+    except OSError:
+        return FileInfo(path, exists=False, checked=now)
+    is_dir = stat.S_ISDIR(st.st_mode)
+    return FileInfo(path, None if is_dir else st.st_size, st.st_mtime, is_dir, True, now)
+
+def stat_files(paths):
+    """
+    Read the metadata of several files in one pass.
+
+    Meant to run on a background thread; each distinct path is checked once.
+
+    Args:
+        paths: Iterable of file paths.
+
+    Returns:
+        dict: Path to FileInfo.
+    """
+    now = time.time()
+    return {path: stat_file(path, now) for path in dict.fromkeys(paths)}
+
+def update_file_info(item, results):
+    """
+    Replace an item's file metadata with fresher results.
+
+    Args:
+        item: A file ClipboardItem.
+        results: Path to FileInfo, as returned by stat_files().
+
+    Returns:
+        int: Change in the number of missing files (positive if some went missing).
+    """
+    files = item.files or ()
+    updated = tuple(results.get(f.path, f) for f in files)
+    item.files = updated
+    return sum(1 for f in updated if not f.exists) - sum(1 for f in files if not f.exists)
+
+class FileValidator:
+    """
+    Decides when the copied files in the history are re-checked.
+
+    Checks run at most every interval seconds, over every file item at once,
+    so their cost is one batch of stat calls on a background thread instead
+    of a check per paste or per rendered row.
+    """
+
+    def __init__(self, interval=60.0, clock=time.monotonic):
+        """
+        Initialize the validator.
+
+        Args:
+            interval: Seconds between validation passes (default: 60).
+            clock: Function returning the current time in seconds.
+        """
+        self.interval = interval
+        self.clock = clock
+        self.next_run = 0.0
+        self.running = False
+        self.stats = {"passes": 0, "files_checked": 0, "went_missing": 0, "came_back": 0,
+                      "last_duration": 0.0}
+
+    def due(self):
+        """
+        Check whether a validation pass should start now.
+        """
+        return not self.running and self.clock() >= self.next_run
+
+    def start(self):
+        """
+        Record that a pass has started and schedule the next one.
+        """
+        self.running = True
+        self.next_run = self.clock() + self.interval
+
+    def finish(self, items, results, duration=0.0):
+        """
+        Update the file metadata of items from a validation pass.
+
+        Args:
+            items: The file ClipboardItem objects that were checked.
+            results: Path to FileInfo, as returned by stat_files().
+            duration: Time the pass took, in seconds.
+
+        Returns:
+            list: The items whose files went missing or came back.
+        """
+        self.running = False
+        changed = []
+        for item in items:
+            delta = update_file_info(item, results)
+            if delta > 0:
+                self.stats["went_missing"] += 1
+            elif delta < 0:
+                self.stats["came_back"] += 1
+            if delta:
+                changed.append(item)
+        self.stats["passes"] += 1
+        self.stats["files_checked"] += len(results)
+        self.stats["last_duration"] = duration
+        return changed
@@ -0,0 +1,129 @@
+from itertools import count
+import math
+import time
+from sorted_index import SortedIndex
+
+def _log_add(a, b):
+    """
+    Return log(exp(a) + exp(b)) without overflowing.
+    """
+    high, low = max(a, b), min(a, b)
+    return high + math.log1p(math.exp(low - high))
+
+class FrecencyIndex:
+    """
+    Ranks items by frecency: how often they were used, decayed by how long ago.
+
+    Every use adds a weight that halves after each half-life. Because all
+    scores decay at the same rate, the ranking only changes when an item is
+    used, so each item is stored once under a time-independent key,
+    log(sum(weight * 2 ** (t_use / half_life))), kept in log space to avoid
+    overflow. Updates are a remove and an insert in a SortedIndex.
+    """
+
+    def __init__(self, half_life=3 * 24 * 3600, clock=time.time):
+        """
+        Initialize an empty index.
+
+        Args:
+            half_life: Seconds after which a use counts half (default: 3 days).
+            clock: Function returning the current time in seconds.
+        """
+        self.half_life = half_life
+        self.clock = clock
+        self._rate = math.log(2) / half_life
+        self._keys = {}
+        self._items = {}
+        self._order = SortedIndex()
+        self._sequence = count()
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, item):
+        return item in self._keys
+
+    def _store(self, item, log_score):
+        key = (log_score, next(self._sequence))
+        self._keys[item] = key
+        self._items[key[1]] = item
+        self._order.add(key)
+
+    def _pop(self, item):
+        key = self._keys.pop(item, None)
+        if key is not None:
+            self._order.remove(key)
+            del self._items[key[1]]
+        return key
+
+    def touch(self, item, now=None, weight=1.0):
+        """
+        Record a use of an item.
+
+        Args:
+            item: The item that was captured or pasted.
+            now: Time of the use in seconds (default: the clock's current time).
+            weight: Contribution of this use before decay (default: 1.0).
+        """
+        now = self.clock() if now is None else now
+        gain = math.log(weight) + self._rate * now
+        old = self._pop(item)
+        if old is not None:
+            gain = _log_add(old[0], gain)
+        self._store(item, gain)
+
+    def transfer(self, old_item, new_item):
+        """
+        Move the accumulated score of an item onto the item that replaces it.
+
+        Args:
+            old_item: The item being replaced, e.g. an older exact duplicate.
+            new_item: The item inheriting its history of uses.
+        """
+        old = self._pop(old_item)
+        if old is None:
+            return
+        current = self._pop(new_item)
+        log_score = old[0] if current is None else _log_add(old[0], current[0])
+        self._store(new_item, log_score)
+
+    def score(self, item, now=None):
+        """
+        Get the current frecency score of an item.
+
+        Returns:
+            float: The decayed sum of the item's use weights, or 0.0 if unknown.
+        """
+        key = self._keys.get(item)
+        if key is None:
+            return 0.0
+        now = self.clock() if now is None else now
+        return math.exp(key[0] - self._rate * now)
+
+    def remove(self, item):
+        """
+        Stop ranking an item.
+        """
+        self._pop(item)
+
+    def ranked(self):
+        """
+        Iterate over items from the highest to the lowest score.
+        """
+        for key in reversed(self._order):
+            yield self._items[key[1]]
+
+    def lowest(self):
+        """
+        Iterate over items from the lowest to the highest score.
+        """
+        for key in self._order:
+            yield self._items[key[1]]
+
+    def clear(self):
+        """
+        Remove every item.
+        """
+        self._keys.clear()
+        self._items.clear()
+        self._order.clear()
@@ -0,0 +1,180 @@
+from bisect import bisect_right
+from itertools import chain, islice
+
+CHUNK_SIZE = 32
+
+class HistorySnapshot:
+    """
+    An immutable, versioned view of the clipboard history.
+
+    Items are indexed newest first, like the history list they replace. They
+    are stored oldest first in fixed-size chunks, so that adding an item only
+    copies the newest chunk and the chunk spine; every other chunk is shared
+    with the previous snapshot. Readers can keep using a snapshot while the
+    writer commits newer ones, without any locking.
+    """
+
+    __slots__ = ("_chunks", "_offsets", "_length", "version")
+
+    def __init__(self, chunks=(), version=0):
+        """
+        Initialize a snapshot from its chunks.
+
+        Args:
+            chunks: Tuple of item tuples, oldest chunk first.
+            version: Version number, incremented by every derived snapshot.
+        """
+        self._chunks = chunks
+        offsets = []
+        length = 0
+        for chunk in chunks:
+            offsets.append(length)
+            length += len(chunk)
+        self._offsets = offsets
+        self._length = length
+        self.version = version
+
+    def __len__(self):
+        return self._length
+
+    def __bool__(self):
+        return self._length > 0
+
+    def __iter__(self):
+        """
+        Iterate over items, newest first.
+        """
+        for chunk in reversed(self._chunks):
+            yield from reversed(chunk)
+
+    def __getitem__(self, index):
+        """
+        Get an item by position (0 is the newest), or a list for a slice.
+        """
+        if isinstance(index, slice):
+            return list(islice(self, *index.indices(self._length)))
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("history index out of range")
+        position = self._length - 1 - index
+        chunk_index = bisect_right(self._offsets, position) - 1
+        return self._chunks[chunk_index][position - self._offsets[chunk_index]]
+
+    def index_of(self, item):
+        """
+        Find the position of an item by identity.
+
+        Args:
+            item: The ClipboardItem to look for.
+
+        Returns:
+            int: The item's index, or -1 if it isn't in this snapshot.
+        """
+        for index, h in enumerate(self):
+            if h is item:
+                return index
+        return -1
+
+    def __contains__(self, item):
+        return self.index_of(item) >= 0
+
+    def prepend(self, item):
+        """
+        Return a new snapshot with an item added as the newest.
+        """
+        chunks = self._chunks
+        if chunks and len(chunks[-1]) < CHUNK_SIZE:
+            chunks = chunks[:-1] + (chunks[-1] + (item,),)
+        else:
+            chunks = chunks + ((item,),)
+        return HistorySnapshot(chunks, self.version + 1)
+
+    def insert(self, index, item):
+        """
+        Return a new snapshot with an item inserted at a position.
+
+        Only the chunk receiving the item is copied, and split in two when
+        it outgrows the chunk size.
+
+        Args:
+            index: Position the item will have (0 makes it the newest).
+            item: The item to insert.
+        """
+        if index <= 0:
+            return self.prepend(item)
+        position = max(self._length - index, 0)
+        if position == 0:
+            # New oldest item: extend the oldest chunk unless it is full
+            if self._chunks and len(self._chunks[0]) < CHUNK_SIZE:
+                chunks = ((item,) + self._chunks[0],) + self._chunks[1:]
+            else:
+                chunks = ((item,),) + self._chunks
+            return HistorySnapshot(chunks, self.version + 1)
+        chunk_index = bisect_right(self._offsets, position - 1) - 1
+        chunk = self._chunks[chunk_index]
+        local = position - self._offsets[chunk_index]
+        grown = chunk[:local] + (item,) + chunk[local:]
+        if len(grown) > CHUNK_SIZE:
+            half = len(grown) // 2
+            replacement = (grown[:half], grown[half:])
+        else:
+            replacement = (grown,)
+        chunks = self._chunks[:chunk_index] + replacement + self._chunks[chunk_index + 1:]
+        return HistorySnapshot(chunks, self.version + 1)
+
+    def filter(self, keep):
+        """
+        Return a new snapshot with only the items for which keep(item) is true.
+
+        Chunks where nothing is dropped are shared as-is; small neighbouring
+        chunks left behind by removals are merged.
+
+        Args:
+            keep: Predicate called once per item.
+        """
+        chunks = []
+        for chunk in self._chunks:
+            kept = tuple(h for h in chunk if keep(h))
+            if len(kept) == len(chunk):
+                chunks.append(chunk)
+            elif not kept:
+                continue
+            elif chunks and len(chunks[-1]) + len(kept) <= CHUNK_SIZE:
+                chunks[-1] = chunks[-1] + kept
+            else:
+                chunks.append(kept)
+        return HistorySnapshot(tuple(chunks), self.version + 1)
+
+    def remove_at(self, index):
+        """
+        Return a new snapshot without the item at a position.
+        """
+        item = self[index]
+        return self.filter(lambda h: h is not item)
+
+    def truncate(self, max_items):
+        """
+        Return a new snapshot keeping only the newest max_items items.
+        """
+        excess = self._length - max_items
+        if excess <= 0:
+            return self
+        chunks = list(self._chunks)
+        while chunks and excess >= len(chunks[0]):
+            excess -= len(chunks.pop(0))
+        if excess:
+            chunks[0] = chunks[0][excess:]
+        return HistorySnapshot(tuple(chunks), self.version + 1)
+
+    def oldest(self, count):
+        """
+        Return the count oldest items, oldest first.
+        """
+        return list(islice(chain.from_iterable(self._chunks), max(count, 0)))
+
+    def cleared(self):
+        """
+        Return an empty snapshot following this one.
+        """
+        return HistorySnapshot((), self.version + 1)
@@ -0,0 +1,419 @@
+"""
+Folder-based history sync between devices.
+
+Each device appends its changes to its own log in a shared folder (synced by
+any file sync tool, or a network share) and reads the other devices' logs
+from where it last stopped:
+
+    <folder>/devices/<device>/00000001.jsonl   append-only log segments
+    <folder>/blobs/<sha256>                    binary payloads, by content hash
+
+Log entries carry a Lamport clock. Changes to the same item are resolved by
+keeping the one with the highest (clock, device) stamp, so every device ends
+up with the same result whatever order the logs arrive in.
+
+A device's log only grows with its captures and removals, so from time to
+time it is compacted: the device writes a checkpoint segment holding the
+additions still in its history and recent removals, then deletes the older
+segments and the blobs no log refers to anymore.
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import socket
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_MAX_ENTRIES = 1000
+# Entries appended since the last checkpoint before the log is compacted
+COMPACT_MIN_ENTRIES = 200
+# Removals are kept in checkpoints this long (seconds), for devices that
+# haven't read them yet
+TOMBSTONE_TTL = 7 * 24 * 3600
+# Unreferenced blobs younger than this (seconds) may belong to an entry still
+# being written, so garbage collection leaves them alone
+BLOB_GRACE = 3600
+
+def default_device_id():
+    """
+    Get a device identifier derived from the host name.
+    """
+    name = socket.gethostname().split(".")[0] or "device"
+    return re.sub(r"[^A-Za-z0-9_-]", "_", name)
+
+def _segment_name(number):
+    return f"{number:08d}.jsonl"
+
+class FolderSync:
+    """
+    Reads and writes the sync logs of one device.
+
+    The object only deals with the shared folder: publish_add() and
+    publish_remove() record local changes, poll() returns the changes
+    made by other devices since the previous poll, already resolved, and
+    compact() shrinks this device's log to what its history still holds.
+    Applying changes to a history is up to the caller. Methods may be called
+    from a background thread.
+    """
+
+    def __init__(self, folder, device_id=None, segment_max_entries=SEGMENT_MAX_ENTRIES,
+                 compact_min_entries=COMPACT_MIN_ENTRIES):
+        """
+        Initialize sync for this device.
+
+        Args:
+            folder: The shared sync folder.
+            device_id: Identifier of this device (default: from the host name).
+            segment_max_entries: Entries per log segment before a new one is started.
+            compact_min_entries: Entries appended since the last checkpoint
+                before needs_compaction() reports the log as worth compacting.
+        """
+        self.folder = folder
+        self.device_id = device_id or default_device_id()
+        self.segment_max_entries = segment_max_entries
+        self.compact_min_entries = compact_min_entries
+        self.devices_dir = os.path.join(folder, "devices")
+        self.blobs_dir = os.path.join(folder, "blobs")
+        self.own_dir = os.path.join(self.devices_dir, self.device_id)
+        os.makedirs(self.own_dir, exist_ok=True)
+        os.makedirs(self.blobs_dir, exist_ok=True)
+
+        self.clock = 0
+        self._lock = threading.Lock()
+        # Newest stamp seen per item uid; removals stay as tombstones
+        self._stamps = {}
+        # Read position (segment number, byte offset) in each device's log
+        self._cursors = {}
+        # Additions whose blob hasn't arrived yet
+        self._pending = []
+        self.stats = {"polls": 0, "entries_read": 0, "bytes_read": 0, "blobs_read": 0,
+                      "blobs_written": 0, "entries_written": 0, "adds_skipped": 0, "poll_time": 0.0,
+                      "compactions": 0, "entries_compacted": 0, "blobs_removed": 0}
+
+        segments = self._segments(self.device_id)
+        self._segment = segments[-1] if segments else 1
+        self._segment_entries = 0
+        # Entries in this device's log, and how many of them the last checkpoint wrote
+        self._log_entries = 0
+        self._checkpoint_entries = 0
+        for number in segments:
+            with open(self._segment_path(self.device_id, number), "rb") as f:
+                self._segment_entries = f.read().count(b"\n")
+            self._log_entries += self._segment_entries
+
+    def _segment_path(self, device, number):
+        return os.path.join(self.devices_dir, device, _segment_name(number))
+
+    def _segments(self, device):
+        """
+        Get the numbers of a device's log segments, in order.
+        """
+        try:
+            names = os.listdir(os.path.join(self.devices_dir, device))
+        except FileNotFoundError:
+            return []
+        return sorted(int(name.split(".")[0]) for name in names
+                      if name.endswith(".jsonl") and name.split(".")[0].isdigit())
+
+    def _write_position(self):
+        path = self._segment_path(self.device_id, self._segment)
+        return self._segment, os.path.getsize(path) if os.path.exists(path) else 0
+
+    def _append(self, entry):
+        """
+        Stamp an entry and append it to this device's log.
+        """
+        self.clock += 1
+        entry["clock"] = self.clock
+        entry["device"] = self.device_id
+        if self._segment_entries >= self.segment_max_entries:
+            self._segment += 1
+            self._segment_entries = 0
+
+        before = self._write_position()
+        line = json.dumps(entry, separators=(",", ":")).encode("utf-8") + b"\n"
+        with open(self._segment_path(self.device_id, self._segment), "ab") as f:
+            f.write(line)
+        self._segment_entries += 1
+        self._log_entries += 1
+        self.stats["entries_written"] += 1
+        self._stamps[entry["uid"]] = (entry["clock"], self.device_id)
+        # Our own entries don't need reading back once the log has been replayed
+        if self._cursors.get(self.device_id) == before:
+            self._cursors[self.device_id] = self._write_position()
+
+    def publish_add(self, record, blob=None):
+        """
+        Record an item added to the local history.
+
+        Args:
+            record: Dict with the item's "uid", "type", "epoch" and, for text
+                and file items, "text".
+            blob: Binary payload of the item, or None.
+        """
+        with self._lock:
+            try:
+                entry = dict(record, op="add")
+                if blob is not None:
+                    digest = hashlib.sha256(blob).hexdigest()
+                    path = os.path.join(self.blobs_dir, digest)
+                    if not os.path.exists(path):
+                        temp_path = f"{path}.{self.device_id}.tmp"
+                        with open(temp_path, "wb") as f:
+                            f.write(blob)
+                        os.replace(temp_path, path)
+                        self.stats["blobs_written"] += 1
+                    entry["blob"] = digest
+                self._append(entry)
+            except Exception as e:
+                logger.error(f"Error publishing sync entry: {e}")
+
+    def publish_remove(self, uid):
+        """
+        Record an item removed from the local history.
+
+        Args:
+            uid: The removed item's uid.
+        """
+        with self._lock:
+            try:
+                self._append({"op": "remove", "uid": uid, "time": time.time()})
+            except Exception as e:
+                logger.error(f"Error publishing sync entry: {e}")
+
+    def _read_device(self, device):
+        """
+        Read the entries a device appended since the last poll.
+        """
+        segment, offset = self._cursors.get(device, (1, 0))
+        entries = []
+        while True:
+            path = self._segment_path(device, segment)
+            try:
+                size = os.path.getsize(path)
+            except FileNotFoundError:
+                # Compacted away: the device's checkpoint follows its last segment
+                later = [number for number in self._segments(device) if number > segment]
+                if not later:
+                    break
+                segment, offset = later[0], 0
+                continue
+            complete = True
+            if size > offset:
+                with open(path, "rb") as f:
+                    f.seek(offset)
+                    data = f.read(size - offset)
+                # A line still being written (or synced) is left for the next poll
+                end = data.rfind(b"\n") + 1
+                complete = end == len(data)
+                for line in data[:end].splitlines():
+                    try:
+                        entries.append(json.loads(line))
+                    except ValueError:
+                        logger.error(f"Skipping invalid sync entry in {path}")
+                offset += end
+                self.stats["bytes_read"] += end
+            if not complete or not os.path.exists(self._segment_path(device, segment + 1)):
+                break
+            segment, offset = segment + 1, 0
+        self._cursors[device] = (segment, offset)
+        return entries
+
+    def read_blob(self, digest):
+        """
+        Read a blob from the shared folder.
+
+        Returns:
+            bytes: The blob, or None if it hasn't arrived yet.
+        """
+        try:
+            with open(os.path.join(self.blobs_dir, digest), "rb") as f:
+                data = f.read()
+            self.stats["blobs_read"] += 1
+            return data
+        except FileNotFoundError:
+            return None
+
+    def poll(self, limit=None):
+        """
+        Read the changes made since the previous poll.
+
+        Only the log bytes appended since then are read, and blobs only for
+        additions not already known. The first poll also replays this
+        device's own log, so a restarted application gets its history back.
+
+        Args:
+            limit: Maximum number of additions returned, newest first by
+                capture time; older ones are marked as known without reading
+                their blobs, since a history of that size would evict them
+                anyway (default: no limit).
+
+        Returns:
+            list: Changes in stamp order, as ("add", entry, blob) or
+                  ("remove", entry, None) tuples; blob is None for text items.
+        """
+        with self._lock:
+            start = time.perf_counter()
+            try:
+                devices = os.listdir(self.devices_dir)
+            except OSError as e:
+                logger.error(f"Error listing sync devices: {e}")
+                return []
+
+            entries = self._pending
+            self._pending = []
+            for device in devices:
+                entries.extend(self._read_device(device))
+            self.stats["entries_read"] += len(entries)
+            entries.sort(key=lambda e: (e.get("clock", 0), e.get("device", "")))
+
+            # Resolve every entry first, so blobs are only read for the
+            # additions that survive this poll
+            latest = {}
+            for entry in entries:
+                uid = entry.get("uid")
+                stamp = (entry.get("clock", 0), entry.get("device", ""))
+                self.clock = max(self.clock, stamp[0])
+                known = self._stamps.get(uid)
+                if uid is None or (known is not None and known >= stamp):
+                    continue
+                if entry.get("op") == "remove":
+                    self._stamps[uid] = stamp
+                    latest[uid] = entry
+                elif entry.get("op") == "add":
+                    latest[uid] = entry
+
+            adds = [entry for entry in latest.values() if entry.get("op") == "add"]
+            if limit is not None and len(adds) > limit:
+                adds.sort(key=lambda e: e.get("epoch", 0), reverse=True)
+                for entry in adds[limit:]:
+                    self._stamps[entry["uid"]] = (entry.get("clock", 0), entry.get("device", ""))
+                    self.stats["adds_skipped"] += 1
+                adds = adds[:limit]
+            returned = {id(entry) for entry in adds}
+
+            changes = []
+            for entry in latest.values():
+                if entry.get("op") == "remove":
+                    changes.append(("remove", entry, None))
+                    continue
+                if id(entry) not in returned:
+                    continue
+                blob = None
+                if entry.get("blob"):
+                    blob = self.read_blob(entry["blob"])
+                    if blob is None:
+                        self._pending.append(entry)
+                        continue
+                self._stamps[entry["uid"]] = (entry.get("clock", 0), entry.get("device", ""))
+                changes.append(("add", entry, blob))
+            changes.sort(key=lambda change: (change[1].get("clock", 0), change[1].get("device", "")))
+
+            self.stats["polls"] += 1
+            self.stats["poll_time"] += time.perf_counter() - start
+            return changes
+
+    def needs_compaction(self, live_count=0):
+        """
+        Check whether this device's log has grown enough to be worth compacting.
+
+        Args:
+            live_count: Number of items in the local history.
+        """
+        grown = self._log_entries - self._checkpoint_entries
+        return grown >= max(self.compact_min_entries, live_count)
+
+    def compact(self, live_uids, now=None):
+        """
+        Replace this device's log with a checkpoint of what is still live.
+
+        The checkpoint keeps, with their original stamps, this device's
+        additions of the items in live_uids and its removals younger than
+        TOMBSTONE_TTL, in one new segment; the older segments are then
+        deleted. Devices reading an older segment carry on from the
+        checkpoint, skipping the additions they already know. Blobs no log
+        refers to anymore are deleted afterwards.
+
+        Args:
+            live_uids: Collection of the uids in the local history.
+            now: Current time in epoch seconds (default: now).
+        """
+        now = time.time() if now is None else now
+        live_uids = set(live_uids)
+        with self._lock:
+            try:
+                segments = self._segments(self.device_id)
+                latest = {}
+                for number in segments:
+                    with open(self._segment_path(self.device_id, number), "rb") as f:
+                        for line in f:
+                            try:
+                                entry = json.loads(line)
+                            except ValueError:
+                                continue
+                            if entry.get("uid") is not None:
+                                latest[entry["uid"]] = entry
+
+                kept = []
+                for uid, entry in latest.items():
+                    if entry.get("op") == "add" and uid in live_uids:
+                        kept.append(entry)
+                    elif entry.get("op") == "remove" and now - entry.get("time", now) < TOMBSTONE_TTL:
+                        # Removals written before they carried a time expire from now
+                        kept.append(dict(entry, time=entry.get("time", now)))
+                kept.sort(key=lambda e: e.get("clock", 0))
+
+                caught_up = self._cursors.get(self.device_id) == self._write_position()
+                number = (segments[-1] if segments else 0) + 1
+                path = self._segment_path(self.device_id, number)
+                temp_path = f"{path}.tmp"
+                with open(temp_path, "wb") as f:
+                    for entry in kept:
+                        f.write(json.dumps(entry, separators=(",", ":")).encode("utf-8") + b"\n")
+                os.replace(temp_path, path)
+                for old in segments:
+                    os.remove(self._segment_path(self.device_id, old))
+
+                self.stats["compactions"] += 1
+                self.stats["entries_compacted"] += self._log_entries - len(kept)
+                self._segment = number
+                self._segment_entries = len(kept)
+                self._log_entries = self._checkpoint_entries = len(kept)
+                if caught_up:
+                    self._cursors[self.device_id] = self._write_position()
+            except Exception as e:
+                logger.error(f"Error compacting sync log: {e}")
+                return
+            self._collect_blobs(now)
+
+    def _collect_blobs(self, now):
+        """
+        Delete the blobs that no device's log refers to anymore.
+        """
+        referenced = set()
+        for device in os.listdir(self.devices_dir):
+            for number in self._segments(device):
+                try:
+                    with open(self._segment_path(device, number), "rb") as f:
+                        for line in f:
+                            if b'"blob"' not in line:
+                                continue
+                            try:
+                                referenced.add(json.loads(line).get("blob"))
+                            except ValueError:
+                                continue
+                except FileNotFoundError:
+                    # Compacted by its device while we were reading
+                    return
+        for name in os.listdir(self.blobs_dir):
+            path = os.path.join(self.blobs_dir, name)
+            try:
+                if name not in referenced and now - os.path.getmtime(path) > BLOB_GRACE:
+                    os.remove(path)
+                    self.stats["blobs_removed"] += 1
+            except OSError as e:
+                logger.error(f"Error removing sync blob {name}: {e}")
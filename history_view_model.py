@@ -0,0 +1,153 @@
+from datetime import datetime, timedelta
+import os
+from clipboard_item import type_code
+from memory_report import format_bytes
+from pasteboard_types import (NSStringPboardType, NSPasteboardTypeFileURL,
+                              NSPDFPboardType, NSPasteboardTypeRTF, IMAGE_TYPES)
+
+# Time ranges offered by the popup's time filter, with their labels
+TIME_FILTERS = (None, "hour", "today", "yesterday", "week")
+TIME_FILTER_LABELS = {None: "Any time", "hour": "Last hour", "today": "Today",
+                      "yesterday": "Yesterday", "week": "Last 7 days"}
+
+def time_range(name, now=None):
+    """
+    Get the capture time range of a popup time filter.
+
+    Args:
+        name: One of TIME_FILTERS other than None.
+        now: The current time as a datetime (default: now).
+
+    Returns:
+        tuple: (start, end) epoch seconds; end is None for ranges up to now.
+
+    Raises:
+        ValueError: If the filter name is unknown.
+    """
+    now = now or datetime.now()
+    midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    if name == "hour":
+        return (now - timedelta(hours=1)).timestamp(), None
+    if name == "today":
+        return midnight.timestamp(), None
+    if name == "yesterday":
+        # Just before midnight, so items captured at midnight count as today
+        return (midnight - timedelta(days=1)).timestamp(), midnight.timestamp() - 1e-6
+    if name == "week":
+        return (midnight - timedelta(days=6)).timestamp(), None
+    raise ValueError(f"unknown time filter: {name!r}")
+
+class HistoryRow:
+    """
+    Display data for one row of the popup.
+    """
+
+    __slots__ = ("item", "index", "text", "has_image", "selection_order", "stale")
+
+    def __init__(self, item, index, text, has_image, selection_order=0, stale=False):
+        """
+        Initialize a row.
+
+        Args:
+            item: The ClipboardItem shown in the row.
+            index: Position of the row in the displayed list.
+            text: Text describing the item.
+            has_image: Whether the row shows an image thumbnail.
+            selection_order: 1-based position in the multi-paste selection, or 0.
+            stale: Whether the item's files have gone missing.
+        """
+        self.item = item
+        self.index = index
+        self.text = text
+        self.has_image = has_image
+        self.selection_order = selection_order
+        self.stale = stale
+
+def row_text(item):
+    """
+    Get the text describing an item in the popup.
+
+    Args:
+        item: The ClipboardItem to describe.
+
+    Returns:
+        str: Display text based on the item's content type.
+    """
+    # Looked up once: content_type maps the item's type code on every access
+    content_type = item.content_type
+    if content_type == NSStringPboardType:
+        display_text = item.content
+        if len(display_text) > 100:
+            display_text = display_text[:97] + "..."
+    elif content_type in IMAGE_TYPES:
+        display_text = "📷 Image"
+        if item.near_duplicate_distance is not None:
+            display_text += " (similar to an earlier image)"
+    elif content_type == NSPasteboardTypeFileURL:
+        display_text = file_text(item)
+    elif content_type in (NSPDFPboardType, NSPasteboardTypeRTF):
+        icon = "📑" if content_type == NSPDFPboardType else "📝"
+        # Show the document's own text once the background extraction has run
+        text = " ".join(item.extracted_text[:200].split()) if item.extracted_text else ""
+        if not text:
+            text = "PDF Document" if content_type == NSPDFPboardType else "Rich Text Document"
+        elif len(text) > 97:
+            text = text[:94] + "..."
+        display_text = f"{icon} {text}"
+    else:
+        display_text = f"Unknown type: {content_type}"
+    return display_text
+
+def file_text(item):
+    """
+    Get the text describing a file item, from its cached metadata only.
+
+    Args:
+        item: A file ClipboardItem.
+
+    Returns:
+        str: Name, kind and size of the file, or a summary of several files.
+    """
+    if not item.files:
+        return f"📄 {os.path.basename(item.content)}"
+    files = item.files
+    first = files[0]
+    if len(files) == 1:
+        display_text = f"📄 {first.name} — {first.kind}"
+    else:
+        display_text = f"📄 {first.name} + {len(files) - 1} more"
+    sizes = [f.size for f in files if f.size is not None]
+    if sizes:
+        display_text += f", {format_bytes(sum(sizes))}"
+    missing = sum(1 for f in files if not f.exists)
+    if missing:
+        display_text += " (missing)" if missing == len(files) else f" ({missing} missing)"
+    return display_text
+
+def is_stale(item):
+    """
+    Check whether every file of a file item was missing when last checked.
+    """
+    return bool(item.files) and not any(f.exists for f in item.files)
+
+def build_rows(history, selected_items=()):
+    """
+    Build the rows displayed by the popup for a list of items.
+
+    This holds all the per-item display decisions, so it can be exercised and
+    timed without any view objects.
+
+    Args:
+        history: The ClipboardItem objects to display, in order.
+        selected_items: Items selected for multi-paste, in selection order.
+
+    Returns:
+        list: HistoryRow objects, one per item.
+    """
+    selection = {id(item): position + 1 for position, item in enumerate(selected_items)}
+    image_codes = {type_code(content_type) for content_type in IMAGE_TYPES}
+    return [
+        HistoryRow(item, index, row_text(item), item.type_code in image_codes,
+                   selection.get(id(item), 0), is_stale(item))
+        for index, item in enumerate(history)
+    ]
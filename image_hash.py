@@ -0,0 +1,178 @@
+import logging
+
+logger = logging.getLogger(__name__)
+
+HASH_SIZE = 8
+
+def dhash_from_pixels(pixels, width, height):
+    """
+    Compute a difference hash from a small grayscale bitmap.
+
+    Each bit compares a pixel with its right-hand neighbour, which makes the
+    hash robust to re-encoding, scaling and small brightness changes.
+
+    Args:
+        pixels: Grayscale bytes in row-major order, one byte per pixel.
+        width: Bitmap width, one more than the number of bits per row.
+        height: Bitmap height, the number of rows hashed.
+
+    Returns:
+        int: The hash, with (width - 1) * height significant bits.
+    """
+    value = 0
+    for row in range(height):
+        offset = row * width
+        for col in range(width - 1):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+def compute_image_hash(data):
+    """
+    Compute the perceptual hash of an encoded image.
+
+    The image is decoded and downsampled by Quartz straight into a tiny
+    grayscale bitmap, so the full-size image is never held as pixels. This is
+    safe to call from a background thread.
+
+    Args:
+        data: NSData or bytes holding a PNG, TIFF or other image.
+
+    Returns:
+        int: The 64-bit perceptual hash, or None if the image can't be decoded.
+    """
+    from Foundation import NSData
+    from Quartz import (CGImageSourceCreateWithData, CGImageSourceCreateImageAtIndex,
+                       CGColorSpaceCreateDeviceGray, CGBitmapContextCreate,
+                       CGBitmapContextGetData, CGContextDrawImage, CGRectMake,
+                       kCGImageAlphaNone)
+
+    try:
+        if isinstance(data, bytes):
+            data = NSData.dataWithBytes_length_(data, len(data))
+
+        source = CGImageSourceCreateWithData(data, None)
+        if source is None:
+            return None
+        image = CGImageSourceCreateImageAtIndex(source, 0, None)
+        if image is None:
+            return None
+
+        width, height = HASH_SIZE + 1, HASH_SIZE
+        context = CGBitmapContextCreate(None, width, height, 8, width,
+                                        CGColorSpaceCreateDeviceGray(), kCGImageAlphaNone)
+        CGContextDrawImage(context, CGRectMake(0, 0, width, height), image)
+        pixels = bytes(CGBitmapContextGetData(context).as_buffer(width * height))
+        return dhash_from_pixels(pixels, width, height)
+    except Exception as e:
+        logger.error(f"Error computing image hash: {e}")
+        return None
+
+def hamming_distance(a, b):
+    """
+    Count the bits that differ between two hashes.
+    """
+    return bin(a ^ b).count("1")
+
+class PerceptualHashIndex:
+    """
+    A similarity index over perceptual hashes.
+
+    Hashes are split into bands of consecutive bits, and each band value maps
+    to the keys having it (multi-index hashing). Two hashes within distance d
+    of each other differ in at most d bands, so when there are more bands
+    than d they agree exactly on at least one: a lookup only compares the
+    keys sharing a band with the query instead of every stored image. Larger
+    distances fall back to a linear scan.
+    """
+
+    def __init__(self, bits=HASH_SIZE * HASH_SIZE, bands=5):
+        """
+        Initialize an empty index.
+
+        Args:
+            bits: Number of significant bits in a hash (default: 64).
+            bands: Number of bands the hash is split into (default: 5, which
+                finds every match within distance 4).
+        """
+        self.band_bits = -(-bits // bands)
+        self._mask = (1 << self.band_bits) - 1
+        self._hashes = {}
+        self._bands = [{} for _ in range(bands)]
+
+    def __len__(self):
+        return len(self._hashes)
+
+    def __contains__(self, key):
+        return key in self._hashes
+
+    def _band_values(self, value):
+        return [(value >> (band * self.band_bits)) & self._mask for band in range(len(self._bands))]
+
+    def add(self, key, value):
+        """
+        Add a key with its hash, replacing any previous hash for that key.
+
+        Args:
+            key: Hashable object identifying the image (e.g. a ClipboardItem).
+            value: The perceptual hash of the image.
+        """
+        if key in self._hashes:
+            self.remove(key)
+        self._hashes[key] = value
+        for table, band_value in zip(self._bands, self._band_values(value)):
+            table.setdefault(band_value, set()).add(key)
+
+    def remove(self, key):
+        """
+        Remove a key from the index.
+
+        Args:
+            key: The key to remove.
+
+        Returns:
+            bool: True if the key was present, False otherwise.
+        """
+        value = self._hashes.pop(key, None)
+        if value is None:
+            return False
+
+        for table, band_value in zip(self._bands, self._band_values(value)):
+            bucket = table[band_value]
+            bucket.discard(key)
+            if not bucket:
+                del table[band_value]
+        return True
+
+    def find_within(self, value, max_distance):
+        """
+        Find all keys whose hash is within a Hamming distance of a value.
+
+        Args:
+            value: The perceptual hash to search around.
+            max_distance: Largest Hamming distance considered a match.
+
+        Returns:
+            list: (key, distance) tuples sorted by increasing distance.
+        """
+        if max_distance < len(self._bands):
+            candidates = set()
+            for table, band_value in zip(self._bands, self._band_values(value)):
+                candidates.update(table.get(band_value, ()))
+        else:
+            candidates = self._hashes
+
+        matches = []
+        for key in candidates:
+            distance = hamming_distance(value, self._hashes[key])
+            if distance <= max_distance:
+                matches.append((key, distance))
+        matches.sort(key=lambda match: match[1])
+        return matches
+
+    def clear(self):
+        """
+        Remove every entry from the index.
+        """
+        self._hashes.clear()
+        for table in self._bands:
+            table.clear()
@@ -0,0 +1,87 @@
+import logging
+import time
+from pasteboard_types import NSPasteboardTypePNG, NSPasteboardTypeTIFF, IMAGE_TYPES
+
+logger = logging.getLogger(__name__)
+
+def promise_types(content_type):
+    """
+    Get the pasteboard types promised for a binary item.
+
+    Images are offered as PNG and TIFF as well as their own type, like the
+    eager writes did.
+    """
+    if content_type in IMAGE_TYPES:
+        return tuple(dict.fromkeys((content_type, NSPasteboardTypePNG, NSPasteboardTypeTIFF)))
+    return (content_type,)
+
+class PayloadProvider:
+    """
+    Supplies a pasted item's payload when the receiving application asks.
+
+    Pasting only promises the types; the payload, resident or mapped from
+    its cache file when the promise is made, is handed over the first time
+    one of them is requested, and shared by all of them. Without a payload,
+    it is loaded on that first request. The AppKit data provider and fake
+    pasteboards both call provide() and finished(); a fake pasteboard
+    exposes write_promises(provider) to be handed the provider directly.
+    """
+
+    def __init__(self, path, types, loader, resident=None, stats=None):
+        """
+        Initialize a provider.
+
+        Args:
+            path: The payload's cache file.
+            types: Pasteboard types promised.
+            loader: Function taking the cache file path and returning the
+                payload (NSData), or None if it can't be read.
+            resident: The payload, if it is already in memory or mapped.
+            stats: Dict of counters shared by the providers of one history.
+        """
+        self.path = path
+        self.types = tuple(types)
+        self.loader = loader
+        self._data = resident
+        self.requested = False
+        self.stats = stats if stats is not None else {}
+
+    def _count(self, key, value=1):
+        self.stats[key] = self.stats.get(key, 0) + value
+
+    def provide(self, content_type):
+        """
+        Get the payload for a promised type.
+
+        Args:
+            content_type: The type the receiving application asked for.
+
+        Returns:
+            NSData: The payload, or None if the type wasn't promised or the
+                    payload can't be read.
+        """
+        if content_type not in self.types:
+            return None
+        if not self.requested:
+            self.requested = True
+            self._count("requested")
+        if self._data is None:
+            start = time.perf_counter()
+            self._data = self.loader(self.path)
+            self._count("load_time", time.perf_counter() - start)
+            if self._data is None:
+                logger.error(f"Error providing {content_type} from {self.path}")
+                self._count("failed")
+                return None
+            self._count("loaded")
+        self._count("provided")
+        self._count("bytes_provided", int(self._data.length()))
+        return self._data
+
+    def finished(self):
+        """
+        Release the payload once the pasteboard no longer needs the provider.
+        """
+        if not self.requested:
+            self._count("unrequested")
+        self._data = None
@@ -4,12 +4,68 @@ from Quartz import (CFMachPortCreateRunLoopSource, CFRunLoopGetCurrent,
                    CGEventMaskBit, kCGEventKeyDown, CGEventGetFlags,
                    kCGEventFlagMaskCommand, kCGEventFlagMaskAlternate,
                    kCGEventFlagMaskShift, kCGEventFlagMaskControl, CGEventGetIntegerValueField,
-                   kCGKeyboardEventKeycode, CFRunLoopAddSource,
-                   CGEventTapEnable)
+                   kCGKeyboardEventKeycode, kCGKeyboardEventAutorepeat, CFRunLoopAddSource,
+                   CGEventTapEnable, CGEventTapIsEnabled,
+                   kCGEventTapDisabledByTimeout, kCGEventTapDisabledByUserInput)
+from Foundation import NSObject, NSTimer
+from objc import super
+from collections import deque
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
+# Time the tap callback aims to stay under; the system disables taps whose
+# callbacks keep it waiting much longer than this
+CALLBACK_BUDGET = 0.001
+
+def call_on_run_loop(func):
+    """
+    Queue a function to run on the main run loop once the current event is done.
+    """
+    from PyObjCTools.AppHelper import callAfter
+    callAfter(func)
+
+class TapWatchdog(NSObject):
+    """
+    Periodically checks that the listener's event tap is still enabled.
+
+    Tap-disabled notifications are handled in the tap callback, but they can
+    be missed (e.g. while the callback itself is stuck), so a timer checks
+    the tap state as well.
+    """
+
+    def initWithListener_(self, listener):
+        """
+        Initialize the watchdog with a listener reference.
+
+        Args:
+            listener: MacKeyboardListener whose tap is watched.
+
+        Returns:
+            The initialized TapWatchdog instance.
+        """
+        self = super(TapWatchdog, self).init()
+        if self is not None:
+            self.listener = listener
+        return self
+
+    def checkTap_(self, timer):
+        """
+        Re-enable the tap if the system disabled it.
+
+        Args:
+            timer: NSTimer instance that triggered this check.
+        """
+        try:
+            listener = self.listener
+            if listener.running and listener.tap is not None and not CGEventTapIsEnabled(listener.tap):
+                logger.warning("Event tap found disabled; re-enabling")
+                listener.stats["watchdog_reenabled"] += 1
+                CGEventTapEnable(listener.tap, True)
+        except Exception as e:
+            logger.error(f"Error checking event tap: {e}")
+
 class MacKeyboardListener:
     """
     A keyboard event listener for macOS that detects specific key combinations.
@@ -19,17 +75,29 @@ class MacKeyboardListener:
     when certain key combinations are pressed.
     """
 
-    def __init__(self, callback):
+    def __init__(self, callback, dispatch=call_on_run_loop, watchdog_interval=5.0):
         """
         Initialize the keyboard listener.
 
         Args:
             callback: Function to call when the target key combination is detected.
+            dispatch: Function queueing the callback to run after the tap
+                callback returns (default: on the main run loop).
+            watchdog_interval: Seconds between checks that the tap is enabled.
         """
         self.callback = callback
+        self.dispatch = dispatch
+        self.watchdog_interval = watchdog_interval
         self.running = False
         self.tap = None
         self.run_loop_source = None
+        self.watchdog = None
+        self.watchdog_timer = None
+        self.durations = deque(maxlen=1024)
+        self.stats = {"events": 0, "hotkeys": 0, "over_budget": 0, "max_duration": 0.0,
+                      "total_duration": 0.0, "disabled_by_timeout": 0,
+                      "disabled_by_user_input": 0, "watchdog_reenabled": 0,
+                      "autorepeat_ignored": 0}
         
         self.KEY_CODES = {
             0: 'a', 1: 's', 2: 'd', 3: 'f', 4: 'h', 5: 'g', 6: 'z', 7: 'x',
@@ -67,7 +135,12 @@ class MacKeyboardListener:
         Raises:
             Exception: If there's an error handling the event.
         """
+        start = time.perf_counter()
         try:
+            if event_type in (kCGEventTapDisabledByTimeout, kCGEventTapDisabledByUserInput):
+                self._handle_tap_disabled(event_type)
+                return event
+
             if event_type == kCGEventKeyDown:
                 key_code = CGEventGetIntegerValueField(event, kCGKeyboardEventKeycode)
                 flags = CGEventGetFlags(event)
@@ -80,13 +153,62 @@ class MacKeyboardListener:
                 
                 if key_code == 9 and cmd_pressed and alt_pressed and ctrl_pressed:
                     #logger.info("Shortcut detected: Command + Control + Option + V!")
-                    self.callback()
+                    # Holding the shortcut repeats the key-down; only the first press counts
+                    if CGEventGetIntegerValueField(event, kCGKeyboardEventAutorepeat):
+                        self.stats["autorepeat_ignored"] += 1
+                    else:
+                        # The system waits on this callback: only queue the work
+                        self.stats["hotkeys"] += 1
+                        self.dispatch(self.callback)
                 
         except Exception as e:
             logger.error(f"Error handling event: {e}")
         
+        self._record_duration(time.perf_counter() - start)
         return event
 
+    def _handle_tap_disabled(self, event_type):
+        """
+        Re-enable the tap after the system disabled it.
+
+        Args:
+            event_type: kCGEventTapDisabledByTimeout or kCGEventTapDisabledByUserInput.
+        """
+        if event_type == kCGEventTapDisabledByTimeout:
+            self.stats["disabled_by_timeout"] += 1
+            logger.warning("Event tap disabled by timeout; re-enabling")
+        else:
+            self.stats["disabled_by_user_input"] += 1
+            logger.warning("Event tap disabled by user input; re-enabling")
+        if self.running and self.tap is not None:
+            CGEventTapEnable(self.tap, True)
+
+    def _record_duration(self, duration):
+        self.durations.append(duration)
+        self.stats["events"] += 1
+        self.stats["total_duration"] += duration
+        if duration > self.stats["max_duration"]:
+            self.stats["max_duration"] = duration
+        if duration > CALLBACK_BUDGET:
+            self.stats["over_budget"] += 1
+
+    def callback_stats(self):
+        """
+        Report how long the tap callback keeps the system waiting.
+
+        Returns:
+            dict: The event, hotkey, over-budget and tap-disabled counters,
+                  plus the mean, median, 99th percentile and maximum callback
+                  durations in seconds (percentiles over recent events).
+        """
+        stats = dict(self.stats)
+        recent = sorted(self.durations)
+        stats["budget"] = CALLBACK_BUDGET
+        stats["mean_duration"] = stats["total_duration"] / stats["events"] if stats["events"] else 0.0
+        stats["p50_duration"] = recent[len(recent) // 2] if recent else 0.0
+        stats["p99_duration"] = recent[int(len(recent) * 0.99)] if recent else 0.0
+        return stats
+
     def start(self):
         """
         Start listening for keyboard events.
@@ -128,6 +250,15 @@ class MacKeyboardListener:
                 kCFRunLoopDefaultMode
             )
             
+            self.watchdog = TapWatchdog.alloc().initWithListener_(self)
+            self.watchdog_timer = NSTimer.scheduledTimerWithTimeInterval_target_selector_userInfo_repeats_(
+                self.watchdog_interval,
+                self.watchdog,
+                'checkTap:',
+                None,
+                True
+            )
+            
             logger.info("Keyboard listener started successfully")
             logger.info("Waiting for keyboard events...")
             
@@ -148,6 +279,10 @@ class MacKeyboardListener:
         """
         try:
             logger.info("Stopping keyboard listener...")
+            if self.watchdog_timer:
+                self.watchdog_timer.invalidate()
+                self.watchdog_timer = None
+                self.watchdog = None
             if self.tap:
                 CGEventTapEnable(self.tap, False)
                 self.tap = None
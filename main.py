@@ -1,7 +1,14 @@
 import logging
+import os
 from mac_keyboard_listener import MacKeyboardListener
 from popup_window import PopupWindow
 from mouse_position import get_mouse_position
+from memory_report import format_bytes
+from query_server import QueryServer
+from workload_trace import TraceRecorder
+from expiry import parse_ttls
+from memory_pressure import LEVEL_NAMES, LEVEL_WARN
+from pasteboard_types import IMAGE_TYPES, NSPDFPboardType, NSPasteboardTypeRTF
 from AppKit import (
     NSApplication, 
     NSApp, 
@@ -20,6 +27,15 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
+query_server = None
+
+# Status menu clean-up entries and the ClipboardHistory.remove_items() criteria they apply
+CLEANUP_ACTIONS = {
+    "Delete Images": {"content_types": IMAGE_TYPES},
+    "Delete Documents": {"content_types": (NSPDFPboardType, NSPasteboardTypeRTF)},
+    "Delete Items Older Than a Day": {"min_age": 24 * 60 * 60},
+}
+
 class ClipboardChecker(NSObject):
     """
     A class that periodically checks the clipboard for changes.
@@ -60,14 +76,157 @@ class ClipboardChecker(NSObject):
         except Exception as e:
             logger.error(f"Error while checking clipboard: {e}")
 
-def create_menu():
+class StatusMenuController(NSObject):
+    """
+    Keeps the status bar menu's memory figures up to date.
+
+    Acts as the menu's delegate, refreshing the memory usage entries each time
+    the menu opens, and as the target of the memory report item.
+    """
+
+    def initWithWindow_(self, window):
+        """
+        Initialize the controller with a window reference.
+
+        Args:
+            window: PopupWindow instance whose clipboard history is reported.
+
+        Returns:
+            The initialized StatusMenuController instance.
+        """
+        self = super(StatusMenuController, self).init()
+        if self is not None:
+            self.window = window
+            self.memory_item = None
+            self.keyboard = None
+        return self
+
+    def menuWillOpen_(self, menu):
+        """
+        Refresh the memory usage entries before the menu is shown.
+
+        Args:
+            menu: The NSMenu about to open.
+        """
+        try:
+            report = self.window.clipboard_history.get_memory_report()
+            total = report["total"]
+            title = f"Memory: {format_bytes(total['bytes'])} ({total['count']} items)"
+            pressure = self.window.clipboard_history.get_pressure_stats()
+            if pressure is not None and pressure["level"] >= LEVEL_WARN:
+                title += f" - pressure {LEVEL_NAMES[pressure['level']]}"
+            self.memory_item.setTitle_(title)
+
+            submenu = NSMenu.alloc().init()
+            for content_type, usage in sorted(report["by_type"].items()):
+                line = (f"{content_type}: {usage['count']} items, "
+                        f"{format_bytes(usage['python'])} objects, "
+                        f"{format_bytes(usage['payload'])} data, "
+                        f"{format_bytes(usage['decoded'])} images")
+                submenu.addItem_(NSMenuItem.alloc().initWithTitle_action_keyEquivalent_(line, None, ""))
+            self.memory_item.setSubmenu_(submenu)
+        except Exception as e:
+            logger.error(f"Error updating memory usage: {e}")
+
+    def showMemoryReport_(self, sender):
+        """
+        Log the memory growth by code path since the previous report.
+
+        Args:
+            sender: The menu item that was clicked.
+        """
+        try:
+            for line in self.window.clipboard_history.memory.growth_report():
+                logger.info(line)
+        except Exception as e:
+            logger.error(f"Error creating memory report: {e}")
+
+    def showTapStats_(self, sender):
+        """
+        Log how long the keyboard event tap callback takes.
+
+        Args:
+            sender: The menu item that was clicked.
+        """
+        try:
+            stats = self.keyboard.callback_stats()
+            logger.info(
+                f"Event tap: {stats['events']} events, {stats['hotkeys']} hotkeys, "
+                f"mean {stats['mean_duration'] * 1e6:.0f} us, p99 {stats['p99_duration'] * 1e6:.0f} us, "
+                f"max {stats['max_duration'] * 1e6:.0f} us, "
+                f"{stats['over_budget']} over the {stats['budget'] * 1e3:.0f} ms budget; "
+                f"disabled {stats['disabled_by_timeout']} times by timeout and "
+                f"{stats['disabled_by_user_input']} by user input, "
+                f"re-enabled {stats['watchdog_reenabled']} times by the watchdog, "
+                f"{stats['autorepeat_ignored']} auto-repeats ignored"
+            )
+            scheduler = self.window.scheduler
+            logger.info(
+                f"Popup updates: {scheduler.stats['requested']} requested, "
+                f"{scheduler.stats['run']} run in {scheduler.stats['frames']} frames, "
+                f"{scheduler.dropped()} redundant rebuilds dropped, "
+                f"{self.window.skipped_rebuilds} unchanged shows not rebuilt"
+            )
+        except Exception as e:
+            logger.error(f"Error reporting event tap stats: {e}")
+
+    def cleanUp_(self, sender):
+        """
+        Remove the items matching a clean-up menu entry.
+
+        Args:
+            sender: The menu item that was clicked; its title selects the
+                criteria in CLEANUP_ACTIONS.
+        """
+        try:
+            criteria = CLEANUP_ACTIONS[sender.title()]
+            result = self.window.clipboard_history.remove_items(**criteria)
+            logger.info(f"{sender.title()}: removed {result['removed']} items "
+                        f"in {result['elapsed'] * 1000:.1f} ms")
+            if result["removed"] and self.window.window.isVisible():
+                self.window._request_refresh()
+        except Exception as e:
+            logger.error(f"Error cleaning up history: {e}")
+
+def create_menu(controller):
     """
     Create the status bar menu for the application.
 
+    Args:
+        controller: StatusMenuController serving as delegate and target.
+
     Returns:
-        NSMenu: The configured menu with quit option.
+        NSMenu: The configured menu with memory usage and quit options.
     """
     menu = NSMenu.alloc().init()
+    menu.setDelegate_(controller)
+
+    controller.memory_item = NSMenuItem.alloc().initWithTitle_action_keyEquivalent_(
+        "Memory: -", None, ""
+    )
+    menu.addItem_(controller.memory_item)
+
+    report_item = NSMenuItem.alloc().initWithTitle_action_keyEquivalent_(
+        "Log Memory Growth", "showMemoryReport:", ""
+    )
+    report_item.setTarget_(controller)
+    menu.addItem_(report_item)
+
+    tap_item = NSMenuItem.alloc().initWithTitle_action_keyEquivalent_(
+        "Log Event Tap Stats", "showTapStats:", ""
+    )
+    tap_item.setTarget_(controller)
+    menu.addItem_(tap_item)
+
+    cleanup_item = NSMenuItem.alloc().initWithTitle_action_keyEquivalent_("Clean Up", None, "")
+    cleanup_menu = NSMenu.alloc().init()
+    for title in CLEANUP_ACTIONS:
+        action_item = NSMenuItem.alloc().initWithTitle_action_keyEquivalent_(title, "cleanUp:", "")
+        action_item.setTarget_(controller)
+        cleanup_menu.addItem_(action_item)
+    cleanup_item.setSubmenu_(cleanup_menu)
+    menu.addItem_(cleanup_item)
+    menu.addItem_(NSMenuItem.separatorItem())
     
     quit_item = NSMenuItem.alloc().initWithTitle_action_keyEquivalent_(
         "Quit", "terminate:", "q"
@@ -96,6 +255,28 @@ def main():
         global popup_window
         popup_window = PopupWindow()
         
+        ttl_spec = os.environ.get("WINDOWSV_TTL")
+        if ttl_spec:
+            try:
+                popup_window.clipboard_history.ttls = parse_ttls(ttl_spec)
+                logger.info(f"Expiring items after: {ttl_spec}")
+            except ValueError as e:
+                logger.error(f"Invalid WINDOWSV_TTL setting: {e}")
+        
+        # Decoded thumbnails are the cheapest to rebuild, so they go first
+        pressure = popup_window.clipboard_history.enable_memory_pressure()
+        pressure.register("thumbnails", LEVEL_WARN, popup_window.release_images, priority=0)
+        
+        sync_dir = os.environ.get("WINDOWSV_SYNC_DIR")
+        if sync_dir:
+            popup_window.clipboard_history.enable_sync(os.path.expanduser(sync_dir),
+                                                       os.environ.get("WINDOWSV_DEVICE"))
+        
+        trace_path = os.environ.get("WINDOWSV_TRACE")
+        if trace_path:
+            logger.info(f"Recording workload trace to {trace_path}")
+            popup_window.clipboard_history.recorder = TraceRecorder(os.path.expanduser(trace_path))
+        
         checker = ClipboardChecker.new()
         checker.initWithWindow_(popup_window)
         NSTimer.scheduledTimerWithTimeInterval_target_selector_userInfo_repeats_(
@@ -109,16 +290,24 @@ def main():
         def show_popup():
             try:
                 x, y = get_mouse_position()
-                popup_window.show(x, y)
+                popup_window.request_show(x, y)
             except Exception as e:
                 logger.error(f"Error while showing popup: {e}")
         
         keyboard = MacKeyboardListener(show_popup)
         keyboard.start()
         
+        global query_server
+        query_server = QueryServer(popup_window.clipboard_history)
+        query_server.start()
+        
         statusbar = NSStatusBar.systemStatusBar()
         statusitem = statusbar.statusItemWithLength_(-1)
-        statusitem.setMenu_(create_menu())
+        global menu_controller
+        menu_controller = StatusMenuController.new()
+        menu_controller.initWithWindow_(popup_window)
+        menu_controller.keyboard = keyboard
+        statusitem.setMenu_(create_menu(menu_controller))
         statusitem.setTitle_("📋")
         
         NSApplication.sharedApplication().run()
@@ -129,6 +318,8 @@ def main():
         logger.error(traceback.format_exc())
         
     finally:
+        if query_server is not None:
+            query_server.stop()
         logger.info("Application properly stopped")
 
 if __name__ == "__main__":
@@ -0,0 +1,189 @@
+import ctypes
+import ctypes.util
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+LEVEL_NORMAL = 0
+LEVEL_WARN = 1
+LEVEL_CRITICAL = 2
+
+LEVEL_NAMES = ("normal", "warn", "critical")
+
+# Values of kern.memorystatus_vm_pressure_level (DISPATCH_MEMORYPRESSURE_*)
+_SYSCTL_LEVELS = {1: LEVEL_NORMAL, 2: LEVEL_WARN, 4: LEVEL_CRITICAL}
+
+class SysctlPressureSource:
+    """
+    Reads the system memory pressure level with sysctl on macOS.
+    """
+
+    name = "kern.memorystatus_vm_pressure_level"
+
+    def __init__(self):
+        """
+        Initialize the source, loading the C library.
+        """
+        self._sysctlbyname = None
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+            self._sysctlbyname = libc.sysctlbyname
+        except Exception as e:
+            logger.error(f"Error loading sysctl: {e}")
+
+    def level(self):
+        """
+        Get the current pressure level.
+
+        Returns:
+            int: LEVEL_NORMAL, LEVEL_WARN or LEVEL_CRITICAL; LEVEL_NORMAL if
+                 the level can't be read.
+        """
+        if self._sysctlbyname is None:
+            return LEVEL_NORMAL
+        value = ctypes.c_int(0)
+        size = ctypes.c_size_t(ctypes.sizeof(value))
+        result = self._sysctlbyname(self.name.encode(), ctypes.byref(value), ctypes.byref(size), None, 0)
+        if result != 0:
+            logger.error(f"Error reading {self.name}: errno {ctypes.get_errno()}")
+            self._sysctlbyname = None
+            return LEVEL_NORMAL
+        return _SYSCTL_LEVELS.get(value.value, LEVEL_NORMAL)
+
+class SimulatedPressureSource:
+    """
+    A pressure source set by hand or from a script, for tests and benchmarks.
+    """
+
+    def __init__(self, levels=()):
+        """
+        Initialize the source.
+
+        Args:
+            levels: Levels returned by successive level() calls; the last one
+                is repeated once the script runs out (default: always normal).
+        """
+        self._script = list(levels)
+        self.current = LEVEL_NORMAL
+
+    def set_level(self, level):
+        """
+        Set the level returned from now on.
+        """
+        self._script = []
+        self.current = level
+
+    def level(self):
+        if self._script:
+            self.current = self._script.pop(0)
+        return self.current
+
+class MemoryPressurePolicy:
+    """
+    Sheds caches in priority order as memory pressure rises.
+
+    Stages are registered with the level from which they apply. Each check
+    reads the source; while the level is raised, every applicable stage is
+    run in priority order and reports the bytes it freed, so items captured
+    under pressure are shed too. When the level drops back, stages with a
+    restore function are told they may rebuild what they dropped. Restoring
+    is otherwise lazy: shed data is reloaded when something needs it.
+    """
+
+    def __init__(self, source, interval=2.0, clock=time.monotonic):
+        """
+        Initialize the policy.
+
+        Args:
+            source: Object whose level() returns the current pressure level.
+            interval: Minimum number of seconds between checks (default: 2).
+            clock: Function returning the current time in seconds.
+        """
+        self.source = source
+        self.interval = interval
+        self.clock = clock
+        self.level = LEVEL_NORMAL
+        self._next_check = 0.0
+        self._stages = []
+        self.stats = {"checks": 0, "transitions": 0,
+                      "freed": {name: 0 for name in LEVEL_NAMES[1:]},
+                      "freed_by_stage": {}}
+
+    def register(self, name, level, shed, restore=None, priority=0):
+        """
+        Add a shedding stage.
+
+        Args:
+            name: Name of the stage, used in reports.
+            level: Lowest pressure level at which the stage runs.
+            shed: Function freeing memory and returning the bytes freed.
+            restore: Optional function called when pressure drops below level.
+            priority: Stages run in increasing priority order (cheapest to
+                rebuild first).
+        """
+        self._stages.append((priority, name, level, shed, restore))
+        self._stages.sort(key=lambda stage: stage[0])
+        self.stats["freed_by_stage"].setdefault(name, 0)
+
+    def check(self, force=False):
+        """
+        Read the pressure level and shed or restore accordingly.
+
+        Args:
+            force: Check even if the interval hasn't elapsed.
+
+        Returns:
+            dict: Bytes freed per stage by this check (empty if nothing ran).
+        """
+        now = self.clock()
+        if not force and now < self._next_check:
+            return {}
+        self._next_check = now + self.interval
+        self.stats["checks"] += 1
+        try:
+            level = self.source.level()
+        except Exception as e:
+            logger.error(f"Error reading memory pressure: {e}")
+            return {}
+
+        previous, self.level = self.level, level
+        if level != previous:
+            self.stats["transitions"] += 1
+            logger.info(f"Memory pressure: {LEVEL_NAMES[previous]} -> {LEVEL_NAMES[level]}")
+            for _, name, stage_level, _, restore in self._stages:
+                if restore is not None and level < stage_level <= previous:
+                    try:
+                        restore()
+                    except Exception as e:
+                        logger.error(f"Error restoring {name}: {e}")
+        return self.shed(level)
+
+    def shed(self, level):
+        """
+        Run the stages that apply at a level, in priority order.
+
+        Args:
+            level: The pressure level to shed for.
+
+        Returns:
+            dict: Bytes freed per stage.
+        """
+        freed = {}
+        if level == LEVEL_NORMAL:
+            return freed
+        for _, name, stage_level, shed, _ in self._stages:
+            if stage_level > level:
+                continue
+            try:
+                freed[name] = shed() or 0
+            except Exception as e:
+                logger.error(f"Error shedding {name}: {e}")
+                continue
+            self.stats["freed_by_stage"][name] += freed[name]
+        total = sum(freed.values())
+        self.stats["freed"][LEVEL_NAMES[level]] += total
+        if total:
+            logger.info(f"Memory pressure {LEVEL_NAMES[level]}: freed "
+                        + ", ".join(f"{name} {size} bytes" for name, size in freed.items()))
+        return freed
@@ -0,0 +1,157 @@
+import logging
+import sys
+import tracemalloc
+
+logger = logging.getLogger(__name__)
+
+def _deep_size(value):
+    """
+    Approximate the size of a str, bytes or tuple value and its contents.
+    """
+    if value is None:
+        return 0
+    size = sys.getsizeof(value)
+    if isinstance(value, tuple):
+        size += sum(_deep_size(element) for element in value)
+    return size
+
+def item_memory(item):
+    """
+    Estimate the resident memory held by a clipboard item.
+
+    Args:
+        item: The ClipboardItem to measure.
+
+    Returns:
+        dict: Bytes held as Python objects ("python") and as the NSData
+              payload ("payload").
+    """
+    python = sys.getsizeof(item)
+    attributes = getattr(item, "__dict__", None)
+    if attributes is not None:
+        python += sys.getsizeof(attributes)
+    # Text is measured as stored: a delta-encoded item holds only its delta
+    python += _deep_size(getattr(item, "_content", None))
+    python += _deep_size(getattr(item, "delta", None))
+    python += _deep_size(getattr(item, "extracted_text", None))
+    # Previews derived from the content are flags, not strings
+    preview = item._preview if hasattr(item, "_preview") else item.preview
+    if isinstance(preview, str):
+        python += _deep_size(preview)
+
+    # Only the resident payload counts; a shed one is read from disk on use
+    data = item._raw_data if hasattr(item, "_raw_data") else item.raw_data
+    payload = 0
+    if data is not None:
+        try:
+            payload = int(data.length())
+        except Exception:
+            payload = len(data)
+    return {"python": python, "payload": payload}
+
+class MemoryAccountant:
+    """
+    Accounts for the memory held by the clipboard history.
+
+    Items are measured on demand; decoded images, which live in the popup's
+    views rather than in the items, are registered here by the popup while
+    they are alive. Memory growth by code path is available from tracemalloc
+    snapshots, started the first time a growth report is requested.
+    """
+
+    def __init__(self, trace_frames=5):
+        """
+        Initialize the accountant.
+
+        Args:
+            trace_frames: Stack depth recorded by tracemalloc (default: 5).
+        """
+        self.trace_frames = trace_frames
+        self._decoded = {}
+        self._last_snapshot = None
+
+    def track_decoded(self, item, nbytes):
+        """
+        Register the decoded image held for an item.
+
+        Args:
+            item: The ClipboardItem the image belongs to.
+            nbytes: Size of the decoded pixels in bytes.
+        """
+        self._decoded[item] = nbytes
+
+    def release_decoded(self, item):
+        """
+        Forget the decoded image of an item.
+        """
+        self._decoded.pop(item, None)
+
+    def clear_decoded(self):
+        """
+        Forget every decoded image, e.g. when the popup views are rebuilt.
+        """
+        self._decoded.clear()
+
+    def report(self, history):
+        """
+        Account for the memory held by every item, grouped by content type.
+
+        Args:
+            history: Iterable of ClipboardItem objects.
+
+        Returns:
+            dict: "total" and "by_type" byte counts, each split into
+                  "python", "payload" and "decoded", plus per-type "count".
+        """
+        by_type = {}
+        total = {"count": 0, "python": 0, "payload": 0, "decoded": 0}
+        for item in history:
+            usage = item_memory(item)
+            usage["decoded"] = self._decoded.get(item, 0)
+            usage["count"] = 1
+            bucket = by_type.setdefault(item.content_type,
+                                        {"count": 0, "python": 0, "payload": 0, "decoded": 0})
+            for key, value in usage.items():
+                bucket[key] += value
+                total[key] += value
+        total["bytes"] = total["python"] + total["payload"] + total["decoded"]
+        return {"total": total, "by_type": by_type}
+
+    def growth_report(self, limit=10):
+        """
+        Compare a new tracemalloc snapshot with the one from the previous call.
+
+        The first call starts tracing if needed and only records a baseline.
+
+        Args:
+            limit: Number of code paths to report (default: 10).
+
+        Returns:
+            list: Formatted lines for the code paths whose memory grew the most.
+        """
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.trace_frames)
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+        ))
+        previous, self._last_snapshot = self._last_snapshot, snapshot
+        if previous is None:
+            return ["Memory tracing started; request another report to see growth"]
+
+        lines = []
+        for stat in snapshot.compare_to(previous, "traceback")[:limit]:
+            if stat.size_diff <= 0:
+                break
+            lines.append(f"+{format_bytes(stat.size_diff)} ({stat.count_diff:+d} blocks)")
+            lines.extend(f"    {line}" for line in stat.traceback.format()[-2 * self.trace_frames:])
+        return lines or ["No memory growth since the last report"]
+
+def format_bytes(size):
+    """
+    Format a byte count for display, e.g. "1.5 MB".
+    """
+    for unit in ("B", "KB", "MB"):
+        if abs(size) < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
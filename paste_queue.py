@@ -0,0 +1,183 @@
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+V_KEYCODE = 9
+TAB_KEYCODE = 48
+
+class QuartzEventPoster:
+    """
+    Posts synthetic keyboard events to the system through Quartz.
+    """
+
+    def post_key(self, keycode, key_down, command=False):
+        """
+        Post a single key event.
+
+        Args:
+            keycode: Virtual key code of the key.
+            key_down: True for a key press, False for a key release.
+            command: Whether the Command modifier is held.
+        """
+        from Quartz import (CGEventCreateKeyboardEvent, CGEventPost, CGEventSetFlags,
+                           kCGHIDEventTap, kCGEventFlagMaskCommand)
+
+        event = CGEventCreateKeyboardEvent(None, keycode, key_down)
+        if command:
+            CGEventSetFlags(event, kCGEventFlagMaskCommand)
+        CGEventPost(kCGHIDEventTap, event)
+
+def call_later(delay, callback):
+    """
+    Schedule a callback on the main run loop after a delay.
+    """
+    from PyObjCTools.AppHelper import callLater
+    callLater(delay, callback)
+
+class PasteQueue:
+    """
+    Pastes several clipboard items in sequence without blocking the main thread.
+
+    Each item is written to the pasteboard and followed by a Cmd+V; the key
+    release, the optional separator and the next item are scheduled on timers
+    rather than slept on, so the run loop keeps processing events between
+    steps.
+    """
+
+    def __init__(self, write_item, write_text, poster=None, schedule=call_later,
+                 separator=None, key_delay=0.1, step_delay=0.05,
+                 on_item_pasted=None, on_finished=None):
+        """
+        Initialize the queue.
+
+        Args:
+            write_item: Function writing a ClipboardItem to the pasteboard,
+                returning True on success.
+            write_text: Function writing a plain string to the pasteboard,
+                returning True on success.
+            poster: Object with post_key(keycode, key_down, command); defaults
+                to a QuartzEventPoster.
+            schedule: Function (delay, callback) scheduling the next step.
+            separator: None, "tab" to press Tab between items, or a string
+                pasted between items.
+            key_delay: Seconds between the Cmd+V press and release (default: 0.1).
+            step_delay: Seconds left to the receiving app to read the pasteboard
+                before it is overwritten (default: 0.05).
+            on_item_pasted: Optional callback receiving each pasted item.
+            on_finished: Optional callback receiving the queue when it is done.
+        """
+        self.write_item = write_item
+        self.write_text = write_text
+        self.poster = poster or QuartzEventPoster()
+        self.schedule = schedule
+        self.separator = separator
+        self.key_delay = key_delay
+        self.step_delay = step_delay
+        self.on_item_pasted = on_item_pasted
+        self.on_finished = on_finished
+        self.pending = []
+        self.pasted = 0
+        self.failed = 0
+        self.started_at = None
+        self.finished_at = None
+
+    @property
+    def running(self):
+        return self.started_at is not None and self.finished_at is None
+
+    def start(self, items):
+        """
+        Start pasting items, in order.
+
+        Args:
+            items: The ClipboardItem objects to paste.
+        """
+        self.pending = list(items)
+        self.pasted = 0
+        self.failed = 0
+        self.started_at = time.perf_counter()
+        self.finished_at = None
+        self._paste_next()
+
+    def cancel(self):
+        """
+        Drop the items not pasted yet; the step in progress completes.
+        """
+        self.pending.clear()
+
+    def throughput(self):
+        """
+        Get the number of items pasted per second by the last run.
+
+        Returns:
+            float: Items per second, or 0.0 if no run has finished.
+        """
+        if self.finished_at is None or self.finished_at <= self.started_at:
+            return 0.0
+        return self.pasted / (self.finished_at - self.started_at)
+
+    def _paste_next(self):
+        if not self.pending:
+            self._finish()
+            return
+
+        item = self.pending.pop(0)
+        try:
+            if not self.write_item(item):
+                logger.error(f"Failed to write queued item: {item.content_type}")
+                self.failed += 1
+                self.schedule(0, self._paste_next)
+                return
+            self.poster.post_key(V_KEYCODE, True, command=True)
+        except Exception as e:
+            logger.error(f"Error pasting queued item: {e}")
+            self.failed += 1
+            self.schedule(0, self._paste_next)
+            return
+        self.schedule(self.key_delay, lambda: self._release_paste(item))
+
+    def _release_paste(self, item):
+        try:
+            self.poster.post_key(V_KEYCODE, False)
+            self.pasted += 1
+            if self.on_item_pasted is not None:
+                self.on_item_pasted(item)
+        except Exception as e:
+            logger.error(f"Error releasing paste key: {e}")
+            self.failed += 1
+
+        if self.pending and self.separator is not None:
+            self.schedule(self.step_delay, self._paste_separator)
+        else:
+            self.schedule(self.step_delay, self._paste_next)
+
+    def _paste_separator(self):
+        try:
+            if self.separator == "tab":
+                self.poster.post_key(TAB_KEYCODE, True)
+                self.poster.post_key(TAB_KEYCODE, False)
+                self.schedule(self.step_delay, self._paste_next)
+                return
+            if self.write_text(self.separator):
+                self.poster.post_key(V_KEYCODE, True, command=True)
+                self.schedule(self.key_delay, self._release_separator)
+                return
+            logger.error("Failed to write separator")
+        except Exception as e:
+            logger.error(f"Error pasting separator: {e}")
+        self.schedule(self.step_delay, self._paste_next)
+
+    def _release_separator(self):
+        try:
+            self.poster.post_key(V_KEYCODE, False)
+        except Exception as e:
+            logger.error(f"Error releasing paste key: {e}")
+        self.schedule(self.step_delay, self._paste_next)
+
+    def _finish(self):
+        self.finished_at = time.perf_counter()
+        logger.info(f"Paste queue finished: {self.pasted} pasted, {self.failed} failed "
+                    f"({self.throughput():.1f} items/s)")
+        if self.on_finished is not None:
+            self.on_finished(self)
@@ -0,0 +1,17 @@
+"""
+Pasteboard type identifiers, with the same values as the AppKit constants.
+
+Modules that must also work without AppKit (the view-model, the fake
+pasteboard used to replay traces) use these instead of importing AppKit.
+"""
+
+NSStringPboardType = "NSStringPboardType"
+NSFilenamesPboardType = "NSFilenamesPboardType"
+NSPDFPboardType = "Apple PDF pasteboard type"
+NSPasteboardTypePNG = "public.png"
+NSPasteboardTypeTIFF = "public.tiff"
+NSPasteboardTypeRTF = "public.rtf"
+NSPasteboardTypeFileURL = "public.file-url"
+UTF8_TEXT_TYPE = "public.utf8-plain-text"
+
+IMAGE_TYPES = (NSPasteboardTypePNG, NSPasteboardTypeTIFF)
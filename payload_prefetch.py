@@ -0,0 +1,144 @@
+import logging
+from background_tasks import BackgroundTasks
+
+logger = logging.getLogger(__name__)
+
+class PayloadPrefetcher:
+    """
+    Reloads shed payloads in the background while the popup is open.
+
+    When the popup opens, the payloads of its top rows are requested; rows
+    under the cursor are requested as they are hovered. A paste then claims
+    its item's payload: already loaded is a hit, still loading is a late hit
+    (the paste waits for the load already under way), and not requested is a
+    miss that loads on the paste path. Payloads warmed but not pasted are
+    shed again when the popup closes, so prefetching doesn't undo what
+    memory pressure released.
+    """
+
+    def __init__(self, loader, max_bytes=64 * 1024 * 1024, top_rows=5):
+        """
+        Initialize the prefetcher.
+
+        Args:
+            loader: Function taking a cache file path and returning the
+                payload, or None; called on a worker thread.
+            max_bytes: Maximum bytes of payloads loaded or loading at once
+                (default: 64 MB).
+            top_rows: Number of rows requested when the popup opens (default: 5).
+        """
+        self.loader = loader
+        self.max_bytes = max_bytes
+        self.top_rows = top_rows
+        self.tasks = BackgroundTasks(name="clipboard-prefetch")
+        self.active = False
+        self._pending = {}
+        self._warmed = {}
+        self.stats = {"requested": 0, "loaded": 0, "bytes_loaded": 0, "over_cap": 0,
+                      "hits": 0, "late_hits": 0, "misses": 0, "released": 0}
+
+    def _reserved_bytes(self):
+        return sum(self._warmed.values()) + sum(size for size, _ in self._pending.values())
+
+    def begin(self, items):
+        """
+        Start a popup session and request the payloads of the top rows.
+
+        Args:
+            items: The displayed items, top row first.
+        """
+        self.active = True
+        for item in items[:self.top_rows]:
+            self.request(item)
+
+    def request(self, item):
+        """
+        Load an item's shed payload in the background, within the byte cap.
+
+        Args:
+            item: The ClipboardItem about to be pasted, perhaps.
+        """
+        self.tasks.drain()
+        if not self.active or not item.is_binary or item.payload_resident or item in self._pending:
+            return
+        size = item.payload_size()
+        if self._reserved_bytes() + size > self.max_bytes:
+            self.stats["over_cap"] += 1
+            return
+        self.stats["requested"] += 1
+        future = self.tasks.submit(self.loader, item.content,
+                                   on_done=lambda data: self._loaded(item, data))
+        self._pending[item] = (size, future)
+
+    def _loaded(self, item, data):
+        """
+        Install a loaded payload, unless the session ended in the meantime.
+        """
+        if self._pending.pop(item, None) is None or not self.active or data is None:
+            return
+        if item.restore_payload(data):
+            self._warmed[item] = item.payload_size()
+            self.stats["loaded"] += 1
+            self.stats["bytes_loaded"] += self._warmed[item]
+
+    def holds(self, item):
+        """
+        Check whether an item's payload was warmed, or is loading, for the open popup.
+
+        Memory pressure leaves these payloads alone until the popup closes.
+        """
+        return self.active and (item in self._warmed or item in self._pending)
+
+    def claim(self, item, wait=True):
+        """
+        Record that an item is being pasted, waiting for its load if under way.
+
+        Args:
+            item: The ClipboardItem being pasted.
+            wait: Whether to wait for a load under way; pastes that only
+                promise the payload don't need it yet.
+        """
+        self.tasks.drain()
+        if item in self._pending and not wait:
+            self.stats["late_hits"] += 1
+            return
+        if item in self._pending:
+            try:
+                # Installed here: the queued callback may not have been posted yet
+                self._loaded(item, self._pending[item][1].result())
+            except Exception as e:
+                logger.error(f"Error prefetching payload: {e}")
+                self._pending.pop(item, None)
+            self.stats["late_hits"] += 1
+        elif item in self._warmed and item.payload_resident:
+            self.stats["hits"] += 1
+        elif item.is_binary and not item.payload_resident:
+            self.stats["misses"] += 1
+        # A pasted item keeps its payload
+        self._warmed.pop(item, None)
+
+    def end(self):
+        """
+        End the popup session, shedding payloads that were warmed but not pasted.
+        """
+        self.active = False
+        for _, future in self._pending.values():
+            future.cancel()
+        self._pending.clear()
+        for item in self._warmed:
+            if item.shed_payload():
+                self.stats["released"] += 1
+        self._warmed.clear()
+
+    def report(self):
+        """
+        Report the prefetch counts and hit rate.
+
+        Returns:
+            dict: The stats, plus "hit_rate", the fraction of pastes of shed
+                  payloads that found them loaded or loading.
+        """
+        stats = dict(self.stats)
+        claims = stats["hits"] + stats["late_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["hits"] + stats["late_hits"]) / claims if claims else 0.0
+        return stats
@@ -11,12 +11,16 @@ from AppKit import (NSView, NSColor, NSBezierPath, NSPoint, NSMakeRect,
                   NSStringPboardType, NSPasteboardTypePNG, NSPasteboardTypeTIFF,
                   NSPasteboardTypeRTF, NSPasteboardTypeFileURL, NSPDFPboardType,
                   NSPointInRect, NSCursor, NSEventTypeKeyDown, NSEventTypeLeftMouseDown,
-                  NSEventMaskKeyDown, NSEventMaskLeftMouseDown, NSEvent)
+                  NSEventMaskKeyDown, NSEventMaskLeftMouseDown, NSEvent,
+                  NSEventModifierFlagCommand)
 from Quartz import CGColorCreateGenericRGB
 from objc import super
 import logging
 import os
 from clipboard_history import ClipboardHistory
+from content_classifier import TAGS
+from ui_scheduler import FrameScheduler
+from history_view_model import TIME_FILTER_LABELS, TIME_FILTERS, build_rows, time_range
 
 logger = logging.getLogger(__name__)
 
@@ -31,6 +35,12 @@ class HistoryItemView(NSView):
             self.hovered = False
             self.delete_button_hovered = False
             self.image_view = None
+            self.decoded_bytes = 0
+            self.select_callback = None
+            self.selection_order = 0
+            self.stale = False
+            self.hover_callback = None
+            self.display_text = ""
             
             tracking_options = (NSTrackingMouseEnteredAndExited |
                               NSTrackingActiveAlways |
@@ -79,6 +89,10 @@ class HistoryItemView(NSView):
                         if image:
                             self.image_view.setImage_(image)
                             self.addSubview_(self.image_view)
+                            self.decoded_bytes = sum(
+                                rep.pixelsWide() * rep.pixelsHigh() * 4
+                                for rep in image.representations()
+                            )
                 except Exception as e:
                     logger.error(f"Error setting up image view: {e}")
             
@@ -95,12 +109,16 @@ class HistoryItemView(NSView):
         """
         if self.hovered:
             NSColor.selectedTextBackgroundColor().setFill()
+        elif self.selection_order:
+            NSColor.selectedTextBackgroundColor().colorWithAlphaComponent_(0.5).setFill()
         else:
             NSColor.windowBackgroundColor().colorWithAlphaComponent_(0.9).setFill()
         NSBezierPath.fillRect_(self.bounds())
         
         if self.hovered:
             text_color = NSColor.selectedTextColor()
+        elif self.stale:
+            text_color = NSColor.disabledControlTextColor()
         else:
             text_color = NSColor.textColor()
         
@@ -109,21 +127,10 @@ class HistoryItemView(NSView):
             NSFontAttributeName: NSFont.systemFontOfSize_(13)
         }
         
-        # Display appropriate preview based on content type
-        if self.item.content_type == NSStringPboardType:
-            display_text = self.item.content
-            if len(display_text) > 100:
-                display_text = display_text[:97] + "..."
-        elif self.item.content_type in (NSPasteboardTypePNG, NSPasteboardTypeTIFF):
-            display_text = "📷 Image"
-        elif self.item.content_type == NSPasteboardTypeFileURL:
-            display_text = f"📄 {os.path.basename(self.item.content)}"
-        elif self.item.content_type == NSPDFPboardType:
-            display_text = "📑 PDF Document"
-        elif self.item.content_type == NSPasteboardTypeRTF:
-            display_text = "📝 Rich Text Document"
-        else:
-            display_text = f"Unknown type: {self.item.content_type}"
+        display_text = self.display_text
+        
+        if self.selection_order:
+            display_text = f"{self.selection_order}. {display_text}"
         
         text = NSAttributedString.alloc().initWithString_attributes_(
             display_text, attrs
@@ -152,6 +159,8 @@ class HistoryItemView(NSView):
         self.hovered = True
         self.setNeedsDisplay_(True)
         NSCursor.pointingHandCursor().set()
+        if self.hover_callback is not None:
+            self.hover_callback(self.index)
     
     def mouseExited_(self, event):
         """
@@ -166,9 +175,72 @@ class HistoryItemView(NSView):
         Handle mouse click event.
         """
         point = self.convertPoint_fromView_(event.locationInWindow(), None)
-        if not NSPointInRect(point, self.delete_button.frame()):
+        if NSPointInRect(point, self.delete_button.frame()):
+            return
+        if event.modifierFlags() & NSEventModifierFlagCommand and self.select_callback is not None:
+            self.select_callback(self.index)
+        else:
             self.callback(self.index)
 
+FACET_LABELS = {
+    "url": "URL", "email": "Email", "path": "Path", "color": "Colour",
+    "json": "JSON", "code": "Code", "number": "Number",
+}
+
+class FacetBarView(NSView):
+    def initWithFrame_selected_callback_(self, frame, selected, callback):
+        """
+        Initialize a bar of buttons filtering the history by content tag.
+
+        Args:
+            frame: The NSRect of the bar.
+            selected: The tag currently filtered on, or None for all items.
+            callback: Function called with the clicked tag, or None for "All".
+        """
+        return self.initWithFrame_options_labels_selected_callback_(
+            frame, (None,) + TAGS, FACET_LABELS, selected, callback
+        )
+
+    def initWithFrame_options_labels_selected_callback_(self, frame, options, labels, selected, callback):
+        """
+        Initialize a bar of filter buttons.
+
+        Args:
+            frame: The NSRect of the bar.
+            options: The filter values, one button each; None shows every item.
+            labels: Button titles by value; values without one are titled "All".
+            selected: The value currently filtered on.
+            callback: Function called with the clicked value.
+        """
+        self = super(FacetBarView, self).initWithFrame_(frame)
+        if self is not None:
+            self.callback = callback
+            self.options = options
+            width = frame.size.width / len(options)
+            for i, tag in enumerate(options):
+                button = NSButton.alloc().initWithFrame_(
+                    NSMakeRect(i * width, 2, width, frame.size.height - 4)
+                )
+                title = labels.get(tag, "All")
+                color = (NSColor.controlAccentColor() if tag == selected
+                         else NSColor.secondaryLabelColor())
+                button.setAttributedTitle_(NSAttributedString.alloc().initWithString_attributes_(
+                    title, {NSForegroundColorAttributeName: color,
+                            NSFontAttributeName: NSFont.systemFontOfSize_(11)}
+                ))
+                button.setBordered_(False)
+                button.setTag_(i)
+                button.setTarget_(self)
+                button.setAction_("facetClicked:")
+                self.addSubview_(button)
+        return self
+
+    def facetClicked_(self, sender):
+        """
+        Handle a click on one of the facet buttons.
+        """
+        self.callback(self.options[sender.tag()])
+
 class PopupWindow:
     """
     A floating window that displays clipboard history items.
@@ -225,6 +297,15 @@ class PopupWindow:
         
         self.key_monitor = None
         self.click_monitor = None
+        self.displayed_history = self.clipboard_history.get_history()
+        self.selected_items = []
+        self.multi_paste_separator = "tab"
+        self.facet_filter = None
+        self.time_filter = None
+        # Show and refresh requests are coalesced to one rebuild per frame
+        self.scheduler = FrameScheduler(supersedes={"show": ("refresh",)})
+        self._rendered_state = None
+        self.skipped_rebuilds = 0
         
         self.window.orderOut_(None)
         #logger.info("PopupWindow successfully initialized")
@@ -249,6 +330,11 @@ class PopupWindow:
                     logger.info("Esc key detected, closing window")
                     self.hide()
                     return None
+                # Cmd-Delete, like the Finder, so a stray Delete can't discard the selection
+                if (event.keyCode() == 51 and event.modifierFlags() & NSEventModifierFlagCommand
+                        and self.selected_items):
+                    self._delete_selection()
+                    return None
             return event
         except Exception as e:
             ###logger.error(f"Error handling keyboard event: {e}")
@@ -294,6 +380,9 @@ class PopupWindow:
         """
         Handle clicks on clipboard history items.
 
+        With items selected by Cmd-click, the selection is pasted in order,
+        followed by the clicked item if it isn't selected.
+
         Args:
             index: Integer index of the clicked history item.
 
@@ -301,19 +390,98 @@ class PopupWindow:
             Exception: If there's an error handling the item click.
         """
         try:
-            history = self.clipboard_history.get_history()
-            if 0 <= index < len(history):
-                item = history[index]
+            if 0 <= index < len(self.displayed_history):
+                item = self.displayed_history[index]
+                if self.clipboard_history.resolve_index(index, item) < 0:
+                    logger.warning(f"Item {index} is no longer in history, refreshing view")
+                    self._request_refresh()
+                    return
+                if self.selected_items:
+                    self._paste_selection(item)
+                    return
                 if self.clipboard_history.paste_item(item):
                     logger.info(f"Item {index} pasted successfully")
                     self.hide()
         except Exception as e:
             logger.error(f"Error handling item click: {e}")
 
+    def _handle_item_select(self, index):
+        """
+        Toggle a history item in the multi-paste selection.
+
+        Args:
+            index: Integer index of the Cmd-clicked history item.
+        """
+        try:
+            if 0 <= index < len(self.displayed_history):
+                item = self.displayed_history[index]
+                if any(selected is item for selected in self.selected_items):
+                    self.selected_items = [s for s in self.selected_items if s is not item]
+                else:
+                    self.selected_items.append(item)
+                self._request_refresh()
+        except Exception as e:
+            logger.error(f"Error handling item selection: {e}")
+
+    def _paste_selection(self, clicked_item):
+        """
+        Hide the window and paste the selected items in sequence.
+
+        Args:
+            clicked_item: The item that was clicked to start pasting.
+        """
+        items = list(self.selected_items)
+        if not any(selected is clicked_item for selected in items):
+            items.append(clicked_item)
+        history = self.clipboard_history.get_history()
+        items = [item for item in items if item in history]
+        self.selected_items = []
+        # Keep prefetched payloads of the selection: hiding sheds the others
+        for item in items:
+            self.clipboard_history.prefetcher.claim(item)
+        self.hide()
+        if self.clipboard_history.paste_items(items, separator=self.multi_paste_separator):
+            logger.info(f"Pasting {len(items)} items")
+
+    def _handle_item_hover(self, index):
+        """
+        Prefetch the payload of the row under the cursor.
+
+        Args:
+            index: Integer index of the hovered history item.
+        """
+        try:
+            if 0 <= index < len(self.displayed_history):
+                self.clipboard_history.prefetcher.request(self.displayed_history[index])
+        except Exception as e:
+            logger.error(f"Error prefetching item: {e}")
+
+    def _handle_facet_click(self, tag):
+        """
+        Filter the displayed items by content tag.
+
+        Args:
+            tag: Tag to filter on, or None to show every item.
+        """
+        self.facet_filter = tag
+        self._request_refresh()
+
+    def _handle_time_click(self, name):
+        """
+        Filter the displayed items by capture time.
+
+        Args:
+            name: One of history_view_model.TIME_FILTERS, or None for any time.
+        """
+        self.time_filter = name
+        self._request_refresh()
+
     def _handle_item_delete(self, index):
         """
         Handle deletion of clipboard history items.
 
+        Deleting a selected item deletes the whole selection.
+
         Args:
             index: Integer index of the history item to delete.
 
@@ -321,14 +489,73 @@ class PopupWindow:
             Exception: If there's an error handling the item deletion.
         """
         try:
-            if self.clipboard_history.remove_item(index):
+            item = self.displayed_history[index] if 0 <= index < len(self.displayed_history) else None
+            if item is not None and any(selected is item for selected in self.selected_items):
+                self._delete_selection()
+                return
+            if self.clipboard_history.remove_item(index, item=item):
                 logger.info(f"Item {index} deleted successfully")
-                self._update_history_view()
+                self._request_refresh()
             else:
                 logger.error(f"Failed to delete item {index}")
         except Exception as e:
             logger.error(f"Error handling item deletion: {e}")
 
+    def _delete_selection(self):
+        """
+        Delete every selected item in one operation and refresh the view once.
+        """
+        try:
+            result = self.clipboard_history.remove_items(items=self.selected_items)
+            logger.info(f"Deleted {result['removed']} selected items")
+            self.selected_items = []
+            self._request_refresh()
+        except Exception as e:
+            logger.error(f"Error deleting selection: {e}")
+
+    def release_images(self):
+        """
+        Drop the decoded thumbnails held by the rows of the hidden popup.
+
+        They are decoded again the next time the popup is shown.
+
+        Returns:
+            int: Bytes of decoded pixels released.
+        """
+        if self.window.isVisible():
+            return 0
+        freed = 0
+        for subview in self.content_view.subviews():
+            if getattr(subview, "decoded_bytes", 0) and subview.image_view is not None:
+                subview.image_view.setImage_(None)
+                freed += subview.decoded_bytes
+                subview.decoded_bytes = 0
+                self.clipboard_history.memory.release_decoded(subview.item)
+        return freed
+
+    def _request_refresh(self):
+        """
+        Rebuild the history view on the next frame.
+        """
+        self.scheduler.request("refresh", self._update_history_view)
+
+    def request_show(self, x=0, y=0):
+        """
+        Show the window on the next frame, at the position of the latest request.
+
+        Args:
+            x: Integer x-coordinate for window position (default: 0).
+            y: Integer y-coordinate for window position (default: 0).
+        """
+        self.scheduler.request("show", lambda: self.show(x, y))
+
+    def _view_state(self):
+        """
+        Everything the history view's content depends on.
+        """
+        return (self.clipboard_history.history.version, self.facet_filter, self.time_filter,
+                tuple(id(item) for item in self.selected_items))
+
     def _update_history_view(self):
         """
         Update the window's content view with current clipboard history items.
@@ -341,14 +568,30 @@ class PopupWindow:
         try:
             for subview in self.content_view.subviews():
                 subview.removeFromSuperview()
+            self.clipboard_history.memory.clear_decoded()
+            self._rendered_state = self._view_state()
             
-            history = self.clipboard_history.get_history()
+            history = self.clipboard_history.get_ranked_history()
             if not history:
+                self.displayed_history = history
                 #logger.info("History is empty")
                 return
+            if self.facet_filter is not None:
+                history = self.clipboard_history.get_items_with_tag(self.facet_filter)
+            if self.time_filter is not None:
+                # Range lookup in the timestamp index, then narrowed by the facet
+                in_range = self.clipboard_history.get_items_between(*time_range(self.time_filter))
+                if self.facet_filter is not None:
+                    tagged = {id(h) for h in history}
+                    in_range = [h for h in in_range if id(h) in tagged]
+                history = in_range
+            self.displayed_history = history
                 
             item_height = 30
-            total_height = max(len(history) * item_height, self.content_view.frame().size.height)
+            bar_height = 24
+            facet_bar_height = 2 * bar_height
+            total_height = max(len(history) * item_height + facet_bar_height,
+                               self.content_view.frame().size.height)
             
             frame = self.content_view.frame()
             new_frame = NSMakeRect(
@@ -359,12 +602,32 @@ class PopupWindow:
             )
             self.content_view.setFrame_(new_frame)
             
-            for i, item in enumerate(history):
-                frame = NSMakeRect(0, total_height - ((i + 1) * item_height), 380, item_height)
+            facet_bar = FacetBarView.alloc().initWithFrame_selected_callback_(
+                NSMakeRect(0, total_height - bar_height, 380, bar_height),
+                self.facet_filter, self._handle_facet_click
+            )
+            self.content_view.addSubview_(facet_bar)
+            time_bar = FacetBarView.alloc().initWithFrame_options_labels_selected_callback_(
+                NSMakeRect(0, total_height - 2 * bar_height, 380, bar_height),
+                TIME_FILTERS, TIME_FILTER_LABELS, self.time_filter, self._handle_time_click
+            )
+            self.content_view.addSubview_(time_bar)
+            
+            for row in build_rows(history, self.selected_items):
+                i, item = row.index, row.item
+                frame = NSMakeRect(0, total_height - facet_bar_height - ((i + 1) * item_height),
+                                   380, item_height)
                 item_view = HistoryItemView.alloc().initWithFrame_text_index_callback_deleteCallback_(
                     frame, item, i, self._handle_item_click, self._handle_item_delete
                 )
+                item_view.select_callback = self._handle_item_select
+                item_view.display_text = row.text
+                item_view.selection_order = row.selection_order
+                item_view.stale = row.stale
+                item_view.hover_callback = self._handle_item_hover
                 self.content_view.addSubview_(item_view)
+                if item_view.decoded_bytes:
+                    self.clipboard_history.memory.track_decoded(item, item_view.decoded_bytes)
                 
             logger.info(f"View updated with {len(history)} items")
             
@@ -387,7 +650,18 @@ class PopupWindow:
             
             self.clipboard_history.check_and_update()
             
-            self._update_history_view()
+            self.selected_items = []
+            self.facet_filter = None
+            self.time_filter = None
+            self.scheduler.cancel("refresh")
+            if self.window.isVisible() and self._rendered_state == self._view_state():
+                # Shown again (e.g. a double press) with nothing changed
+                self.skipped_rebuilds += 1
+            else:
+                self._update_history_view()
+            self.clipboard_history.prefetcher.begin(self.displayed_history)
+            if self.clipboard_history.recorder is not None:
+                self.clipboard_history.recorder.record("show", count=len(self.displayed_history))
             
             screen = NSScreen.mainScreen()
             if screen is None:
@@ -438,6 +712,7 @@ class PopupWindow:
              #   logger.info("Click event monitor removed")
             
             self.window.orderOut_(None)
+            self.clipboard_history.prefetcher.end()
            # logger.info("Window hidden successfully")
             
         except Exception as e:
@@ -0,0 +1,329 @@
+import json
+import logging
+import os
+import socketserver
+import tempfile
+import threading
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SOCKET_PATH = os.path.join(tempfile.gettempdir(), "windowsv.sock")
+STREAM_CHUNK_SIZE = 64 * 1024
+MAX_REQUEST_SIZE = 1024 * 1024
+
+def call_on_main(func, timeout=5.0):
+    """
+    Run a function on the main thread and wait for its result.
+
+    Args:
+        func: Function taking no arguments.
+        timeout: Seconds to wait before giving up.
+
+    Returns:
+        The function's return value.
+
+    Raises:
+        TimeoutError: If the main thread didn't run the function in time.
+    """
+    from PyObjCTools.AppHelper import callAfter
+
+    done = threading.Event()
+    result = {}
+
+    def run():
+        try:
+            result["value"] = func()
+        except Exception as e:
+            result["error"] = e
+        finally:
+            done.set()
+
+    callAfter(run)
+    if not done.wait(timeout):
+        raise TimeoutError("main thread did not respond")
+    if "error" in result:
+        raise result["error"]
+    return result["value"]
+
+def describe_item(item, index, expires=None):
+    """
+    Build the JSON summary of a history item.
+
+    Args:
+        item: The ClipboardItem to describe.
+        index: The item's position in the history.
+        expires: The item's expiry time in epoch seconds, if it has one.
+    """
+    size = 0
+    if item.is_binary:
+        size = item.payload_size()
+    elif isinstance(item.content, str):
+        size = len(item.content.encode("utf-8"))
+    return {
+        "index": index,
+        "uid": item.uid,
+        "type": item.content_type,
+        "timestamp": item.epoch,
+        "preview": item.preview if not item.is_binary else os.path.basename(item.preview or ""),
+        "size": size,
+        "tags": sorted(item.tags),
+        "expires": expires,
+        "files": [{"path": f.path, "size": f.size, "exists": f.exists} for f in item.files]
+                 if item.files else None,
+    }
+
+def matches_query(item, query):
+    """
+    Check whether an item's text contains a lowercase query string.
+
+    Binary items are matched on their extracted text, or their preview.
+    """
+    if not item.is_binary:
+        content = item.content
+    else:
+        content = item.extracted_text or item.preview
+    return isinstance(content, str) and query in content.lower()
+
+class QueryHandler(socketserver.StreamRequestHandler):
+    """
+    Serves one client connection.
+
+    Requests are JSON objects, one per line; a JSON array of requests is a
+    batch answered by an array of responses, all resolved against the same
+    history snapshot so indices stay valid across the batch. A single "get" with
+    "payload": true is answered by a header line carrying the payload
+    "length", followed by exactly that many raw bytes streamed in chunks.
+    """
+
+    def handle(self):
+        while True:
+            line = self.rfile.readline(MAX_REQUEST_SIZE)
+            if not line:
+                return
+            try:
+                request = json.loads(line)
+            except ValueError:
+                self._send({"ok": False, "error": "invalid JSON"})
+                continue
+
+            if isinstance(request, list):
+                snapshot = self.server.api.clipboard_history.get_history()
+                self._send([self.server.api.execute(r, allow_stream=False, snapshot=snapshot)[0]
+                            for r in request])
+                continue
+
+            response, payload = self.server.api.execute(request, allow_stream=True)
+            self._send(response)
+            if payload is not None:
+                self._stream(payload)
+
+    def _send(self, message):
+        self.wfile.write(json.dumps(message).encode("utf-8") + b"\n")
+        self.wfile.flush()
+
+    def _stream(self, payload):
+        view = memoryview(payload)
+        for start in range(0, len(view), STREAM_CHUNK_SIZE):
+            self.wfile.write(view[start:start + STREAM_CHUNK_SIZE])
+        self.wfile.flush()
+
+class HistoryAPI:
+    """
+    Executes query API requests against a ClipboardHistory.
+
+    Reads use the current immutable history snapshot and run directly on the
+    connection's thread, except facet lookups; paste, delete, prune and expire
+    change state. Both are run on the main thread through the dispatch function.
+    """
+
+    def __init__(self, clipboard_history, dispatch=call_on_main):
+        """
+        Initialize the API.
+
+        Args:
+            clipboard_history: The ClipboardHistory to serve.
+            dispatch: Function running a callable on the main thread and
+                returning its result.
+        """
+        self.clipboard_history = clipboard_history
+        self.dispatch = dispatch
+
+    def execute(self, request, allow_stream=True, snapshot=None):
+        """
+        Execute a single request.
+
+        Args:
+            request: The decoded request object.
+            allow_stream: Whether a raw payload may follow the response.
+            snapshot: History snapshot indices refer to (default: the current one).
+
+        Returns:
+            tuple: (response dict, payload buffer or None)
+        """
+        if not isinstance(request, dict):
+            return {"ok": False, "error": "request must be an object"}, None
+        handler = getattr(self, f"_op_{request.get('op')}", None)
+        if handler is None:
+            return {"ok": False, "id": request.get("id"), "error": f"unknown op: {request.get('op')}"}, None
+        if snapshot is None:
+            snapshot = self.clipboard_history.get_history()
+        try:
+            response, payload = handler(request, snapshot, allow_stream)
+        except Exception as e:
+            logger.error(f"Error executing {request.get('op')} request: {e}")
+            response, payload = {"ok": False, "error": str(e)}, None
+        response.setdefault("ok", True)
+        response["id"] = request.get("id")
+        response["version"] = snapshot.version
+        return response, payload
+
+    def _describe(self, item, index):
+        return describe_item(item, index, self.clipboard_history.get_expiry(item))
+
+    def _resolve(self, request, snapshot):
+        """
+        Get the item a request refers to, checking the snapshot version if given.
+        """
+        index = request.get("index")
+        if not isinstance(index, int) or not 0 <= index < len(snapshot):
+            raise IndexError(f"no item at index {index}")
+        version = request.get("version")
+        if version is not None and version != snapshot.version:
+            raise LookupError(f"history changed since version {version}; list again")
+        return snapshot[index]
+
+    def _op_ping(self, request, snapshot, allow_stream):
+        return {}, None
+
+    def _op_list(self, request, snapshot, allow_stream):
+        offset = int(request.get("offset", 0))
+        limit = int(request.get("limit", 50))
+        items = [self._describe(item, offset + i)
+                 for i, item in enumerate(snapshot[offset:offset + limit])]
+        return {"items": items, "total": len(snapshot)}, None
+
+    def _op_search(self, request, snapshot, allow_stream):
+        query = str(request.get("query", "")).lower()
+        facet = request.get("facet")
+        limit = int(request.get("limit", 50))
+        tagged = None
+        if facet is not None:
+            # Tags are applied on the main thread after capture, so the facet
+            # index is read there; the snapshot is then only walked up to the
+            # last tagged item instead of checking every item's tags
+            tagged = {id(h) for h in self.dispatch(lambda: self.clipboard_history.get_items_with_tag(facet))}
+        items = []
+        for index, item in enumerate(snapshot):
+            if len(items) >= limit or tagged is not None and not tagged:
+                break
+            if tagged is not None:
+                if id(item) not in tagged:
+                    continue
+                tagged.discard(id(item))
+            if not query or matches_query(item, query):
+                items.append(self._describe(item, index))
+        return {"items": items}, None
+
+    def _op_get(self, request, snapshot, allow_stream):
+        item = self._resolve(request, snapshot)
+        response = {"item": self._describe(item, request["index"])}
+        if not item.is_binary:
+            response["item"]["content"] = item.content
+            return response, None
+        if item.extracted_text is not None:
+            response["item"]["text"] = item.extracted_text
+        if not request.get("payload"):
+            return response, None
+        if not allow_stream:
+            raise ValueError("payloads can't be streamed inside a batch")
+        payload = item.raw_data.bytes()
+        response["length"] = len(payload)
+        return response, payload
+
+    def _op_paste(self, request, snapshot, allow_stream):
+        item = self._resolve(request, snapshot)
+        return {"ok": bool(self.dispatch(lambda: self.clipboard_history.paste_item(item)))}, None
+
+    def _op_delete(self, request, snapshot, allow_stream):
+        item = self._resolve(request, snapshot)
+        index = request["index"]
+        return {"ok": bool(self.dispatch(lambda: self.clipboard_history.remove_item(index, item=item)))}, None
+
+    def _op_expire(self, request, snapshot, allow_stream):
+        item = self._resolve(request, snapshot)
+        ttl = request.get("ttl")
+        ttl = None if ttl is None else float(ttl)
+        return {"ok": bool(self.dispatch(lambda: self.clipboard_history.set_item_ttl(item, ttl)))}, None
+
+    def _op_prune(self, request, snapshot, allow_stream):
+        criteria = {}
+        if request.get("types"):
+            criteria["content_types"] = list(request["types"])
+        for key in ("min_age", "max_age"):
+            if request.get(key) is not None:
+                criteria[key] = float(request[key])
+        query = str(request.get("query") or "").lower()
+        if query:
+            criteria["predicate"] = lambda item: matches_query(item, query)
+        result = self.dispatch(lambda: self.clipboard_history.remove_items(**criteria))
+        return {"removed": result["removed"], "elapsed": result["elapsed"]}, None
+
+class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+class QueryServer:
+    """
+    Serves the clipboard history over a Unix domain socket.
+
+    The socket is only accessible to the current user. Each client connection
+    gets its own thread and may send any number of requests.
+    """
+
+    def __init__(self, clipboard_history, socket_path=DEFAULT_SOCKET_PATH, dispatch=call_on_main):
+        """
+        Initialize the server.
+
+        Args:
+            clipboard_history: The ClipboardHistory to serve.
+            socket_path: Filesystem path of the socket.
+            dispatch: Function running a callable on the main thread.
+        """
+        self.socket_path = socket_path
+        self.api = HistoryAPI(clipboard_history, dispatch)
+        self._server = None
+        self._thread = None
+
+    def start(self):
+        """
+        Bind the socket and start serving on a background thread.
+        """
+        try:
+            if os.path.exists(self.socket_path):
+                os.remove(self.socket_path)
+            old_umask = os.umask(0o077)
+            try:
+                self._server = _Server(self.socket_path, QueryHandler)
+            finally:
+                os.umask(old_umask)
+            self._server.api = self.api
+            self._thread = threading.Thread(target=self._server.serve_forever,
+                                            name="query-server", daemon=True)
+            self._thread.start()
+            logger.info(f"Query API listening on {self.socket_path}")
+        except Exception as e:
+            logger.error(f"Error starting query server: {e}")
+            self._server = None
+
+    def stop(self):
+        """
+        Stop serving and remove the socket.
+        """
+        try:
+            if self._server is not None:
+                self._server.shutdown()
+                self._server.server_close()
+                self._server = None
+            if os.path.exists(self.socket_path):
+                os.remove(self.socket_path)
+        except Exception as e:
+            logger.error(f"Error stopping query server: {e}")
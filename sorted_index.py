@@ -0,0 +1,127 @@
+from bisect import bisect_left, bisect_right, insort
+
+class SortedIndex:
+    """
+    A sorted collection of unique, comparable keys.
+
+    Keys are kept in a list of short sorted sublists, indexed by their
+    maximum. Locating a key is a binary search over the sublist maxima and
+    then within one sublist, and inserting or removing only shifts elements
+    of that bounded sublist, so updates stay cheap at hundreds of thousands
+    of keys while ordered iteration remains a plain walk over the lists.
+    """
+
+    def __init__(self, load=256):
+        """
+        Initialize an empty index.
+
+        Args:
+            load: Target sublist length; sublists are split at twice this size.
+        """
+        self._load = load
+        self._lists = []
+        self._maxes = []
+        self._length = 0
+
+    def __len__(self):
+        return self._length
+
+    def __iter__(self):
+        """
+        Iterate over keys in ascending order.
+        """
+        for sublist in self._lists:
+            yield from sublist
+
+    def __reversed__(self):
+        """
+        Iterate over keys in descending order.
+        """
+        for sublist in reversed(self._lists):
+            yield from reversed(sublist)
+
+    def __contains__(self, key):
+        pos = bisect_left(self._maxes, key)
+        if pos == len(self._maxes):
+            return False
+        sublist = self._lists[pos]
+        index = bisect_left(sublist, key)
+        return index < len(sublist) and sublist[index] == key
+
+    def add(self, key):
+        """
+        Insert a key.
+        """
+        if not self._maxes:
+            self._lists.append([key])
+            self._maxes.append(key)
+        else:
+            pos = bisect_left(self._maxes, key)
+            if pos == len(self._maxes):
+                pos -= 1
+                self._lists[pos].append(key)
+                self._maxes[pos] = key
+            else:
+                insort(self._lists[pos], key)
+            if len(self._lists[pos]) > 2 * self._load:
+                sublist = self._lists[pos]
+                self._lists[pos:pos + 1] = [sublist[:self._load], sublist[self._load:]]
+                self._maxes[pos:pos + 1] = [sublist[self._load - 1], sublist[-1]]
+        self._length += 1
+
+    def remove(self, key):
+        """
+        Remove a key.
+
+        Raises:
+            KeyError: If the key is not in the index.
+        """
+        if not self.discard(key):
+            raise KeyError(key)
+
+    def discard(self, key):
+        """
+        Remove a key if present.
+
+        Returns:
+            bool: True if the key was removed, False if it wasn't present.
+        """
+        pos = bisect_left(self._maxes, key)
+        if pos == len(self._maxes):
+            return False
+        sublist = self._lists[pos]
+        index = bisect_left(sublist, key)
+        if index == len(sublist) or sublist[index] != key:
+            return False
+        del sublist[index]
+        self._length -= 1
+        if not sublist:
+            del self._lists[pos]
+            del self._maxes[pos]
+        else:
+            self._maxes[pos] = sublist[-1]
+        return True
+
+    def irange(self, minimum=None, maximum=None):
+        """
+        Iterate over the keys between two bounds, in ascending order.
+
+        Args:
+            minimum: Smallest key to include, or None for no lower bound.
+            maximum: Largest key to include, or None for no upper bound.
+        """
+        pos = 0 if minimum is None else bisect_left(self._maxes, minimum)
+        for sublist in self._lists[pos:]:
+            start = 0 if minimum is None else bisect_left(sublist, minimum)
+            if maximum is not None and sublist[-1] > maximum:
+                yield from sublist[start:bisect_right(sublist, maximum)]
+                return
+            yield from sublist[start:]
+
+    def clear(self):
+        """
+        Remove every key.
+        """
+        self._lists.clear()
+        self._maxes.clear()
+        self._length = 0
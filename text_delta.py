@@ -0,0 +1,138 @@
+from difflib import SequenceMatcher
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Approximate storage cost of one copy instruction (two small ints)
+COPY_OP_COST = 16
+
+def _line_offsets(lines):
+    """
+    Return the character offset at which each line starts, plus the total length.
+    """
+    offsets = [0]
+    for line in lines:
+        offsets.append(offsets[-1] + len(line))
+    return offsets
+
+def make_delta(base, target, matcher=None):
+    """
+    Encode a string as edits against a base string.
+
+    Matching is done on whole lines, which keeps the diff fast on large
+    clips; copy instructions are expressed in characters of the base.
+
+    Args:
+        base: The string the delta refers to.
+        target: The string to encode.
+        matcher: Optional SequenceMatcher already set up on the lines of
+            (base, target), as returned by line_matcher().
+
+    Returns:
+        tuple: Instructions, each either a (start, end) slice of base to copy
+               or a literal string to insert.
+    """
+    if matcher is None:
+        matcher = line_matcher(base, target)
+    base_offsets = _line_offsets(matcher.a)
+    target_offsets = _line_offsets(matcher.b)
+    ops = []
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            ops.append((base_offsets[i1], base_offsets[i2]))
+        elif j2 > j1:
+            ops.append(target[target_offsets[j1]:target_offsets[j2]])
+    return tuple(ops)
+
+def line_matcher(base, target):
+    """
+    Create a SequenceMatcher comparing two strings line by line.
+    """
+    return SequenceMatcher(None, base.splitlines(keepends=True),
+                           target.splitlines(keepends=True), autojunk=False)
+
+def apply_delta(base, delta):
+    """
+    Rebuild a string from its base and a delta produced by make_delta().
+
+    Args:
+        base: The base string.
+        delta: The delta instructions.
+
+    Returns:
+        str: The reconstructed string.
+    """
+    return "".join(base[op[0]:op[1]] if isinstance(op, tuple) else op for op in delta)
+
+def delta_length(delta):
+    """
+    Get the length of the string a delta rebuilds, without rebuilding it.
+    """
+    return sum(op[1] - op[0] if isinstance(op, tuple) else len(op) for op in delta)
+
+def delta_size(delta):
+    """
+    Estimate the number of characters needed to store a delta.
+    """
+    return sum(COPY_OP_COST if isinstance(op, tuple) else len(op) for op in delta)
+
+class DeltaEncoder:
+    """
+    Picks the best base among recent text clips and encodes a new clip against it.
+
+    Only clips that are long enough to be worth it are considered, and a delta
+    is kept only when it is substantially smaller than the text itself. The
+    chain of bases an item depends on is capped so decoding stays cheap.
+    """
+
+    def __init__(self, window=5, min_length=256, max_length=200000,
+                 max_chain=8, max_ratio=0.5):
+        """
+        Initialize the encoder.
+
+        Args:
+            window: Number of recent text clips considered as bases (default: 5).
+            min_length: Shortest text worth delta-encoding (default: 256).
+            max_length: Longest text compared, bounding diff time (default: 200000).
+            max_chain: Longest chain of deltas allowed behind an item (default: 8).
+            max_ratio: Largest delta size, as a fraction of the text length,
+                still worth storing (default: 0.5).
+        """
+        self.window = window
+        self.min_length = min_length
+        self.max_length = max_length
+        self.max_chain = max_chain
+        self.max_ratio = max_ratio
+
+    def accepts(self, text):
+        """
+        Check whether a text is a candidate for delta encoding.
+        """
+        return self.min_length <= len(text) <= self.max_length
+
+    def encode(self, text, candidates):
+        """
+        Encode a text against the most similar candidate base.
+
+        This only reads its arguments, so it can run on a background thread.
+
+        Args:
+            text: The text to encode.
+            candidates: (base_key, base_text) pairs to compare against.
+
+        Returns:
+            tuple: (base_key, delta) for the best base, or None if no delta
+                   is small enough to be worth storing.
+        """
+        best = None
+        best_size = len(text) * self.max_ratio
+        for key, base in candidates:
+            matcher = line_matcher(base, text)
+            # Cheap upper bounds on similarity before computing the real diff
+            if matcher.real_quick_ratio() < 1 - self.max_ratio or matcher.quick_ratio() < 1 - self.max_ratio:
+                continue
+            delta = make_delta(base, text, matcher)
+            size = delta_size(delta)
+            if size < best_size:
+                best, best_size = (key, delta), size
+        return best
@@ -0,0 +1,200 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+from pasteboard_types import NSPDFPboardType, NSPasteboardTypeRTF
+
+logger = logging.getLogger(__name__)
+
+EXTRACTABLE_TYPES = (NSPDFPboardType, NSPasteboardTypeRTF)
+
+def extract_rtf_text(data):
+    """
+    Get the plain text of an RTF document.
+
+    Args:
+        data: NSData holding the RTF document.
+
+    Returns:
+        str: The document text, or None if it can't be read.
+    """
+    from AppKit import NSAttributedString
+
+    attributed, _ = NSAttributedString.alloc().initWithRTF_documentAttributes_(data, None)
+    if attributed is None:
+        return None
+    return str(attributed.string())
+
+def extract_pdf_text(data, max_pages, max_length):
+    """
+    Get the plain text of the first pages of a PDF document.
+
+    Args:
+        data: NSData holding the PDF document.
+        max_pages: Maximum number of pages read.
+        max_length: Number of characters after which reading stops.
+
+    Returns:
+        str: The text of the pages read, or None if the PDF can't be opened.
+    """
+    from Quartz import PDFDocument
+
+    document = PDFDocument.alloc().initWithData_(data)
+    if document is None:
+        return None
+    parts = []
+    length = 0
+    for index in range(min(document.pageCount(), max_pages)):
+        text = document.pageAtIndex_(index).string()
+        if text:
+            parts.append(str(text))
+            length += len(text)
+        if length >= max_length:
+            break
+    return "\n".join(parts)
+
+class TextExtractor:
+    """
+    Extracts plain text from RTF and PDF clips, caching it next to the blob.
+
+    Extraction is meant to run on a background thread. Text is cached in the
+    blob's directory under a name derived from the blob's content hash, so
+    copying the same document again only reads that file.
+    """
+
+    def __init__(self, max_pages=20, max_source_bytes=20 * 1024 * 1024, max_length=64 * 1024):
+        """
+        Initialize the extractor.
+
+        Args:
+            max_pages: Maximum number of PDF pages read (default: 20).
+            max_source_bytes: Blobs larger than this are not extracted (default: 20 MB).
+            max_length: Maximum number of characters kept (default: 64K).
+        """
+        self.max_pages = max_pages
+        self.max_source_bytes = max_source_bytes
+        self.max_length = max_length
+        self._lock = threading.Lock()
+        self._cache_files = {}
+        self._stats = {"extracted": 0, "cache_hits": 0, "failed": 0, "skipped": 0,
+                       "extraction_time": 0.0}
+
+    def _count(self, key, value=1):
+        with self._lock:
+            self._stats[key] += value
+
+    def forget(self, blob_path):
+        """
+        Stop tracking the text cache file of a blob.
+
+        Args:
+            blob_path: Path of the blob's cache file.
+
+        Returns:
+            str: Path of the cached text, which the caller may delete, or None.
+        """
+        with self._lock:
+            return self._cache_files.pop(blob_path, None)
+
+    def cached_text(self, blob_path):
+        """
+        Read a blob's previously extracted text from the cache, if any.
+
+        Args:
+            blob_path: Path of the blob's cache file.
+
+        Returns:
+            str: The cached text, or None if the blob's text isn't cached.
+        """
+        with self._lock:
+            cache_path = self._cache_files.get(blob_path)
+        if cache_path is None:
+            return None
+        try:
+            with open(cache_path, encoding="utf-8") as f:
+                text = f.read()
+            self._count("cache_hits")
+            return text
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.error(f"Error reading cached text: {e}")
+            return None
+
+    def extract(self, content_type, data, blob_path=None):
+        """
+        Get the plain text of an RTF or PDF blob.
+
+        Args:
+            content_type: Pasteboard type of the blob (PDF or RTF).
+            data: NSData holding the blob.
+            blob_path: Path of the blob's cache file; the text is cached in
+                the same directory when given.
+
+        Returns:
+            str: The extracted text (possibly empty), or None if the blob is
+                 too large or can't be read.
+        """
+        if content_type not in EXTRACTABLE_TYPES or int(data.length()) > self.max_source_bytes:
+            self._count("skipped")
+            return None
+
+        cache_path = None
+        if blob_path:
+            digest = hashlib.blake2b(data.bytes(), digest_size=16).hexdigest()
+            cache_path = os.path.join(os.path.dirname(blob_path), f"text_{digest}.txt")
+            with self._lock:
+                self._cache_files[blob_path] = cache_path
+        if cache_path and os.path.exists(cache_path):
+            try:
+                with open(cache_path, encoding="utf-8") as f:
+                    text = f.read()
+                self._count("cache_hits")
+                return text
+            except Exception as e:
+                logger.error(f"Error reading cached text: {e}")
+
+        start = time.perf_counter()
+        try:
+            if content_type == NSPDFPboardType:
+                text = extract_pdf_text(data, self.max_pages, self.max_length)
+            else:
+                text = extract_rtf_text(data)
+        except Exception as e:
+            logger.error(f"Error extracting text from {content_type}: {e}")
+            text = None
+        elapsed = time.perf_counter() - start
+        self._count("extraction_time", elapsed)
+
+        if text is None:
+            self._count("failed")
+            return None
+        self._count("extracted")
+        text = text[:self.max_length]
+        logger.info(f"Extracted {len(text)} characters from {content_type} in {elapsed * 1000:.1f} ms")
+
+        if cache_path:
+            try:
+                with open(cache_path, "w", encoding="utf-8") as f:
+                    f.write(text)
+            except Exception as e:
+                logger.error(f"Error caching extracted text: {e}")
+        return text
+
+    def stats(self):
+        """
+        Report extraction counts, time and cache effectiveness.
+
+        Returns:
+            dict: Counts of extractions, cache hits, failures and skipped
+                  blobs, total and mean extraction time in seconds, and the
+                  fraction of requests served from the cache.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+        requests = stats["extracted"] + stats["failed"] + stats["cache_hits"]
+        attempts = stats["extracted"] + stats["failed"]
+        stats["mean_extraction_time"] = stats["extraction_time"] / attempts if attempts else 0.0
+        stats["cache_hit_rate"] = stats["cache_hits"] / requests if requests else 0.0
+        return stats
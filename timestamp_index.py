@@ -0,0 +1,84 @@
+from itertools import count
+import math
+from sorted_index import SortedIndex
+
+class TimestampIndex:
+    """
+    Indexes items by capture time for range lookups.
+
+    Each item is stored once under an (epoch, sequence) key in a
+    SortedIndex; the sequence number keeps keys unique when two items share
+    a timestamp. Finding the items in a time range is a binary search for
+    its start followed by a walk to its end, so the cost depends on the
+    number of items returned rather than on the size of the history.
+    """
+
+    def __init__(self):
+        """
+        Initialize an empty index.
+        """
+        self._keys = {}
+        self._items = {}
+        self._order = SortedIndex()
+        self._sequence = count()
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, item):
+        return item in self._keys
+
+    def add(self, item):
+        """
+        Index an item under its timestamp, replacing any previous entry.
+
+        Args:
+            item: The ClipboardItem to index.
+        """
+        self.remove(item)
+        key = (item.epoch, next(self._sequence))
+        self._keys[item] = key
+        self._items[key] = item
+        self._order.add(key)
+
+    def remove(self, item):
+        """
+        Stop indexing an item, if it is indexed.
+        """
+        key = self._keys.pop(item, None)
+        if key is not None:
+            del self._items[key]
+            self._order.discard(key)
+
+    def _keys_between(self, start, end):
+        minimum = None if start is None else (start,)
+        maximum = None if end is None else (end, math.inf)
+        return self._order.irange(minimum, maximum)
+
+    def between(self, start=None, end=None):
+        """
+        Get the items captured within a time range, newest first.
+
+        Args:
+            start: Earliest epoch time included, or None for no lower bound.
+            end: Latest epoch time included, or None for no upper bound.
+
+        Returns:
+            list: The matching items.
+        """
+        keys = list(self._keys_between(start, end))
+        return [self._items[key] for key in reversed(keys)]
+
+    def count_between(self, start=None, end=None):
+        """
+        Count the items captured within a time range.
+        """
+        return sum(1 for _ in self._keys_between(start, end))
+
+    def clear(self):
+        """
+        Remove every item.
+        """
+        self._keys.clear()
+        self._items.clear()
+        self._order.clear()
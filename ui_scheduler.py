@@ -0,0 +1,108 @@
+import logging
+import math
+import time
+
+logger = logging.getLogger(__name__)
+
+FRAME_INTERVAL = 1 / 60
+
+def call_later_on_run_loop(delay, func):
+    """
+    Run a function on the main run loop after a delay in seconds.
+    """
+    from PyObjCTools.AppHelper import callLater
+    callLater(delay, func)
+
+class FrameScheduler:
+    """
+    Coalesces UI work so that it runs at most once per display frame.
+
+    Work is requested under a key ("show", "refresh", ...). Requests made
+    before the next frame replace any pending request with the same key, so
+    a burst of them costs one pass, and a key can make others redundant:
+    with supersedes={"show": ("refresh",)}, a pending show drops a pending
+    refresh, since showing rebuilds the view anyway. Pending work runs on the
+    first frame boundary after the previous pass.
+    """
+
+    def __init__(self, schedule=call_later_on_run_loop, frame_interval=FRAME_INTERVAL,
+                 supersedes=None, clock=time.monotonic):
+        """
+        Initialize the scheduler.
+
+        Args:
+            schedule: Function taking a delay in seconds and a function, and
+                running the function on the main thread after the delay
+                (default: on the main run loop).
+            frame_interval: Seconds per frame (default: 1/60).
+            supersedes: Dict mapping a key to the keys its work makes redundant.
+            clock: Function returning the current time in seconds.
+        """
+        self.schedule = schedule
+        self.frame_interval = frame_interval
+        self.supersedes = supersedes or {}
+        self.clock = clock
+        self._pending = {}
+        self._scheduled = False
+        self._last_frame = -math.inf
+        self.stats = {"requested": 0, "run": 0, "frames": 0, "coalesced": 0, "superseded": 0}
+
+    def request(self, key, func):
+        """
+        Ask for work to run on the next frame.
+
+        Args:
+            key: Kind of work; a later request with the same key before the
+                frame replaces this one.
+            func: Function doing the work.
+        """
+        self.stats["requested"] += 1
+        if key in self._pending:
+            self.stats["coalesced"] += 1
+            del self._pending[key]
+        self._pending[key] = func
+        if not self._scheduled:
+            self._scheduled = True
+            delay = max(0.0, self._last_frame + self.frame_interval - self.clock())
+            self.schedule(delay, self.flush)
+
+    def cancel(self, key):
+        """
+        Drop pending work, e.g. because a direct call made it redundant.
+
+        Returns:
+            bool: True if work was pending under the key.
+        """
+        if self._pending.pop(key, None) is None:
+            return False
+        self.stats["superseded"] += 1
+        return True
+
+    def flush(self):
+        """
+        Run the pending work, in request order, minus the superseded keys.
+        """
+        self._scheduled = False
+        self._last_frame = self.clock()
+        pending, self._pending = self._pending, {}
+        if not pending:
+            return
+        self.stats["frames"] += 1
+        for key in list(pending):
+            if key not in pending:
+                continue
+            for redundant in self.supersedes.get(key, ()):
+                if pending.pop(redundant, None) is not None:
+                    self.stats["superseded"] += 1
+        for key, func in pending.items():
+            try:
+                func()
+                self.stats["run"] += 1
+            except Exception as e:
+                logger.error(f"Error running scheduled {key}: {e}")
+
+    def dropped(self):
+        """
+        Number of requests that never ran because others made them redundant.
+        """
+        return self.stats["coalesced"] + self.stats["superseded"]
@@ -0,0 +1,337 @@
+"""
+Record and replay privacy-safe clipboard workload traces.
+
+A trace is a JSON-lines file of capture, paste, delete and show events with
+content types, sizes and keyed hashes, never content. Replaying feeds the
+same workload to a ClipboardHistory through a fake pasteboard and reports
+latency, memory and disk I/O, so changes can be compared on real usage:
+
+    WINDOWSV_TRACE=~/trace.jsonl python3 main.py      # record
+    python3 workload_trace.py ~/trace.jsonl            # replay (macOS)
+"""
+import hashlib
+import hmac
+import json
+import logging
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from pasteboard_types import (NSStringPboardType, NSFilenamesPboardType,
+                              NSPasteboardTypeFileURL, UTF8_TEXT_TYPE)
+
+logger = logging.getLogger(__name__)
+
+class TraceRecorder:
+    """
+    Appends workload events to a trace file.
+
+    Content is identified by an HMAC keyed with a random per-recording key
+    that is never written out: repeated copies of the same content get the
+    same hash within a trace, but hashes can't be matched against guesses.
+    An item's hash is computed once, while its payload is resident at
+    capture, so recording never reloads a shed payload.
+    """
+
+    def __init__(self, path):
+        """
+        Initialize the recorder.
+
+        Args:
+            path: File the trace is appended to.
+        """
+        self.path = path
+        self._key = os.urandom(32)
+        self._start = time.monotonic()
+        self._file = open(path, "a", encoding="utf-8")
+        self._hashes = {}
+
+    def content_hash(self, item):
+        """
+        Get the keyed hash identifying an item's content.
+
+        Returns:
+            str: The hash, or None for a shed payload first seen after capture.
+        """
+        digest = self._hashes.get(item)
+        if digest is None:
+            if item.is_binary and not item.payload_resident:
+                return None
+            if item.is_binary:
+                data = item.raw_data.bytes()
+            else:
+                data = str(item.content).encode("utf-8")
+            digest = self._hashes[item] = hmac.new(self._key, data, hashlib.blake2b).hexdigest()[:16]
+        return digest
+
+    def forget(self, item):
+        """
+        Drop the hash of an item that left the history.
+        """
+        self._hashes.pop(item, None)
+
+    def record(self, event, **fields):
+        """
+        Append an event.
+
+        Args:
+            event: Event name.
+            **fields: JSON-serialisable event attributes.
+        """
+        try:
+            fields["t"] = round(time.monotonic() - self._start, 4)
+            fields["event"] = event
+            self._file.write(json.dumps(fields) + "\n")
+            self._file.flush()
+        except Exception as e:
+            logger.error(f"Error recording trace event: {e}")
+
+    def record_item(self, event, item):
+        """
+        Append an event about a clipboard item.
+
+        Args:
+            event: "capture", "paste" or "delete".
+            item: The ClipboardItem involved.
+        """
+        if item.is_binary:
+            size = item.payload_size()
+        else:
+            size = len(str(item.content).encode("utf-8"))
+        self.record(event, type=item.content_type, size=size, hash=self.content_hash(item))
+
+    def close(self):
+        self._file.close()
+
+def load_trace(path):
+    """
+    Read the events of a trace file.
+
+    Returns:
+        list: Event dicts, in recorded order.
+    """
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+class FakeData(bytes):
+    """
+    Bytes with the parts of the NSData interface the history uses.
+    """
+
+    def bytes(self):
+        return memoryview(self)
+
+    def length(self):
+        return len(self)
+
+class FakePasteboard:
+    """
+    An in-memory stand-in for NSPasteboard.
+    """
+
+    def __init__(self):
+        self._contents = {}
+        self._change_count = 0
+
+    def changeCount(self):
+        return self._change_count
+
+    def types(self):
+        return list(self._contents)
+
+    def clearContents(self):
+        for provider in dict.fromkeys(v for v in self._contents.values() if hasattr(v, "provide")):
+            provider.finished()
+        self._contents = {}
+        self._change_count += 1
+        return self._change_count
+
+    def stringForType_(self, content_type):
+        value = self._contents.get(content_type)
+        return value if isinstance(value, str) else None
+
+    def dataForType_(self, content_type):
+        value = self._contents.get(content_type)
+        if hasattr(value, "provide"):
+            # Promised data is requested from its provider on first read, like AppKit does
+            data = value.provide(content_type)
+            value = self._contents[content_type] = None if data is None else FakeData(bytes(data.bytes()))
+        return value if isinstance(value, FakeData) else None
+
+    def propertyListForType_(self, content_type):
+        return self._contents.get(content_type)
+
+    def setString_forType_(self, value, content_type):
+        self._contents[content_type] = str(value)
+        return True
+
+    def setData_forType_(self, value, content_type):
+        self._contents[content_type] = value if isinstance(value, FakeData) else FakeData(bytes(value))
+        return True
+
+    def setPropertyList_forType_(self, value, content_type):
+        self._contents[content_type] = list(value)
+        return True
+
+    def write_promises(self, provider):
+        """
+        Promise the provider's types; the data is requested when first read.
+
+        Args:
+            provider: A lazy_paste.PayloadProvider.
+        """
+        for content_type in provider.types:
+            self._contents[content_type] = provider
+        return True
+
+    def copy(self, contents):
+        """
+        Simulate another application copying to the pasteboard.
+
+        Args:
+            contents: Dict mapping pasteboard types to values.
+        """
+        self.clearContents()
+        for content_type, value in contents.items():
+            self._contents[content_type] = value
+
+def synthesize_contents(event):
+    """
+    Build pasteboard contents matching a capture event's type and size.
+
+    Contents are derived from the event hash, so repeated copies in the trace
+    replay as repeated identical contents.
+
+    Returns:
+        dict: Pasteboard type to value, as passed to FakePasteboard.copy().
+    """
+    rng = random.Random(event["hash"])
+    size = event["size"]
+    content_type = event["type"]
+    if content_type == NSStringPboardType:
+        text = event["hash"] * (size // len(event["hash"]) + 1)
+        return {UTF8_TEXT_TYPE: text[:max(size, 1)]}
+    if content_type == NSPasteboardTypeFileURL:
+        return {NSFilenamesPboardType: [f"/tmp/replay/{event['hash']}.dat"]}
+    return {content_type: FakeData(rng.getrandbits(8 * size).to_bytes(size, "little") if size else b"")}
+
+class NullEventPoster:
+    """
+    Counts synthetic key events instead of posting them.
+    """
+
+    def __init__(self):
+        self.events = 0
+
+    def post_key(self, keycode, key_down, command=False):
+        self.events += 1
+
+class ReplayDriver:
+    """
+    Replays a trace against a ClipboardHistory and the popup's view-model.
+    """
+
+    def __init__(self, clipboard_history, pasteboard):
+        """
+        Initialize the driver.
+
+        Args:
+            clipboard_history: A ClipboardHistory reading from the pasteboard.
+            pasteboard: The FakePasteboard the history was created with.
+        """
+        self.clipboard_history = clipboard_history
+        self.pasteboard = pasteboard
+        self.clipboard_history.permission_check = lambda: True
+        self.clipboard_history.event_poster = NullEventPoster()
+        self._items = {}
+
+    def _capture(self, event):
+        self.pasteboard.copy(synthesize_contents(event))
+        self.clipboard_history.check_and_update()
+        history = self.clipboard_history.get_history()
+        if history:
+            self._items[event["hash"]] = history[0]
+
+    def _paste(self, event):
+        item = self._items.get(event["hash"])
+        if item is not None and item in self.clipboard_history.get_history():
+            self.clipboard_history.paste_item(item)
+
+    def _delete(self, event):
+        item = self._items.get(event["hash"])
+        if item is not None:
+            index = self.clipboard_history.get_history().index_of(item)
+            if index >= 0:
+                self.clipboard_history.remove_item(index, item=item)
+
+    def _show(self, event):
+        from history_view_model import build_rows
+        self.clipboard_history.check_and_update()
+        build_rows(self.clipboard_history.get_ranked_history())
+
+    def replay(self, events):
+        """
+        Replay events as fast as possible and measure them.
+
+        Args:
+            events: Event dicts as returned by load_trace().
+
+        Returns:
+            dict: "latency" per event type (count, mean, p50, p95, max in ms),
+                  "memory" (traced current and peak bytes, history accounting)
+                  and "disk" (the history's cache I/O counters).
+        """
+        handlers = {"capture": self._capture, "paste": self._paste,
+                    "delete": self._delete, "show": self._show}
+        latencies = {}
+        io_before = dict(self.clipboard_history.io_stats)
+
+        tracemalloc.start()
+        for event in events:
+            handler = handlers.get(event.get("event"))
+            if handler is None:
+                continue
+            start = time.perf_counter()
+            handler(event)
+            latencies.setdefault(event["event"], []).append((time.perf_counter() - start) * 1000)
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        report = {"latency": {}, "memory": {}, "disk": {}}
+        for name, values in latencies.items():
+            values.sort()
+            report["latency"][name] = {
+                "count": len(values),
+                "mean": statistics.fmean(values),
+                "p50": values[len(values) // 2],
+                "p95": values[int(len(values) * 0.95)],
+                "max": values[-1],
+            }
+        report["memory"] = {
+            "traced_current": current,
+            "traced_peak": peak,
+            "history_bytes": self.clipboard_history.get_memory_report()["total"]["bytes"],
+        }
+        report["disk"] = {key: value - io_before.get(key, 0)
+                          for key, value in self.clipboard_history.io_stats.items()}
+        return report
+
+def main(argv):
+    if len(argv) != 2:
+        print(f"Usage: {argv[0]} TRACE")
+        return 1
+
+    from clipboard_history import ClipboardHistory
+
+    pasteboard = FakePasteboard()
+    history = ClipboardHistory(max_items=50, pasteboard=pasteboard,
+                               cache_dir=tempfile.mkdtemp(prefix="replay_cache_"))
+    report = ReplayDriver(history, pasteboard).replay(load_trace(argv[1]))
+    print(json.dumps(report, indent=2))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))